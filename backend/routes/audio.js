@@ -8,6 +8,7 @@ const speechService = require('../services/speechService');
 const audioService = require('../services/audioService');
 const nlpService = require('../services/nlpService');
 const audioStorageService = require('../services/audioStorageService');
+const waveformService = require('../services/waveformService');
 const auth = require('../middleware/auth');
 
 // Function to clean up old uploads
@@ -26,7 +27,7 @@ function cleanupOldUploads() {
         files.forEach(file => {
             const filePath = path.join(uploadsDir, file);
             try {
-                fs.unlinkSync(filePath);
+                fs.rmSync(filePath, { recursive: true, force: true });
                 console.log(`  ✅ Deleted: ${file}`);
             } catch (error) {
                 console.error(`  ❌ Failed to delete ${file}:`, error.message);
@@ -49,7 +50,7 @@ function cleanupOldProcessedFiles() {
         }
         
         const files = fs.readdirSync(uploadsDir);
-        const processedFiles = files.filter(file => file.startsWith('processed-'));
+        const processedFiles = files.filter(file => file.startsWith('processed-') && !file.endsWith('.peaks'));
         
         if (processedFiles.length > 5) { // Keep only 5 most recent processed files
             console.log(`🧹 Cleaning up old processed files (keeping 5 most recent)...`);
@@ -65,6 +66,7 @@ function cleanupOldProcessedFiles() {
             fileStats.slice(5).forEach(file => {
                 try {
                     fs.unlinkSync(file.path);
+                    waveformService.removePeaks(file.path);
                     console.log(`  ✅ Deleted old processed file: ${file.name}`);
                 } catch (error) {
                     console.error(`  ❌ Failed to delete ${file.name}:`, error.message);
@@ -136,6 +138,11 @@ router.post('/upload', auth, upload.single('audio'), async (req, res) => {
         // Save to MongoDB
         const savedAudio = await audioStorageService.saveAudioFile(audioFile, req.user._id);
 
+        // Precompute the waveform peaks in the background for the editor
+        waveformService.generatePeaks(req.file.path).catch((error) => {
+            console.error('Waveform peaks error:', error.message);
+        });
+
         res.json({
             message: 'Audio file uploaded successfully',
             file: audioFile,
@@ -224,15 +231,121 @@ router.post('/speech-to-text', auth, async (req, res) => {
             words: transcription.words || []
         });
     } catch (error) {
+        if (error.queueFull) {
+            // Backpressure from the transcription job queue
+            return res.status(503).set('Retry-After', '30').json({
+                error: 'Transcription queue is full, try again later',
+                queue: error.queueStats
+            });
+        }
         console.error('Speech-to-text error:', error);
         res.status(500).json({ error: 'Failed to transcribe audio' });
     }
 });
 
+// Stream a transcription as newline-delimited JSON events - Protected route
+// Sends the "words", "partial" and "progress" events while the file is still
+// being decoded, then {"event": "result", transcription, words}
+router.post('/speech-to-text/stream', auth, async (req, res) => {
+    let streaming = false;
+    try {
+        const { audioId } = req.body;
+        
+        if (!audioId) {
+            return res.status(400).json({ error: 'Audio ID is required' });
+        }
+
+        const audio = await audioStorageService.getAudioById(audioId);
+        
+        // Check if the audio belongs to the user
+        if (audio.userId.toString() !== req.user._id.toString()) {
+            return res.status(403).json({ error: 'Access denied' });
+        }
+        
+        if (!fs.existsSync(audio.filePath)) {
+            return res.status(404).json({ error: 'Audio file not found' });
+        }
+
+        res.status(200).set('Content-Type', 'application/x-ndjson');
+        streaming = true;
+        const send = (event) => res.write(JSON.stringify(event) + '\n');
+
+        const transcription = await speechService.streamTranscription(audio.filePath, send);
+        if (transcription.source !== 'error') {
+            await audioStorageService.updateProcessedAudio(audioId, { transcription: transcription.text });
+        }
+        
+        send({ event: 'result', transcription: transcription, words: transcription.words || [] });
+        res.end();
+    } catch (error) {
+        console.error('Streaming speech-to-text error:', error);
+        if (streaming) {
+            // The status line is already sent; report the failure as the last event
+            res.end(JSON.stringify({ event: 'error', error: 'Failed to transcribe audio' }) + '\n');
+            return;
+        }
+        if (error.queueFull) {
+            return res.status(503).set('Retry-After', '30').json({
+                error: 'Transcription queue is full, try again later',
+                queue: error.queueStats
+            });
+        }
+        res.status(500).json({ error: 'Failed to transcribe audio' });
+    }
+});
+
+// Find only the given keywords, without a full transcription - Protected route
+router.post('/spot-keywords', auth, async (req, res) => {
+    try {
+        const { audioId, keywords } = req.body;
+        
+        if (!audioId) {
+            return res.status(400).json({ error: 'Audio ID is required' });
+        }
+        
+        if (!Array.isArray(keywords) || keywords.length === 0) {
+            return res.status(400).json({ error: 'Keywords are required' });
+        }
+
+        const audio = await audioStorageService.getAudioById(audioId);
+        
+        // Check if the audio belongs to the user
+        if (audio.userId.toString() !== req.user._id.toString()) {
+            return res.status(403).json({ error: 'Access denied' });
+        }
+        
+        if (!fs.existsSync(audio.filePath)) {
+            return res.status(404).json({ error: 'Audio file not found' });
+        }
+
+        const result = await speechService.spotKeywords(audio.filePath, keywords);
+        if (result.source === 'error') {
+            console.error('Keyword spotting error:', result.error);
+            return res.status(500).json({ error: 'Failed to spot keywords' });
+        }
+        
+        res.json({
+            words: result.words || [],
+            duration: result.duration,
+            keywordStats: result.keywordStats
+        });
+    } catch (error) {
+        if (error.queueFull) {
+            return res.status(503).set('Retry-After', '30').json({
+                error: 'Transcription queue is full, try again later',
+                queue: error.queueStats
+            });
+        }
+        console.error('Keyword spotting error:', error);
+        res.status(500).json({ error: 'Failed to spot keywords' });
+    }
+});
+
 // Analyze text and identify words to replace - Protected route
 router.post('/analyze-text', auth, async (req, res) => {
     try {
-        const { text, targetWords, audioId } = req.body;
+        // words: the timestamped transcript words, so that matches carry their time spans
+        const { text, targetWords, audioId, words } = req.body;
         
         if (!text) {
             return res.status(400).json({ error: 'Text is required' });
@@ -249,7 +362,7 @@ router.post('/analyze-text', auth, async (req, res) => {
             return res.status(403).json({ error: 'Access denied' });
         }
         
-        const analysis = await nlpService.analyzeText(text, targetWords);
+        const analysis = await nlpService.analyzeText(text, targetWords, words);
         
         res.json(analysis);
     } catch (error) {
@@ -287,6 +400,10 @@ router.post('/process-audio', auth, async (req, res) => {
             replacements: replacements
         });
         
+        waveformService.generatePeaks(processedAudio.path).catch((error) => {
+            console.error('Waveform peaks error:', error.message);
+        });
+        
         res.json({
             message: 'Audio processed successfully',
             processedFile: {
@@ -295,6 +412,13 @@ router.post('/process-audio', auth, async (req, res) => {
             }
         });
     } catch (error) {
+        if (error.queueFull) {
+            // Backpressure from the TTS job queue
+            return res.status(503).set('Retry-After', '30').json({
+                error: 'Speech synthesis queue is full, try again later',
+                queue: error.queueStats
+            });
+        }
         console.error('Audio processing error:', error);
         res.status(500).json({ error: 'Failed to process audio' });
     }
@@ -325,6 +449,31 @@ router.get('/processed/:audioId', auth, async (req, res) => {
     }
 });
 
+// Get the waveform peaks of the original (or ?version=processed) audio - Protected route
+// ?width=<pixels> picks the coarsest zoom level with at least one peak per pixel
+router.get('/peaks/:audioId', auth, async (req, res) => {
+    try {
+        const audio = await audioStorageService.getAudioById(req.params.audioId);
+        
+        // Check if the audio belongs to the user
+        if (audio.userId.toString() !== req.user._id.toString()) {
+            return res.status(403).json({ error: 'Access denied' });
+        }
+        
+        const audioPath = req.query.version === 'processed' ? audio.processedFilePath : audio.filePath;
+        if (!audioPath || !fs.existsSync(audioPath)) {
+            return res.status(404).json({ error: 'Audio file not found' });
+        }
+        
+        const peaks = await waveformService.getPeaks(audioPath, parseInt(req.query.width, 10) || 0);
+        res.set('Cache-Control', 'private, max-age=3600');
+        res.json(peaks);
+    } catch (error) {
+        console.error('Error fetching waveform peaks:', error);
+        res.status(500).json({ error: 'Failed to fetch waveform peaks' });
+    }
+});
+
 // Get original audio file - Protected route
 router.get('/original/:audioId', auth, async (req, res) => {
     try {
@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Python audio pipeline
+
+Generates deterministic speech-like audio (harmonic tone bursts shaped like
+syllables and words, separated by pauses) at several durations and runs each
+pipeline stage on it with fake Whisper, Vosk and pyttsx3 modules, so it works
+offline and measures the pipeline's own code rather than the models. Reports
+throughput (audio seconds per wall second, or items per second) and peak
+memory per stage, and fails when a result regresses against the committed
+baseline (scripts/benchmark-baseline.json) or when there is no baseline.
+
+Throughput is compared relative to a fixed reference workload that runs
+alternately with the stage, so that a slower or busier machine moves both
+alike, and a throughput regression only counts if it is still there when the
+stage is run again. The baseline records the machine it was measured on; on another machine
+throughput regressions are only reported as warnings.
+
+Usage:
+    python scripts/benchmark_pipeline.py                     # 10s, 60s, 600s, 3600s
+    python scripts/benchmark_pipeline.py --durations 10,60   # quick run
+    python scripts/benchmark_pipeline.py --save-baseline     # record the baseline
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import wave
+import shutil
+import subprocess
+import argparse
+import tempfile
+import types
+import logging
+
+import numpy as np
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+sys.path.insert(0, SERVICES_DIR)
+
+import speech_recognition_script as speech
+import tts_script as tts
+import splice_script as splice
+from result_format import to_output_format
+from target_matcher import compile_targets
+from stage_metrics import collect_metrics, stage
+
+# The pipeline logs every stage at INFO level; keep the report readable
+logging.getLogger().setLevel(logging.WARNING)
+
+DEFAULT_DURATIONS = [10, 60, 600, 3600]
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark-baseline.json")
+# A stage regresses when its throughput drops, or its peak memory grows, by more than this
+DEFAULT_TOLERANCE = 0.25
+# Memory differences below this are noise
+MEMORY_SLACK_BYTES = 1024 * 1024
+SEED = 1234
+
+# Importing speech_recognition_script in a fresh interpreter (on top of the
+# interpreter's own startup) must stay under this; heavy dependencies belong
+# in the stages that use them
+DEFAULT_IMPORT_BUDGET_SECONDS = 0.25
+IMPORT_RUNS = 5
+
+# Fast stages are re-run until this much time has been spent timing them
+MIN_TIMING_SECONDS = 0.5
+MAX_TIMING_RUNS = 500
+
+SAMPLE_RATE = 16000
+
+# ---------------------------------------------------------------------------
+# Synthetic fixtures
+# ---------------------------------------------------------------------------
+
+def synthesize_speech(duration_seconds, sample_rate=SAMPLE_RATE, seed=SEED):
+    """
+    Deterministic speech-like mono int16 audio: words of 1-3 syllables, each a
+    harmonic tone burst (100-250 Hz fundamental) with a syllable-rate envelope,
+    separated by short gaps and longer sentence pauses, over low background noise
+    Returns (samples, word_spans) where word_spans are (start, end) in seconds
+    """
+    rng = np.random.RandomState(seed)
+    total = int(duration_seconds * sample_rate)
+    audio = (rng.standard_normal(total) * 30).astype(np.float32)
+
+    spans = []
+    position = 0.1
+    while True:
+        syllables = rng.randint(1, 4)
+        word_length = syllables * rng.uniform(0.12, 0.22)
+        if position + word_length >= duration_seconds - 0.1:
+            break
+
+        start = int(position * sample_rate)
+        length = int(word_length * sample_rate)
+        t = np.arange(length, dtype=np.float32) / sample_rate
+        f0 = rng.uniform(100, 250)
+        tone = (np.sin(2 * np.pi * f0 * t)
+                + 0.5 * np.sin(4 * np.pi * f0 * t)
+                + 0.25 * np.sin(6 * np.pi * f0 * t))
+        envelope = np.abs(np.sin(np.pi * syllables * t / word_length))
+        audio[start:start + length] += rng.uniform(3000, 8000) * tone * envelope
+        spans.append((position, position + word_length))
+
+        # Short gap between words, longer pause after every sentence
+        position += word_length + (rng.uniform(0.5, 1.2) if rng.rand() < 0.12 else rng.uniform(0.03, 0.15))
+
+    return np.clip(audio, -32768, 32767).astype(np.int16), spans
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+
+# ---------------------------------------------------------------------------
+# Fake engines
+# ---------------------------------------------------------------------------
+
+def fake_transcript(spans):
+    return [{"word": f"word{index % 500}", "start": start, "end": end, "probability": 0.9}
+            for index, (start, end) in enumerate(spans)]
+
+class FakeWhisperModel:
+    """Returns a fixed transcript of the fixture; results are precomputed per input length"""
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def transcribe(self, audio, **options):
+        words = self.fixtures[len(audio)]
+        segments = [{
+            "start": chunk[0]["start"],
+            "end": chunk[-1]["end"],
+            "avg_logprob": -0.2,
+            "words": chunk
+        } for chunk in (words[index:index + 12] for index in range(0, len(words), 12))]
+        return {"text": " ".join(word["word"] for word in words), "segments": segments}
+
+class FakeKaldiRecognizer:
+    """Finalises an utterance every 25 blocks, reporting the fixture words inside it"""
+
+    def __init__(self, model, sample_rate, grammar=None):
+        self.sample_rate = sample_rate
+        self.spans = model.spans
+        self.samples = 0
+        self.blocks = 0
+        self.emitted = 0
+
+    def SetWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        self.samples += len(data) // 2
+        self.blocks += 1
+        return self.blocks % 25 == 0
+
+    def _utterance(self):
+        now = self.samples / self.sample_rate
+        words = []
+        while self.emitted < len(self.spans) and self.spans[self.emitted][1] <= now:
+            start, end = self.spans[self.emitted]
+            words.append({"word": f"word{self.emitted % 500}", "start": start, "end": end, "conf": 0.9})
+            self.emitted += 1
+        return json.dumps({"text": " ".join(word["word"] for word in words), "result": words})
+
+    def Result(self):
+        return self._utterance()
+
+    def FinalResult(self):
+        self.samples = float("inf")
+        return self._utterance()
+
+    def PartialResult(self):
+        return json.dumps({"partial": ""})
+
+class FakeTTSEngine:
+    """Writes 0.3s of 22.05 kHz tone per word for every queued utterance"""
+
+    def __init__(self):
+        self.queue = []
+        self.properties = {"voice": None, "voices": [], "rate": 150, "volume": 0.9}
+        self.callbacks = {}
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def connect(self, topic, callback):
+        self.callbacks[topic] = callback
+
+    def save_to_file(self, text, path, name=None):
+        self.queue.append((text, path, name))
+
+    def runAndWait(self):
+        for text, path, name in self.queue:
+            if "started-utterance" in self.callbacks:
+                self.callbacks["started-utterance"](name)
+            length = int(0.3 * 22050 * max(1, len(text.split())))
+            tone = (np.sin(np.arange(length) * 2 * np.pi * 180 / 22050) * 8000).astype(np.int16)
+            write_wav(path, tone, 22050)
+            if "finished-utterance" in self.callbacks:
+                self.callbacks["finished-utterance"](name, True)
+        self.queue = []
+
+def install_fake_engines(whisper_fixtures, vosk_model):
+    """Replace the engine modules with the fakes, even if the real ones are installed"""
+    whisper = types.ModuleType("whisper")
+    whisper.load_model = lambda name, **options: FakeWhisperModel(whisper_fixtures)
+    vosk = types.ModuleType("vosk")
+    vosk.Model = lambda path: vosk_model
+    vosk.KaldiRecognizer = FakeKaldiRecognizer
+    pyttsx3 = types.ModuleType("pyttsx3")
+    pyttsx3.init = FakeTTSEngine
+    sys.modules.update({"whisper": whisper, "vosk": vosk, "pyttsx3": pyttsx3})
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def bench_decode(fixture):
+    speech.decode_audio(fixture["wav_path"])
+    return fixture["duration"]
+
+def bench_vad(fixture):
+    speech.detect_speech_regions(fixture["audio"])
+    return fixture["duration"]
+
+def bench_word_boundaries(fixture):
+    speech.detect_word_boundaries_enhanced(fixture["audio"])
+    return fixture["duration"]
+
+def bench_alignment(fixture):
+    words = [word["word"] for word in fixture["words"]]
+    speech.align_words(words, fixture["audio"])
+    return fixture["duration"]
+
+def bench_whisper(fixture):
+    speech.try_whisper_recognition(fixture["audio"])
+    return fixture["duration"]
+
+def bench_vosk(fixture):
+    fixture["vosk_model"].spans = fixture["spans"]
+    speech.try_vosk_recognition(fixture["audio"])
+    return fixture["duration"]
+
+def bench_keyword_matching(fixture):
+    speech.match_keyword_sequences(fixture["words"], ["word7", "word42 word43", "word499"])
+    return fixture["duration"]
+
+# A large custom word list: words, inflected forms and phrases
+TARGET_WORDS = ([f"target{index}" for index in range(1000)] + [f"word{index}s" for index in range(0, 500, 7)]
+                + [f"word{index} word{index + 1}" for index in range(0, 500, 5)])
+
+def bench_target_matching(fixture):
+    # The list is compiled once and cached, as in the worker
+    compile_targets(TARGET_WORDS).match(fixture["words"])
+    return fixture["duration"]
+
+def bench_result_json(fixture):
+    json.dumps({"text": "", "words": fixture["words"], "duration": fixture["duration"], "source": "vosk"})
+    return fixture["duration"]
+
+def bench_result_columnar(fixture):
+    result = {"text": "", "words": fixture["words"], "duration": fixture["duration"], "source": "vosk"}
+    json.dumps(to_output_format(result, "columnar"), separators=(",", ":"))
+    return fixture["duration"]
+
+def bench_tts_batch(fixture):
+    # One replacement phrase per 10 seconds of audio
+    count = max(1, int(fixture["duration"] // 10))
+    manifest_path = os.path.join(fixture["work_dir"], "tts_manifest.json")
+    jobs = [{"text": f"phrase number {index % 50}",
+             "output_path": os.path.join(fixture["work_dir"], f"tts_{index}.wav")} for index in range(count)]
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(jobs, manifest_file)
+    tts.run_batch(manifest_path, bank=None)
+    return count
+
+def bench_splice(fixture):
+    # One replacement per 10 seconds, at the 44.1 kHz stereo output format
+    duration = fixture["duration"]
+    source = np.zeros((int(duration * splice.OUTPUT_SAMPLE_RATE), splice.OUTPUT_CHANNELS), dtype=np.int16)
+    clip = np.full((int(0.4 * splice.OUTPUT_SAMPLE_RATE), 2), 1000, dtype=np.float32)
+    replacements = [{"startTime": start, "endTime": start + 0.3} for start in np.arange(1.0, duration - 1, 10.0)]
+    segments = splice.build_segments(source, replacements, [clip] * len(replacements))
+    splice.splice_segments(segments, int(splice.OUTPUT_SAMPLE_RATE * splice.CROSSFADE_MS / 1000))
+    return duration
+
+def bench_splice_incremental(fixture):
+    # Re-render after editing one of the replacements (one per 10 seconds); the
+    # first run renders everything, later runs only the region of the edit
+    work_dir = fixture["work_dir"]
+    clip_paths = []
+    for frequency in (220, 330):
+        clip_path = os.path.join(work_dir, f"clip_{frequency}.wav")
+        if not os.path.exists(clip_path):
+            tone = np.sin(2 * np.pi * frequency * np.arange(int(0.4 * SAMPLE_RATE)) / SAMPLE_RATE)
+            write_wav(clip_path, (tone * 8000).astype(np.int16))
+        clip_paths.append(clip_path)
+
+    fixture["edits"] = fixture.get("edits", 0) + 1
+    duration = fixture["duration"]
+    replacements = [{"startTime": start, "endTime": start + 0.3, "clip_path": clip_paths[0]}
+                    for start in np.arange(1.0, duration - 1, 10.0)]
+    replacements[0]["clip_path"] = clip_paths[fixture["edits"] % 2]
+    splice.splice_audio(fixture["wav_path"], os.path.join(work_dir, "incremental.wav"), replacements,
+                        render_dir=os.path.join(work_dir, f"render_{duration}"))
+    return duration
+
+# name: (function, unit, longest fixture duration it runs on, needs ffmpeg)
+STAGES = {
+    "decode": (bench_decode, "audio_s", None, True),
+    "vad": (bench_vad, "audio_s", None, False),
+    "word_boundaries": (bench_word_boundaries, "audio_s", None, False),
+    "alignment": (bench_alignment, "audio_s", None, False),
+    "whisper": (bench_whisper, "audio_s", None, False),
+    "vosk": (bench_vosk, "audio_s", None, False),
+    "keyword_matching": (bench_keyword_matching, "audio_s", None, False),
+    "target_matching": (bench_target_matching, "audio_s", None, False),
+    "result_json": (bench_result_json, "audio_s", None, False),
+    "result_columnar": (bench_result_columnar, "audio_s", None, False),
+    "tts_batch": (bench_tts_batch, "clips", 600, False),
+    # The float32 stereo output buffer of an hour-long splice is over 1 GB
+    "splice": (bench_splice, "audio_s", 600, False),
+    "splice_incremental": (bench_splice_incremental, "audio_s", 600, True),
+}
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def reference_workload():
+    """A fixed mix of NumPy filtering and pure-Python work, like the stages"""
+    samples = np.sin(np.arange(SAMPLE_RATE, dtype=np.float32))
+    np.convolve(samples, np.ones(64, dtype=np.float32), mode="same")
+    sum(len(str(index)) for index in range(5000))
+
+def machine_info():
+    """What a baseline's absolute speed depends on"""
+    processor = platform.processor()
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as cpuinfo:
+            processor = next(line.split(":", 1)[1].strip() for line in cpuinfo if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    return {
+        "machine": platform.machine(),
+        "processor": processor,
+        "cpus": os.cpu_count(),
+        "python": platform.python_version()
+    }
+
+def run_stage(function, fixture, repeat):
+    """
+    Time a stage over at least repeat runs (more for fast stages, until
+    MIN_TIMING_SECONDS have been spent) and keep the fastest, then measure its
+    memory in a separate run because tracemalloc slows allocations down
+    The reference workload runs before every run; the median ratio of the two
+    is the stage's relative throughput (units per reference run)
+    """
+    timings = []
+    reference_timings = []
+    while len(timings) < repeat or (sum(timings) < MIN_TIMING_SECONDS and len(timings) < MAX_TIMING_RUNS):
+        start = time.perf_counter()
+        reference_workload()
+        reference_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        units = function(fixture)
+        timings.append(time.perf_counter() - start)
+    # Each run against the reference run just before it
+    relative = units * float(np.median(np.array(reference_timings) / np.maximum(timings, 1e-9)))
+
+    with collect_metrics() as metrics:
+        with stage("run"):
+            function(fixture)
+    memory = metrics.as_dict()["stages"]["run"]
+
+    wall = max(min(timings), 1e-9)
+    return {
+        "wallSeconds": round(wall, 6),
+        "runs": len(timings),
+        "throughput": round(units / wall, 2),
+        "relativeThroughput": float(f"{relative:.6g}"),
+        "pythonPeakBytes": memory["pythonPeakBytes"],
+        "peakRssBytes": memory["peakRssBytes"]
+    }
+
+def run_benchmarks(durations, stage_names, repeat):
+    vosk_model = types.SimpleNamespace(spans=[])
+    whisper_fixtures = {}
+    install_fake_engines(whisper_fixtures, vosk_model)
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    # The fake engines load nothing, so any path stands in for the model store
+    speech.installed_model_path = lambda model_name: os.path.join(work_dir, model_name)
+    try:
+        for duration in durations:
+            audio, spans = synthesize_speech(duration)
+            words = fake_transcript(spans)
+            whisper_fixtures[len(audio)] = words
+            fixture = {
+                "duration": duration,
+                "audio": audio,
+                "spans": spans,
+                "words": words,
+                "vosk_model": vosk_model,
+                "work_dir": work_dir,
+                "wav_path": os.path.join(work_dir, f"fixture_{duration}.wav")
+            }
+            if has_ffmpeg and any(STAGES[name][3] for name in stage_names):
+                write_wav(fixture["wav_path"], audio)
+
+            for name in stage_names:
+                function, unit, max_duration, needs_ffmpeg = STAGES[name]
+                if max_duration is not None and duration > max_duration:
+                    continue
+                if needs_ffmpeg and not has_ffmpeg:
+                    print(f"  skipping {name}: ffmpeg not found", file=sys.stderr)
+                    continue
+
+                result = run_stage(function, fixture, repeat if duration <= 600 else 1)
+                result["unit"] = f"{unit}/s"
+                results[f"{name}@{duration}s"] = result
+                print(f"  {name + '@' + str(duration) + 's':<26} {result['throughput']:>12.1f} {unit}/s"
+                      f"  {result['wallSeconds']:>8.3f}s"
+                      f"  peak {result['pythonPeakBytes'] / 1048576:>8.1f} MB", file=sys.stderr)
+
+            if os.path.exists(fixture["wav_path"]):
+                os.remove(fixture["wav_path"])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+def measure_import_time(module="speech_recognition_script", runs=IMPORT_RUNS):
+    """Best-of-runs time to import a service module in a fresh interpreter, minus interpreter startup"""
+    def best_time(arguments):
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + arguments, cwd=SERVICES_DIR, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    return max(0.0, best_time(["-c", f"import {module}"]) - best_time(["-c", "pass"]))
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of (key, "throughput" or "memory", message) regressions (empty if nothing regressed)"""
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+
+        # Baselines from before the reference workload only have absolute throughput
+        measure = "relativeThroughput" if "relativeThroughput" in expected else "throughput"
+        minimum = expected[measure] * (1 - tolerance)
+        if result[measure] < minimum:
+            regressions.append((key, "throughput", f"{key}: {measure} {result[measure]} "
+                                f"< {minimum:.6g} (baseline {expected[measure]}, now {result['throughput']} "
+                                f"{result['unit']})"))
+
+        maximum = expected["pythonPeakBytes"] * (1 + tolerance) + MEMORY_SLACK_BYTES
+        if result["pythonPeakBytes"] > maximum:
+            regressions.append((key, "memory", f"{key}: peak memory {result['pythonPeakBytes']} bytes "
+                                f"> {int(maximum)} (baseline {expected['pythonPeakBytes']})"))
+    return regressions
+
+def rerun_stages(keys, repeat):
+    """Run the stages behind "<stage>@<duration>s" result keys again"""
+    results = {}
+    for key in keys:
+        name, duration = key.rsplit("@", 1)
+        results.update(run_benchmarks([int(duration.rstrip("s"))], [name], repeat))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python audio pipeline with fake engines")
+    parser.add_argument("--durations", default=",".join(str(duration) for duration in DEFAULT_DURATIONS),
+                        help="Comma-separated fixture durations in seconds (default: 10,60,600,3600)")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="Comma-separated stages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per stage for fixtures up to 10 minutes; the fastest is kept (default: 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH,
+                        help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative regression before failing (default: 0.25)")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET_SECONDS,
+                        help="Fail if importing speech_recognition_script takes longer (default: 0.25s)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    durations = [int(duration) for duration in args.durations.split(",") if duration.strip()]
+    stage_names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stage_names if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)} (available: {', '.join(STAGES)})")
+
+    import_seconds = measure_import_time()
+    print(f"Import time: {import_seconds:.3f}s (budget {args.import_budget}s)", file=sys.stderr)
+    over_budget = import_seconds > args.import_budget
+
+    print(f"Benchmarking {len(stage_names)} stages on {durations} second fixtures...", file=sys.stderr)
+    results = run_benchmarks(durations, stage_names, max(1, args.repeat))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(dict(results, importSeconds=round(import_seconds, 3)), output_file, indent=2)
+
+    if over_budget:
+        print(f"Importing speech_recognition_script exceeds the {args.import_budget}s budget", file=sys.stderr)
+        sys.exit(1)
+
+    machine = machine_info()
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+        if baseline.get("machine") != machine:
+            # Results from two machines cannot be compared with each other
+            baseline = {}
+        baseline.update(results)
+        baseline["machine"] = machine
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"Saved baseline for {len(results)} results to {args.baseline}", file=sys.stderr)
+        return
+
+    # Without a baseline nothing could be checked, which must not pass as "no regressions"
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one", file=sys.stderr)
+        sys.exit(1)
+
+    with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    unchecked = sorted(key for key in results if key not in baseline)
+    if unchecked:
+        print(f"Warning: not in the baseline, not checked: {', '.join(unchecked)}", file=sys.stderr)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+    # A stage that was slow because something else ran at the same time is fast again
+    slow = sorted({key for key, kind, _ in regressions if kind == "throughput"})
+    if slow:
+        print(f"Running {', '.join(slow)} again to confirm the slowdown...", file=sys.stderr)
+        for key, result in rerun_stages(slow, max(1, args.repeat)).items():
+            if result["relativeThroughput"] > results[key]["relativeThroughput"]:
+                results[key] = result
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+    if baseline.get("machine") != machine:
+        print(f"Warning: the baseline was recorded on {baseline.get('machine')}, this is {machine}; "
+              "throughput differences are not failures", file=sys.stderr)
+        for _, kind, message in regressions:
+            if kind == "throughput":
+                print(f"  {message}", file=sys.stderr)
+        regressions = [regression for regression in regressions if regression[1] != "throughput"]
+
+    if regressions:
+        print("Performance regressions against the baseline:", file=sys.stderr)
+        for _, _, message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        sys.exit(1)
+    print("No regressions against the baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
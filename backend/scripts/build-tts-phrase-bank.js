@@ -0,0 +1,73 @@
+/**
+ * TTS Phrase Bank Build Script
+ *
+ * Pre-renders every replacement phrase known to the NLP service into the TTS
+ * phrase bank, so that common replacements are served from the bank instead of
+ * running the speech engine on every request.
+ *
+ * Usage: node scripts/build-tts-phrase-bank.js [rate,...] [volume,...]
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const nlpService = require('../services/nlpService');
+
+const scriptPath = path.join(__dirname, '../services/tts_script.py');
+
+// Rates and volumes to render; defaults match TTSService.generateSpeech
+const rates = (process.argv[2] || '150').split(',').map(Number);
+const volumes = (process.argv[3] || '0.9').split(',').map(Number);
+
+/**
+ * Collect every replacement phrase from the NLP service vocabulary
+ */
+function collectPhrases() {
+  const phrases = new Set();
+  Object.values(nlpService.replacementSuggestions).forEach((suggestions) => {
+    suggestions.forEach((phrase) => phrases.add(phrase));
+  });
+  return [...phrases];
+}
+
+const manifest = {
+  phrases: collectPhrases(),
+  rates: rates,
+  volumes: volumes,
+};
+
+console.log(
+  `Rendering ${manifest.phrases.length} phrases at ${rates.length} rate(s) and ${volumes.length} volume(s)...`
+);
+
+const pythonProcess = spawn('python', [scriptPath, '--build-bank', '-'], {
+  stdio: ['pipe', 'pipe', 'inherit'],
+});
+
+let output = '';
+pythonProcess.stdout.on('data', (data) => {
+  output += data.toString();
+});
+
+pythonProcess.on('close', (code) => {
+  try {
+    const result = JSON.parse(output.trim());
+    if (code === 0 && result.success) {
+      console.log(
+        `Phrase bank ready: ${result.rendered} rendered, ${result.skipped} already present, ${result.entries} total`
+      );
+      process.exit(0);
+    }
+    console.error('Phrase bank build incomplete:', result);
+  } catch (error) {
+    console.error('Failed to parse phrase bank build result:', output);
+  }
+  process.exit(1);
+});
+
+pythonProcess.on('error', (error) => {
+  console.error('Failed to start TTS script:', error);
+  process.exit(1);
+});
+
+pythonProcess.stdin.write(JSON.stringify(manifest));
+pythonProcess.stdin.end();
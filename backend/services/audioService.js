@@ -1,13 +1,35 @@
 const ffmpeg = require("fluent-ffmpeg");
+const { spawn } = require("child_process");
 const path = require("path");
 const fs = require("fs");
+const crypto = require("crypto");
 const speechService = require("./speechService");
 const ttsService = require("./ttsService");
 
+// TTS batch methods whose clips are real speech and may be cached; the
+// "silence" fallback written for a failed phrase is not
+const CACHEABLE_TTS_METHODS = new Set(["pyttsx3", "bank"]);
+
 class AudioService {
   constructor() {
     // Set FFmpeg path if needed (adjust based on your system)
     // ffmpeg.setFfmpegPath('/path/to/ffmpeg');
+
+    // Single-pass Python splicing engine
+    this.spliceScriptPath = path.join(__dirname, "splice_script.py");
+  }
+
+  renderDirFor(audioFilePath) {
+    // Render cache of an audio file: its TTS clips, and the decoded source,
+    // spliced regions and manifest kept by splice_script.py
+    return `${audioFilePath}.render`;
+  }
+
+  removeRenderCache(audioFilePath) {
+    fs.rmSync(this.renderDirFor(audioFilePath), {
+      recursive: true,
+      force: true,
+    });
   }
 
   async processAudioReplacements(audioFilePath, replacements) {
@@ -47,6 +69,9 @@ class AudioService {
           processed: true,
         };
       } catch (error) {
+        if (error.queueFull) {
+          throw error;
+        }
         console.log(
           "⚠️ Real audio processing failed, using basic processing:",
           error.message
@@ -65,6 +90,9 @@ class AudioService {
       }
     } catch (error) {
       console.error("Audio processing error:", error);
+      if (error.queueFull) {
+        throw error;
+      }
       throw new Error("Failed to process audio");
     }
   }
@@ -110,68 +138,93 @@ class AudioService {
         fs.mkdirSync(tempDir, { recursive: true });
       }
 
-      let currentFile = inputPath;
-
-      // Process each replacement sequentially
-      for (let i = 0; i < validatedReplacements.length; i++) {
-        const replacement = validatedReplacements[i];
-        console.log(
-          `Processing replacement ${i + 1}/${validatedReplacements.length}: "${
-            replacement.originalWord
-          }" → "${replacement.replacementText}" at ${replacement.startTime}s-${
-            replacement.endTime
-          }s`
-        );
+      // TTS clips are kept in the render cache by text, so re-rendering after
+      // an edit only synthesises the new or changed replacement words
+      const clipsDir = path.join(this.renderDirFor(inputPath), "clips");
+      fs.mkdirSync(clipsDir, { recursive: true });
+      const ttsPaths = validatedReplacements.map((replacement) =>
+        path.join(clipsDir, `${this.clipKey(replacement.replacementText)}.wav`)
+      );
+      const missingClips = new Map();
+      validatedReplacements.forEach((replacement, i) => {
+        if (!fs.existsSync(ttsPaths[i])) {
+          missingClips.set(ttsPaths[i], replacement.replacementText);
+        }
+      });
+      console.log(
+        `Reusing ${ttsPaths.length - missingClips.size} cached TTS clips, generating ${missingClips.size}`
+      );
 
+      if (missingClips.size > 0) {
+        // Generate TTS for every missing clip in a single batch
+        const batchId = Date.now();
+        const batch = [...missingClips].map(([clipPath, text], i) => ({
+          text: text,
+          outputPath: path.join(tempDir, `tts_${batchId}_${i}.wav`),
+          clipPath: clipPath,
+        }));
+        let batchResults = [];
         try {
-          // Generate TTS for the replacement word
-          const ttsFilename = `tts_${Date.now()}_${i}.wav`;
-          const ttsPath = path.join(tempDir, ttsFilename);
-
-          console.log(`Generating TTS for: "${replacement.replacementText}"`);
-          await ttsService.generateSpeech(replacement.replacementText, ttsPath);
-
-          // Verify TTS file was created
-          if (!fs.existsSync(ttsPath)) {
-            throw new Error("TTS file was not generated");
+          batchResults = (await ttsService.generateSpeechBatch(batch)).results;
+        } catch (error) {
+          if (error.queueFull) {
+            // Rendering without the replacements would leave the words audible
+            throw error;
           }
+          // Replacements without a TTS file are skipped below
+          console.error("❌ TTS batch generation failed:", error.message);
+        }
+        const methods = new Map(
+          batchResults.map((result) => [result.output_path, result.method])
+        );
+        batch.forEach((job) => {
+          if (!fs.existsSync(job.outputPath)) {
+            return;
+          }
+          if (CACHEABLE_TTS_METHODS.has(methods.get(job.outputPath))) {
+            fs.renameSync(job.outputPath, job.clipPath);
+          } else {
+            // Used for this render only, so the phrase is synthesised again next time
+            ttsPaths.forEach((ttsPath, i) => {
+              if (ttsPath === job.clipPath) {
+                ttsPaths[i] = job.outputPath;
+              }
+            });
+          }
+        });
+      }
 
-          // Create output path for this step
-          const stepOutput = path.join(tempDir, `step_${i}.wav`);
-
-          // Replace the audio segment
-          console.log(
-            `Replacing audio segment from ${replacement.startTime}s to ${replacement.endTime}s`
-          );
-          await this.replaceAudioSegment(
-            currentFile,
-            ttsPath,
-            replacement.startTime,
-            replacement.endTime,
-            stepOutput
-          );
-
-          // Update current file for next iteration
-          currentFile = stepOutput;
-
-          console.log(`✅ Replacement ${i + 1} completed`);
+      // Splice every replacement in a single pass over the audio
+      const spliceJobs = validatedReplacements
+        .map((replacement, i) => ({
+          startTime: replacement.startTime,
+          endTime: replacement.endTime,
+          clip_path: ttsPaths[i],
+        }))
+        .filter((job) => fs.existsSync(job.clip_path));
+
+      if (spliceJobs.length === 0) {
+        // No TTS clips were generated, copy original
+        fs.copyFileSync(inputPath, outputPath);
+      } else {
+        try {
+          await this.runSpliceScript(inputPath, outputPath, spliceJobs);
+          this.pruneCachedClips(clipsDir, ttsPaths);
         } catch (error) {
-          console.error(
-            `❌ Failed to process replacement ${i + 1}:`,
+          console.log(
+            "⚠️ Single-pass splicing failed, falling back to sequential FFmpeg splicing:",
             error.message
           );
-          // Continue with other replacements
+          await this.performSequentialReplacements(
+            inputPath,
+            outputPath,
+            validatedReplacements,
+            ttsPaths,
+            tempDir
+          );
         }
       }
 
-      // Copy final result to output path
-      if (currentFile !== inputPath && fs.existsSync(currentFile)) {
-        fs.copyFileSync(currentFile, outputPath);
-      } else {
-        // No successful replacements, copy original
-        fs.copyFileSync(inputPath, outputPath);
-      }
-
       // Clean up temp directory
       this.cleanupTempFiles(tempDir);
 
@@ -182,6 +235,144 @@ class AudioService {
     }
   }
 
+  clipKey(text, rate = 150, volume = 0.9) {
+    return crypto
+      .createHash("sha1")
+      .update(`${rate}|${volume}|${text}`)
+      .digest("hex");
+  }
+
+  pruneCachedClips(clipsDir, keepPaths) {
+    // The render cache mirrors the latest render; older clips are dropped
+    const keep = new Set(keepPaths.map((clipPath) => path.basename(clipPath)));
+    fs.readdirSync(clipsDir)
+      .filter((file) => !keep.has(file))
+      .forEach((file) => fs.rmSync(path.join(clipsDir, file), { force: true }));
+  }
+
+  async runSpliceScript(inputPath, outputPath, spliceJobs) {
+    return new Promise((resolve, reject) => {
+      console.log(`🔧 Splicing ${spliceJobs.length} replacements in one pass`);
+
+      const pythonProcess = spawn("python", [this.spliceScriptPath, "-"]);
+
+      let output = "";
+      let errorOutput = "";
+
+      pythonProcess.stdout.on("data", (data) => {
+        output += data.toString();
+      });
+
+      pythonProcess.stderr.on("data", (data) => {
+        errorOutput += data.toString();
+      });
+
+      pythonProcess.on("close", (code) => {
+        let result = null;
+        try {
+          result = JSON.parse(output.trim());
+        } catch (parseError) {
+          // Reported below
+        }
+
+        if (code === 0 && result && result.success) {
+          console.log(
+            `✅ Audio splicing complete: re-spliced ${result.rendered} of ${result.regions} regions` +
+              `${result.sourceDecoded ? " (source decoded)" : ""}`,
+            result.timings
+          );
+          resolve(result);
+        } else if (result && result.error) {
+          reject(new Error(result.error));
+        } else {
+          reject(
+            new Error(`Splice script failed with code ${code}: ${errorOutput}`)
+          );
+        }
+      });
+
+      pythonProcess.on("error", (error) => {
+        reject(new Error(`Failed to start splice script: ${error.message}`));
+      });
+
+      pythonProcess.stdin.write(
+        JSON.stringify({
+          input_path: inputPath,
+          output_path: outputPath,
+          // Reuse the unchanged regions of the previous render
+          render_dir: this.renderDirFor(inputPath),
+          replacements: spliceJobs,
+        })
+      );
+      pythonProcess.stdin.end();
+    });
+  }
+
+  async performSequentialReplacements(
+    inputPath,
+    outputPath,
+    replacements,
+    ttsPaths,
+    tempDir
+  ) {
+    let currentFile = inputPath;
+
+    // Process each replacement sequentially
+    for (let i = 0; i < replacements.length; i++) {
+      const replacement = replacements[i];
+      console.log(
+        `Processing replacement ${i + 1}/${replacements.length}: "${
+          replacement.originalWord
+        }" → "${replacement.replacementText}" at ${replacement.startTime}s-${
+          replacement.endTime
+        }s`
+      );
+
+      try {
+        const ttsPath = ttsPaths[i];
+
+        // Verify TTS file was created
+        if (!fs.existsSync(ttsPath)) {
+          throw new Error("TTS file was not generated");
+        }
+
+        // Create output path for this step
+        const stepOutput = path.join(tempDir, `step_${i}.wav`);
+
+        // Replace the audio segment
+        console.log(
+          `Replacing audio segment from ${replacement.startTime}s to ${replacement.endTime}s`
+        );
+        await this.replaceAudioSegment(
+          currentFile,
+          ttsPath,
+          replacement.startTime,
+          replacement.endTime,
+          stepOutput
+        );
+
+        // Update current file for next iteration
+        currentFile = stepOutput;
+
+        console.log(`✅ Replacement ${i + 1} completed`);
+      } catch (error) {
+        console.error(
+          `❌ Failed to process replacement ${i + 1}:`,
+          error.message
+        );
+        // Continue with other replacements
+      }
+    }
+
+    // Copy final result to output path
+    if (currentFile !== inputPath && fs.existsSync(currentFile)) {
+      fs.copyFileSync(currentFile, outputPath);
+    } else {
+      // No successful replacements, copy original
+      fs.copyFileSync(inputPath, outputPath);
+    }
+  }
+
   validateReplacements(replacements) {
     if (!replacements || replacements.length === 0) {
       return [];
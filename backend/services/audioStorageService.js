@@ -1,6 +1,8 @@
 const fs = require("fs");
 const path = require("path");
 const Audio = require("../models/Audio");
+const waveformService = require("./waveformService");
+const audioService = require("./audioService");
 
 class AudioStorageService {
   constructor() {
@@ -123,11 +125,16 @@ class AudioStorageService {
       if (fs.existsSync(audio.filePath)) {
         fs.unlinkSync(audio.filePath);
       }
+      waveformService.removePeaks(audio.filePath);
+      audioService.removeRenderCache(audio.filePath);
 
       // Delete the processed file if it exists
       if (audio.processedFilePath && fs.existsSync(audio.processedFilePath)) {
         fs.unlinkSync(audio.processedFilePath);
       }
+      if (audio.processedFilePath) {
+        waveformService.removePeaks(audio.processedFilePath);
+      }
 
       // Delete the database record
       await Audio.findByIdAndDelete(audioId);
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Local job scheduler shared by every speech and TTS process on the machine
+Jobs are queued in SQLite by pool, run at most `slots` at a time per pool in
+priority order, and identical jobs that are already queued or running are
+shared instead of being computed twice
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), "..", "cache", "jobs.sqlite")
+DEFAULT_MAX_QUEUED = 32
+POLL_SECONDS = 0.05
+# Lower priorities run first; a queued job's priority drops by this much per
+# second of waiting so that large jobs are not starved by a stream of small ones
+PRIORITY_AGING_PER_SECOND = 0.5
+# Finished jobs are kept this long for the processes waiting on their result
+RESULT_RETENTION_SECONDS = 60
+# How often waiting processes check for jobs whose process has died
+REAP_INTERVAL_SECONDS = 1.0
+
+class QueueFull(Exception):
+    """Raised by submit() when the pool already has max_queued jobs waiting"""
+
+    def __init__(self, pool, stats):
+        super().__init__(f"The {pool} job queue is full ({stats['queued']} jobs waiting)")
+        self.stats = stats
+
+def available_memory_bytes():
+    """Memory available to new processes, or None if it cannot be determined"""
+    try:
+        with open("/proc/meminfo", "r") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def default_slot_count(memory_per_slot, shared_memory=0):
+    """
+    One slot per core, limited by how many jobs of memory_per_slot bytes fit in
+    memory besides shared_memory bytes used once by all of them
+    """
+    slots = os.cpu_count() or 1
+    memory = available_memory_bytes()
+    if memory is not None:
+        slots = min(slots, max(0, memory - shared_memory) // memory_per_slot)
+    return max(1, slots)
+
+def process_alive(pid):
+    """Whether a process with this pid is still running"""
+    if sys.platform == "win32":
+        # os.kill(pid, 0) terminates the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def job_key(kind, options, path=None):
+    """
+    Build a deduplication key from the job kind, its options and the contents
+    (not the name) of its input file, so that two uploads of the same audio match
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(json.dumps([kind, options], sort_keys=True).encode("utf-8"))
+    if path is not None:
+        with open(path, "rb") as input_file:
+            for block in iter(lambda: input_file.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+class JobScheduler:
+    """
+    SQLite-backed priority queue with a per-pool concurrency limit
+    A job is run either by the process that submitted it (run()) or by the
+    workers of the process named as its runner (claim()); whoever runs it
+    stores the result so that every process waiting on the job receives it.
+    """
+
+    def __init__(self, pool, slots, max_queued=DEFAULT_MAX_QUEUED, path=DEFAULT_QUEUE_PATH):
+        self.pool = pool
+        self.slots = slots
+        self.max_queued = max_queued
+        self.path = os.path.abspath(path)
+        self._last_reap = 0.0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Transactions are managed explicitly (BEGIN IMMEDIATE) so that claiming
+        # a job and checking the running count happen atomically across processes
+        self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pool TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority REAL NOT NULL,
+                state TEXT NOT NULL,
+                runner INTEGER NOT NULL,
+                worker INTEGER,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL,
+                result BLOB,
+                error TEXT
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_pool_state ON jobs (pool, state)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)")
+
+    def submit(self, key, payload, priority, runner):
+        """
+        Queue a job, or join the identical job already queued or running
+        Returns (job id, deduplicated). Raises QueueFull if the pool is at capacity.
+        """
+        now = time.time()
+        with self._transaction():
+            self.connection.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished < ?",
+                (now - RESULT_RETENTION_SECONDS,)
+            )
+            row = self.connection.execute(
+                "SELECT id FROM jobs WHERE pool = ? AND key = ? AND state IN ('queued', 'running') "
+                "ORDER BY id LIMIT 1",
+                (self.pool, key)
+            ).fetchone()
+            if row is not None:
+                return row[0], True
+
+            queued = self._count("queued")
+            if queued >= self.max_queued:
+                raise QueueFull(self.pool, {
+                    "queued": queued,
+                    "running": self._count("running"),
+                    "slots": self.slots,
+                    "maxQueued": self.max_queued
+                })
+
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (pool, key, payload, priority, state, runner, created) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (self.pool, key, json.dumps(payload), priority, runner, now)
+            )
+            return cursor.lastrowid, False
+
+    def claim(self, runner, job_id=None):
+        """
+        Start the next job if a slot is free and the job at the head of the queue
+        is run by runner (and is job_id, if given). Returns {"id", "payload"} or None.
+        """
+        with self._transaction():
+            if self._count("running") >= self.slots:
+                return None
+
+            row = self.connection.execute(
+                "SELECT id, runner, payload FROM jobs WHERE pool = ? AND state = 'queued' "
+                "ORDER BY priority - (? - created) * ?, id LIMIT 1",
+                (self.pool, time.time(), PRIORITY_AGING_PER_SECOND)
+            ).fetchone()
+            if row is None or row[1] != runner or (job_id is not None and row[0] != job_id):
+                return None
+
+            self.connection.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, started = ? WHERE id = ?",
+                (os.getpid(), time.time(), row[0])
+            )
+            return {"id": row[0], "payload": json.loads(row[2])}
+
+    def complete(self, job_id, result):
+        """Store the result of a finished job"""
+        data = zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET state = 'done', finished = ?, result = ? WHERE id = ?",
+                (time.time(), data, job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Mark a job as failed"""
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET state = 'failed', finished = ?, error = ? WHERE id = ?",
+                (time.time(), str(error), job_id)
+            )
+
+    def outcome(self, job_id):
+        """
+        Return ("done", result) or ("failed", error) for a finished job, or None
+        while it is still queued or running
+        """
+        row = self.connection.execute(
+            "SELECT state, result, error FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return "failed", "Job is no longer in the queue"
+        if row[0] == "done":
+            return "done", json.loads(zlib.decompress(row[1]).decode("utf-8"))
+        if row[0] == "failed":
+            return "failed", row[2]
+        return None
+
+    def wait(self, job_id):
+        """Block until a job finishes and return its result; raises RuntimeError if it failed"""
+        while True:
+            outcome = self.outcome(job_id)
+            if outcome is not None:
+                state, value = outcome
+                if state == "failed":
+                    raise RuntimeError(value)
+                return value
+            self.reap()
+            time.sleep(POLL_SECONDS)
+
+    def run(self, key, payload, priority, run):
+        """
+        Run a job in this process once it reaches the head of the queue and a slot
+        is free, sharing the result with identical jobs. If an identical job is
+        already queued or running, wait for its result instead of running run().
+        """
+        job_id, deduplicated = self.submit(key, payload, priority, os.getpid())
+        if deduplicated:
+            logger.info(f"Waiting for identical {self.pool} job {job_id}")
+            return self.wait(job_id)
+
+        try:
+            while self.claim(os.getpid(), job_id) is None:
+                self.reap()
+                time.sleep(POLL_SECONDS)
+            result = run()
+        except BaseException as e:
+            self.fail(job_id, e)
+            raise
+        self.complete(job_id, result)
+        return result
+
+    def position(self, job_id):
+        """Number of queued jobs that will start before this one (0 if it is not queued)"""
+        row = self.connection.execute(
+            "SELECT priority, created FROM jobs WHERE id = ? AND state = 'queued'", (job_id,)
+        ).fetchone()
+        if row is None:
+            return 0
+        now = time.time()
+        rank = row[0] - (now - row[1]) * PRIORITY_AGING_PER_SECOND
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE pool = ? AND state = 'queued' AND id != ? "
+            "AND (priority - (? - created) * ? < ? OR (priority - (? - created) * ? = ? AND id < ?))",
+            (self.pool, job_id, now, PRIORITY_AGING_PER_SECOND, rank,
+             now, PRIORITY_AGING_PER_SECOND, rank, job_id)
+        ).fetchone()[0]
+
+    def stats(self):
+        """Return the queue depth, the running jobs and the limits of this pool"""
+        return {
+            "pool": self.pool,
+            "queued": self._count("queued"),
+            "running": self._count("running"),
+            "slots": self.slots,
+            "maxQueued": self.max_queued,
+            "path": self.path
+        }
+
+    def reap(self, force=False):
+        """
+        Fail the jobs whose process has died: running jobs whose worker exited
+        (e.g. killed for running out of memory) and queued jobs whose runner exited
+        Returns the ids of the failed jobs. Rate-limited unless force is set.
+        """
+        now = time.time()
+        if not force and now - self._last_reap < REAP_INTERVAL_SECONDS:
+            return []
+        self._last_reap = now
+
+        rows = self.connection.execute(
+            "SELECT id, state, runner, worker FROM jobs WHERE pool = ? AND state IN ('queued', 'running')",
+            (self.pool,)
+        ).fetchall()
+        orphaned = [
+            job_id for job_id, state, runner, worker in rows
+            if not process_alive(worker if state == "running" else runner)
+        ]
+        if orphaned:
+            with self._transaction():
+                self.connection.executemany(
+                    "UPDATE jobs SET state = 'failed', finished = ?, error = ? "
+                    "WHERE id = ? AND state IN ('queued', 'running')",
+                    [(now, "The process running the job exited", job_id) for job_id in orphaned]
+                )
+            logger.warning(f"Failed {len(orphaned)} {self.pool} jobs whose process exited")
+        return orphaned
+
+    def cancel(self, runner):
+        """Drop the queued jobs of a runner that is shutting down"""
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET state = 'failed', finished = ?, error = 'Cancelled' "
+                "WHERE pool = ? AND runner = ? AND state = 'queued'",
+                (time.time(), self.pool, runner)
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def _count(self, state):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE pool = ? AND state = ?", (self.pool, state)
+        ).fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+def open_job_scheduler(pool, memory_per_slot, shared_memory=0):
+    """
+    Open the scheduler for a pool configured through the environment
+    <POOL>_WORKERS sets the number of jobs that may run at once (default: one
+    per core, limited by available memory at memory_per_slot bytes per job plus
+    shared_memory bytes shared by all jobs, such as memory-mapped models),
+    <POOL>_QUEUE_MAX the number that may wait, and JOB_QUEUE_PATH the queue
+    location; JOB_SCHEDULER=off disables scheduling. Returns None if scheduling
+    is disabled or the queue cannot be opened.
+    """
+    if os.environ.get("JOB_SCHEDULER", "on").lower() in ("off", "false", "0"):
+        return None
+
+    prefix = pool.upper()
+    try:
+        slots = int(os.environ.get(f"{prefix}_WORKERS") or 0) or default_slot_count(memory_per_slot, shared_memory)
+        return JobScheduler(
+            pool,
+            slots,
+            int(os.environ.get(f"{prefix}_QUEUE_MAX", DEFAULT_MAX_QUEUED)),
+            os.environ.get("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        )
+    except Exception as e:
+        logger.error(f"Could not open the {pool} job queue: {str(e)}")
+        return None
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Checksummed model store for the speech recognition engines
+Models are placed in the store ahead of time by an explicit install command,
+and requests only ever load from it: a model that is not installed is an
+error, never a download. Whisper checkpoints are stored as fp32 state dicts
+that are memory-mapped read-only when loaded, so every worker process on a
+node shares one copy of the weights through the page cache.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "model-store")
+MANIFEST_NAME = "MANIFEST.json"
+MANIFEST_VERSION = 1
+WHISPER_CHECKPOINT_NAME = "model.pt"
+
+# Installable models. Whisper downloads are checked against the sha256 that is
+# part of whisper's own model URLs; other archives can be pinned with --sha256
+CATALOG = {
+    "vosk-small-en-us": {"engine": "vosk", "url": "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"},
+    "whisper-tiny": {"engine": "whisper", "name": "tiny"},
+    "whisper-base": {"engine": "whisper", "name": "base"},
+    "whisper-small": {"engine": "whisper", "name": "small"}
+}
+
+class ModelNotInstalled(RuntimeError):
+    """Raised when a model is needed that has not been installed in the store"""
+
+    def __init__(self, model_name, store_dir):
+        super().__init__(f"Model '{model_name}' is not installed in {store_dir}; "
+                         f"install it with: python model_store.py install {model_name}")
+        self.model_name = model_name
+
+def whisper_model_name(name):
+    """Store name of a Whisper model"""
+    return f"whisper-{name}"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def convert_whisper_checkpoint(source_path, checkpoint_path):
+    """
+    Rewrite a released Whisper checkpoint (fp16) with fp32 weights, the dtype
+    the model runs in on the CPU, so that loading can map the tensors as they
+    are instead of converting them into private memory
+    Returns the size of the weights in bytes
+    """
+    import torch
+
+    checkpoint = torch.load(source_path, map_location="cpu", weights_only=True)
+    state_dict = {
+        key: (value.float() if value.is_floating_point() else value).contiguous()
+        for key, value in checkpoint["model_state_dict"].items()
+    }
+    torch.save({
+        "dims": checkpoint["dims"],
+        "model_state_dict": state_dict,
+        "alignment_heads": checkpoint.get("alignment_heads")
+    }, checkpoint_path)
+    return sum(value.numel() * value.element_size() for value in state_dict.values())
+
+def load_whisper_model(checkpoint_path):
+    """
+    Load a Whisper model from a store checkpoint with its weights memory-mapped
+    read-only: the parameters are views of the mapped file rather than private
+    copies, so all processes loading the same checkpoint share its pages
+    Falls back to whisper.load_model (a private copy) with torch older than 2.1
+    """
+    import whisper
+
+    try:
+        import torch
+        from whisper.model import ModelDimensions, Whisper
+
+        checkpoint = torch.load(checkpoint_path, map_location="cpu", mmap=True, weights_only=True)
+        model = Whisper(ModelDimensions(**checkpoint["dims"]))
+        model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    except (ImportError, TypeError) as e:
+        logger.info(f"Memory-mapped model loading is not available ({str(e)}), loading a private copy")
+        return whisper.load_model(checkpoint_path, device="cpu")
+
+    if checkpoint.get("alignment_heads") is not None:
+        model.set_alignment_heads(checkpoint["alignment_heads"])
+    return model
+
+class ModelStore:
+    """A directory of installed models, each with a manifest of its files and their checksums"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = os.path.abspath(root)
+        self._manifests = {}
+
+    def model_dir(self, model_name):
+        return os.path.join(self.root, model_name)
+
+    def manifest(self, model_name):
+        """The manifest of an installed model, or None if it is not installed"""
+        if model_name not in self._manifests:
+            manifest_path = os.path.join(self.model_dir(model_name), MANIFEST_NAME)
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+                    manifest = json.load(manifest_file)
+            except FileNotFoundError:
+                return None
+            except ValueError as e:
+                logger.warning(f"Manifest of model '{model_name}' is unreadable: {e}")
+                return None
+            if manifest.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Manifest of model '{model_name}' has another version, reinstall the model")
+                return None
+            self._manifests[model_name] = manifest
+        return self._manifests[model_name]
+
+    def model_path(self, model_name):
+        """Path to load an installed model from; raises ModelNotInstalled if it is not installed"""
+        manifest = self.manifest(model_name)
+        if manifest is None:
+            raise ModelNotInstalled(model_name, self.root)
+        return os.path.join(self.model_dir(model_name), manifest["path"])
+
+    def shared_bytes(self, model_name):
+        """Bytes of an installed model's weights that are memory-mapped and shared between processes"""
+        manifest = self.manifest(model_name)
+        return manifest.get("sharedBytes", 0) if manifest else 0
+
+    def installed(self):
+        """Names of the installed models"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.manifest(name) is not None)
+
+    def install(self, model_name, source=None, sha256=None, force=False):
+        """
+        Install a catalog model from its download URL, or from source (a local
+        copy of the same archive or checkpoint) on machines without network access
+        The download is checked against sha256 (for Whisper, the checksum in its
+        URL), and the model is assembled in a temporary directory that is only
+        moved into place once its manifest is written, so a failed or concurrent
+        install never leaves a partial model behind. Returns the manifest.
+        """
+        entry = CATALOG.get(model_name)
+        if entry is None:
+            raise ValueError(f"Unknown model '{model_name}', available: {', '.join(sorted(CATALOG))}")
+        if not force and self.manifest(model_name) is not None:
+            logger.info(f"Model '{model_name}' is already installed")
+            return self.manifest(model_name)
+
+        url = entry.get("url")
+        if entry["engine"] == "whisper":
+            import whisper
+            url = whisper._MODELS[entry["name"]]
+            sha256 = sha256 or url.split("/")[-2]
+
+        os.makedirs(self.root, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=f".{model_name}.", dir=self.root)
+        try:
+            if source is None:
+                import urllib.request
+                source = os.path.join(work_dir, os.path.basename(url))
+                logger.info(f"Downloading {url}...")
+                urllib.request.urlretrieve(url, source)
+
+            source_sha256 = file_sha256(source)
+            if sha256 and source_sha256 != sha256.lower():
+                raise ValueError(f"Checksum mismatch for {source}: expected {sha256}, got {source_sha256}")
+
+            staging_dir = os.path.join(work_dir, "model")
+            os.makedirs(staging_dir)
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "model": model_name,
+                "engine": entry["engine"],
+                "source": url,
+                "sourceSha256": source_sha256,
+                "sharedBytes": 0
+            }
+            if entry["engine"] == "whisper":
+                manifest["path"] = WHISPER_CHECKPOINT_NAME
+                manifest["sharedBytes"] = convert_whisper_checkpoint(
+                    source, os.path.join(staging_dir, WHISPER_CHECKPOINT_NAME))
+            else:
+                import zipfile
+                try:
+                    with zipfile.ZipFile(source, "r") as archive:
+                        archive.extractall(staging_dir)
+                except zipfile.BadZipFile as e:
+                    raise ValueError(f"{source} is not a model archive: {str(e)}")
+                # Archives hold a single versioned directory, which is what Vosk loads
+                entries = os.listdir(staging_dir)
+                single_dir = len(entries) == 1 and os.path.isdir(os.path.join(staging_dir, entries[0]))
+                manifest["path"] = entries[0] if single_dir else "."
+
+            manifest["files"] = {
+                os.path.relpath(path, staging_dir): file_sha256(path) for path in _walk_files(staging_dir)
+            }
+            with open(os.path.join(staging_dir, MANIFEST_NAME), "w", encoding="utf-8") as manifest_file:
+                json.dump(manifest, manifest_file, indent=2)
+
+            target_dir = self.model_dir(model_name)
+            if os.path.exists(target_dir):
+                # Processes that mapped the old files keep their pages until they exit
+                old_dir = os.path.join(work_dir, "old")
+                os.rename(target_dir, old_dir)
+            os.rename(staging_dir, target_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self._manifests.pop(model_name, None)
+        logger.info(f"Installed model '{model_name}' in {target_dir}")
+        return self.manifest(model_name)
+
+    def verify(self, model_name):
+        """
+        Check an installed model's files against its manifest
+        Returns {"model", "ok", "problems"}, with a {"file", "problem"} entry for
+        every file that is missing or whose checksum changed
+        """
+        manifest = self.manifest(model_name)
+        if manifest is None:
+            raise ModelNotInstalled(model_name, self.root)
+
+        problems = []
+        for relative_path, checksum in sorted(manifest["files"].items()):
+            path = os.path.join(self.model_dir(model_name), relative_path)
+            if not os.path.exists(path):
+                problems.append({"file": relative_path, "problem": "missing"})
+            elif file_sha256(path) != checksum:
+                problems.append({"file": relative_path, "problem": "checksum mismatch"})
+        return {"model": model_name, "ok": not problems, "problems": problems}
+
+def _walk_files(directory):
+    for parent, _, names in os.walk(directory):
+        for name in names:
+            yield os.path.join(parent, name)
+
+def open_model_store():
+    """Open the model store at MODEL_STORE_DIR (default: backend/model-store)"""
+    return ModelStore(os.environ.get("MODEL_STORE_DIR") or DEFAULT_STORE_DIR)
+
+def main():
+    """Usage: python model_store.py list | install <model>... | verify [model]..."""
+    parser = argparse.ArgumentParser(description="Install and verify the speech recognition models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the catalog and which models are installed")
+    install_parser = subparsers.add_parser("install", help="Download, check and install models")
+    install_parser.add_argument("models", nargs="+", choices=sorted(CATALOG))
+    install_parser.add_argument("--from", dest="source", metavar="FILE",
+                                help="Install from a local copy of the model archive or checkpoint")
+    install_parser.add_argument("--sha256", help="Expected checksum of the archive or checkpoint")
+    install_parser.add_argument("--force", action="store_true", help="Reinstall models that are already installed")
+    verify_parser = subparsers.add_parser("verify", help="Check installed models against their manifests")
+    verify_parser.add_argument("models", nargs="*", help="Models to verify (default: all installed)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = open_model_store()
+
+    try:
+        if args.command == "list":
+            print(json.dumps({
+                "store": store.root,
+                "models": [{
+                    "model": model_name,
+                    "engine": entry["engine"],
+                    "installed": store.manifest(model_name) is not None,
+                    "sharedBytes": store.shared_bytes(model_name)
+                } for model_name, entry in sorted(CATALOG.items())]
+            }, indent=2))
+        elif args.command == "install":
+            if (args.source or args.sha256) and len(args.models) > 1:
+                parser.error("--from and --sha256 apply to a single model")
+            for model_name in args.models:
+                store.install(model_name, args.source, args.sha256, args.force)
+            print(json.dumps({"success": True, "installed": args.models}))
+        else:
+            results = [store.verify(model_name) for model_name in args.models or store.installed()]
+            print(json.dumps({"success": all(result["ok"] for result in results), "models": results}, indent=2))
+            if not all(result["ok"] for result in results):
+                sys.exit(1)
+
+    except (ModelNotInstalled, ValueError, OSError) as e:
+        logger.error(str(e))
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
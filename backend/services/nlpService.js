@@ -2,6 +2,7 @@ const natural = require("natural");
 const compromise = require("compromise");
 const fs = require("fs");
 const path = require("path");
+const speechService = require("./speechService");
 
 class NLPService {
   constructor() {
@@ -95,7 +96,7 @@ class NLPService {
     return allWords;
   }
 
-  async analyzeText(text, customTargetWords = []) {
+  async analyzeText(text, customTargetWords = [], transcriptWords = null) {
     try {
       // Parse text using compromise for better NLP analysis
       const doc = compromise(text);
@@ -110,8 +111,16 @@ class NLPService {
       // Combine inappropriate words with custom target words
       const targetWords = [...allInappropriateWords, ...customTargetWords];
 
-      // Find words that need replacement
-      const wordsFound = this.findTargetWords(text, targetWords);
+      // Find words that need replacement; with the timestamped transcript
+      // words every match also carries the time span to replace
+      const wordsFound =
+        (transcriptWords &&
+          transcriptWords.length > 0 &&
+          (await this.findTargetWordsInTranscript(
+            transcriptWords,
+            targetWords
+          ))) ||
+        this.findTargetWords(text, targetWords);
 
       // Generate suggestions for replacements
       const suggestions = this.generateReplacements(wordsFound);
@@ -148,6 +157,15 @@ class NLPService {
       targetWordMap[word.toLowerCase()] = word;
     });
 
+    // Stem every target once, not once per transcript word
+    const targetStemMap = new Map();
+    targetWords.forEach((word) => {
+      const stemmedTarget = this.stemmer.stem(word.toLowerCase());
+      if (!targetStemMap.has(stemmedTarget)) {
+        targetStemMap.set(stemmedTarget, word);
+      }
+    });
+
     // Track processed positions to avoid duplicate matches
     const processedPositions = new Set();
 
@@ -175,19 +193,15 @@ class NLPService {
 
       // Check for stemmed matches
       const stemmedWord = this.stemmer.stem(cleanWord);
-      for (const target of targetWords) {
-        const stemmedTarget = this.stemmer.stem(target.toLowerCase());
-        if (stemmedWord === stemmedTarget) {
-          found.push({
-            word: cleanWord,
-            originalWord: word,
-            position: index,
-            targetWord: target,
-            context: this.getWordContext(words, index),
-          });
-          processedPositions.add(index);
-          break;
-        }
+      if (targetStemMap.has(stemmedWord)) {
+        found.push({
+          word: cleanWord,
+          originalWord: word,
+          position: index,
+          targetWord: targetStemMap.get(stemmedWord),
+          context: this.getWordContext(words, index),
+        });
+        processedPositions.add(index);
       }
 
       // Check for multi-word phrases (up to 3 words)
@@ -236,18 +250,46 @@ class NLPService {
     return found;
   }
 
+  async findTargetWordsInTranscript(transcriptWords, targetWords) {
+    // One pass of the compiled Python matcher over the ASR words; null if it
+    // is unavailable, so the caller falls back to findTargetWords
+    const matches = await speechService.matchTargets(
+      transcriptWords,
+      targetWords
+    );
+    if (!matches) {
+      return null;
+    }
+
+    const words = transcriptWords.map((word) => String(word.word).trim());
+    return matches.map((match) => ({
+      word: match.word.toLowerCase().replace(/[^\w\s'-]/g, ""),
+      originalWord: match.word,
+      position: match.position,
+      targetWord: match.targetWord,
+      matchType: match.matchType,
+      startTime: match.startTime,
+      endTime: match.endTime,
+      context: this.getWordContext(words, match.position, match.length),
+    }));
+  }
+
   generateReplacements(wordsFound) {
     return wordsFound.map((item) => {
       const word = item.word.toLowerCase();
-      const suggestions = this.replacementSuggestions[word] || [
-        "[BEEP]",
-        "*****",
-      ];
+      const suggestions =
+        this.replacementSuggestions[word] ||
+        this.replacementSuggestions[(item.targetWord || "").toLowerCase()] || [
+          "[BEEP]",
+          "*****",
+        ];
 
       return {
         originalWord: item.originalWord,
         word: item.word,
         position: item.position,
+        startTime: item.startTime,
+        endTime: item.endTime,
         suggestions: suggestions,
         recommended: suggestions[0] || "[BEEP]",
         context: item.context,
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Render cache for incremental re-splicing
+Every audio file gets a render directory next to it holding its decoded PCM,
+the spliced regions of its last render and a manifest describing them, so a
+new render of the same file only re-splices the regions whose replacements
+changed and copies everything else
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+RENDER_SUFFIX = ".render"
+# Decoded sources larger than this (about 25 minutes of 44.1 kHz stereo) are
+# not kept, and are decoded again on every render instead
+MAX_SOURCE_BYTES = int(os.environ.get("RENDER_CACHE_MAX_SOURCE_MB", "256")) * 1024 * 1024
+
+def render_dir_for(audio_path):
+    """Render directory of an audio file"""
+    return audio_path + RENDER_SUFFIX
+
+def file_digest(path):
+    """Hash of a file's contents"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def region_key(*parts):
+    """Cache key of a rendered region: a hash of everything its audio depends on"""
+    return hashlib.blake2b(json.dumps(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+class RenderCache:
+    """Decoded source PCM and rendered regions of one audio file, as raw int16 frames"""
+
+    def __init__(self, render_dir, sample_rate, channels, max_source_bytes=None):
+        self.render_dir = os.path.abspath(render_dir)
+        self.regions_dir = os.path.join(self.render_dir, "regions")
+        self.source_path = os.path.join(self.render_dir, "source.pcm")
+        self.manifest_path = os.path.join(self.render_dir, "manifest.json")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_source_bytes = MAX_SOURCE_BYTES if max_source_bytes is None else max_source_bytes
+
+        os.makedirs(self.regions_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def load_source(self, source_hash, decode):
+        """
+        Return (PCM frames of the source as a read-only memmap, whether it was decoded)
+        decode() is only called when the source changed since the last render, in
+        which case the regions rendered from the old source are dropped, or when
+        it is over max_source_bytes and was not kept (then the frames are
+        returned as they were decoded)
+        """
+        if self.manifest.get("sourceHash") == source_hash and os.path.exists(self.source_path):
+            return self._map(self.source_path), False
+
+        audio = decode()
+        if self.manifest.get("sourceHash") != source_hash:
+            self.manifest = self._empty_manifest()
+            self.manifest["sourceHash"] = source_hash
+            self._write_manifest()
+            self.prune(set())
+
+        if audio.nbytes > self.max_source_bytes:
+            self._remove(self.source_path)
+            return audio, True
+        self._write_frames(self.source_path, audio)
+        return self._map(self.source_path), True
+
+    def region(self, key):
+        """A rendered region as a read-only memmap, or None if it is not cached"""
+        try:
+            return self._map(self._region_path(key))
+        except FileNotFoundError:
+            return None
+
+    def store_region(self, key, audio):
+        self._write_frames(self._region_path(key), audio)
+
+    def save(self, manifest):
+        """Record the manifest of a finished render and drop the regions it no longer uses"""
+        self.manifest = dict(self._empty_manifest(), **manifest)
+        self._write_manifest()
+        self.prune({region["key"] for region in self.manifest["regions"] if region.get("cached")})
+
+    def prune(self, keep):
+        """Delete the cached regions whose keys are not in keep"""
+        for name in os.listdir(self.regions_dir):
+            # Temporary files belong to renders still in progress
+            if name.endswith(".pcm") and name[:-len(".pcm")] not in keep:
+                self._remove(os.path.join(self.regions_dir, name))
+
+    def _remove(self, path):
+        # Renders that mapped the file keep their pages; where a mapped file
+        # cannot be removed (Windows) it is left for the next prune
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _region_path(self, key):
+        return os.path.join(self.regions_dir, f"{key}.pcm")
+
+    def _map(self, path):
+        if os.path.getsize(path) == 0:
+            return np.zeros((0, self.channels), dtype=np.int16)
+        return np.memmap(path, dtype=np.int16, mode="r").reshape(-1, self.channels)
+
+    def _write_frames(self, path, audio):
+        # Replaced atomically, so concurrent renders never read a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as pcm_file:
+            pcm_file.write(np.ascontiguousarray(audio, dtype=np.int16).tobytes())
+        os.replace(temp_path, path)
+
+    def _empty_manifest(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "sampleRate": self.sample_rate,
+            "channels": self.channels,
+            "sourceHash": None,
+            "replacements": [],
+            "regions": []
+        }
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+            if (manifest.get("version") == MANIFEST_VERSION and manifest.get("sampleRate") == self.sample_rate
+                    and manifest.get("channels") == self.channels):
+                return manifest
+            logger.warning("Render manifest has another version or format, ignoring it")
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.warning(f"Render manifest is unreadable, ignoring it: {e}")
+        return self._empty_manifest()
+
+    def _write_manifest(self):
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, separators=(",", ":"))
+        os.replace(temp_path, self.manifest_path)
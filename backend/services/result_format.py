@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compact columnar encoding of transcription results
+The word list becomes parallel columns instead of one object per word: the
+words as one newline-separated table, the times and confidences as base64
+float32 buffers, and the sources as indexes into an interned table
+"""
+
+import sys
+import base64
+from array import array
+
+OUTPUT_FORMATS = ["json", "columnar"]
+# Word fields stored as float32 columns; missing values are NaN
+FLOAT_COLUMNS = ("startTime", "endTime", "confidence")
+STANDARD_FIELDS = ("word", "source") + FLOAT_COLUMNS
+
+def _encode_array(typecode, values):
+    """Base64 of the values packed little-endian with an array typecode"""
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+def encode_words(words):
+    """
+    Encode a word list as columns:
+    {"count", "word": "w1\\nw2...", "startTime"/"endTime"/"confidence": base64
+    float32, "sources": [...], "source": base64 uint16 indexes into sources}
+    Fields other than the standard ones are kept as plain arrays under "extra"
+    """
+    sources = []
+    source_index = {}
+    source_ids = array("H")
+    for word in words:
+        source = word.get("source")
+        if source not in source_index:
+            source_index[source] = len(sources)
+            sources.append(source)
+        source_ids.append(source_index[source])
+
+    columns = {
+        "count": len(words),
+        # Words never contain newlines in practice; replace any so the table stays aligned
+        "word": "\n".join(str(word.get("word", "")).replace("\n", " ") for word in words),
+        "sources": sources,
+        "source": _encode_array("H", source_ids)
+    }
+    nan = float("nan")
+    for name in FLOAT_COLUMNS:
+        columns[name] = _encode_array("f", [
+            nan if word.get(name) is None else word[name] for word in words
+        ])
+
+    extra_fields = []
+    for word in words:
+        for field in word:
+            if field not in STANDARD_FIELDS and field not in extra_fields:
+                extra_fields.append(field)
+    if extra_fields:
+        columns["extra"] = {field: [word.get(field) for word in words] for field in extra_fields}
+    return columns
+
+def to_output_format(result, output_format="json"):
+    """
+    Return the result in the requested output format
+    "columnar" encodes the words of the result and of its alternatives and
+    marks the result with "format": "columnar"; "json" returns it unchanged
+    """
+    if output_format != "columnar" or not isinstance(result.get("words"), list):
+        return result
+
+    encoded = dict(result, format="columnar", words=encode_words(result["words"]))
+    if isinstance(result.get("alternatives"), list):
+        encoded["alternatives"] = [
+            dict(alternative, words=encode_words(alternative["words"]))
+            if isinstance(alternative.get("words"), list) else alternative
+            for alternative in result["alternatives"]
+        ]
+    return encoded
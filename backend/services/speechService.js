@@ -7,6 +7,28 @@ class SpeechService {
   constructor() {
     this.pythonPath = "python";
     this.scriptPath = path.join(__dirname, "speech_recognition_script.py");
+
+    // Persistent transcription worker (speech_recognition_script.py --serve)
+    // keeps the models loaded between requests
+    this.useWorker = process.env.SPEECH_WORKER !== "false";
+    this.worker = null;
+    this.pendingJobs = new Map();
+    this.nextJobId = 0;
+
+    // Per-stage wall time, CPU time and memory in every result
+    // (SPEECH_METRICS=true), and optional cProfile dumps (SPEECH_PROFILE_DIR)
+    this.instrumentationArgs = [];
+    if (process.env.SPEECH_METRICS === "true") {
+      this.instrumentationArgs.push("--metrics");
+    }
+    if (process.env.SPEECH_PROFILE_DIR) {
+      this.instrumentationArgs.push("--profile", process.env.SPEECH_PROFILE_DIR);
+    }
+
+    // Results come back with their words as compact columns (see
+    // result_format.py) and are expanded here; SPEECH_OUTPUT_FORMAT=json
+    // asks for one object per word instead
+    this.outputFormat = process.env.SPEECH_OUTPUT_FORMAT || "columnar";
   }
 
   async transcribeAudio(audioFilePath) {
@@ -30,7 +52,7 @@ class SpeechService {
 
       try {
         // Run Python speech recognition script
-        const result = await this.runPythonScript(audioFilePath);
+        const result = await this.runTranscription(audioFilePath);
 
         // Validate word timestamps
         if (result.words && result.words.length > 0) {
@@ -55,6 +77,10 @@ class SpeechService {
         console.log("✅ Real speech-to-text transcription completed");
         return result;
       } catch (error) {
+        // Backpressure: let the caller ask the client to retry later
+        if (error.queueFull) {
+          throw error;
+        }
         console.log(
           "⚠️ Real transcription failed, falling back to mock data:",
           error.message
@@ -68,6 +94,9 @@ class SpeechService {
             // These are free alternatives that provide excellent word timestamps.
             */
     } catch (error) {
+      if (error.queueFull) {
+        throw error;
+      }
       console.error("Speech transcription error:", error);
 
       // Fallback to mock data if real transcription fails
@@ -162,18 +191,329 @@ class SpeechService {
     });
   }
 
-  async runPythonScript(audioFilePath) {
+  async spotKeywords(audioFilePath, keywords) {
+    // Keyword-spotting fast path: only timestamps for the target words
+    console.log(`Spotting ${keywords.length} keywords in: ${audioFilePath}`);
+    return this.runTranscription(audioFilePath, { keywords: keywords }, [
+      "--keywords",
+      keywords.join(","),
+    ]);
+  }
+
+  async streamTranscription(audioFilePath, onEvent) {
+    // Streaming Vosk transcription: onEvent receives "words", "partial" and
+    // "progress" events while the file is still being decoded, so work on the
+    // first words can start early. Resolves with the complete result.
+    console.log(`Streaming transcription for: ${audioFilePath}`);
+    return this.runTranscription(
+      audioFilePath,
+      { stream: true },
+      ["--stream"],
+      onEvent
+    );
+  }
+
+  async runTranscription(
+    audioFilePath,
+    jobOptions = {},
+    scriptArgs = [],
+    onEvent = null
+  ) {
+    if (this.useWorker) {
+      try {
+        return this.expandColumnarResult(
+          await this.runWorkerJob(
+            audioFilePath,
+            { ...jobOptions, format: this.outputFormat },
+            onEvent
+          )
+        );
+      } catch (error) {
+        if (!error.workerFailure) {
+          throw error;
+        }
+        console.log(
+          "⚠️ Transcription worker unavailable, running one-off script:",
+          error.message
+        );
+      }
+    }
+
+    // Processes started per request share the machine-wide job queue, so a
+    // burst of requests cannot overload the machine
+    return this.expandColumnarResult(
+      await this.runPythonScript(
+        audioFilePath,
+        [...scriptArgs, "--format", this.outputFormat, "--queue"],
+        onEvent
+      )
+    );
+  }
+
+  expandColumnarResult(result) {
+    // Turn the word columns of a "columnar" result back into word objects
+    if (!result || result.format !== "columnar") {
+      return result;
+    }
+
+    const expandWords = (columns) => {
+      const words = columns.count ? columns.word.split("\n") : [];
+      const floatColumn = (name) => {
+        const bytes = Buffer.from(columns[name], "base64");
+        return (index) => bytes.readFloatLE(index * 4);
+      };
+      const startTime = floatColumn("startTime");
+      const endTime = floatColumn("endTime");
+      const confidence = floatColumn("confidence");
+      const sources = Buffer.from(columns.source, "base64");
+      const extra = columns.extra || {};
+
+      return words.map((word, index) => {
+        const expanded = { word };
+        const times = {
+          startTime: startTime(index),
+          endTime: endTime(index),
+          confidence: confidence(index),
+        };
+        // float32 keeps about 7 significant digits, which drops the noise
+        // of widening to a double; NaN marks a missing value
+        for (const [name, value] of Object.entries(times)) {
+          if (!Number.isNaN(value)) {
+            expanded[name] = Number(value.toPrecision(7));
+          }
+        }
+        expanded.source = columns.sources[sources.readUInt16LE(index * 2)];
+        for (const [name, values] of Object.entries(extra)) {
+          expanded[name] = values[index];
+        }
+        return expanded;
+      });
+    };
+
+    const { format: _format, ...expanded } = result;
+    expanded.words = expandWords(result.words);
+    if (Array.isArray(result.alternatives)) {
+      expanded.alternatives = result.alternatives.map((alternative) =>
+        alternative.words && !Array.isArray(alternative.words)
+          ? { ...alternative, words: expandWords(alternative.words) }
+          : alternative
+      );
+    }
+    return expanded;
+  }
+
+  getWorker() {
+    if (this.worker) {
+      return this.worker;
+    }
+
+    // --warmup runs every stage once before the worker reports ready,
+    // so the first real request does not pay for imports and model loading
+    const worker = spawn(this.pythonPath, [
+      this.scriptPath,
+      "--serve",
+      "--warmup",
+      ...this.instrumentationArgs,
+    ]);
+    let buffer = "";
+
+    worker.stdout.on("data", (data) => {
+      buffer += data.toString();
+
+      let newlineIndex;
+      while ((newlineIndex = buffer.indexOf("\n")) !== -1) {
+        const line = buffer.slice(0, newlineIndex).trim();
+        buffer = buffer.slice(newlineIndex + 1);
+        if (line) {
+          this.handleWorkerMessage(line, worker);
+        }
+      }
+    });
+
+    // Drain stderr so the worker never blocks on a full pipe
+    worker.stderr.on("data", () => {});
+    // Write errors surface through the "close" handler below
+    worker.stdin.on("error", () => {});
+
+    const onExit = (reason) => {
+      if (this.worker === worker) {
+        this.worker = null;
+      }
+      this.failPendingJobs(reason);
+    };
+
+    worker.on("close", (code) => {
+      // A worker that cannot start (e.g. a model is not installed) says why
+      const reason = worker.startupError
+        ? `: ${worker.startupError}`
+        : "";
+      onExit(`Transcription worker exited with code ${code}${reason}`);
+    });
+
+    worker.on("error", (error) => {
+      onExit(`Failed to start transcription worker: ${error.message}`);
+    });
+
+    this.worker = worker;
+    return worker;
+  }
+
+  handleWorkerMessage(line, worker) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (parseError) {
+      console.error("Failed to parse transcription worker output:", line);
+      return;
+    }
+
+    if (message.event === "error") {
+      console.error("❌ Transcription worker failed to start:", message.error);
+      worker.startupError = message.error;
+      return;
+    }
+
+    if (message.event === "ready") {
+      console.log(
+        `✅ Transcription worker ready (${message.workers || 1} workers)`,
+        message.warmup || ""
+      );
+      return;
+    }
+
+    const job = this.pendingJobs.get(message.id);
+    if (!job) {
+      return;
+    }
+
+    if (message.event === "queued") {
+      console.log(
+        `🕒 Transcription job ${message.id} queued at position ${message.position}` +
+          ` (${message.queueDepth} waiting, ${message.running} running` +
+          `${message.deduplicated ? ", sharing an identical job" : ""})`
+      );
+    }
+
+    // Streaming jobs report intermediate events before their final result
+    if (message.event) {
+      if (job.onEvent) {
+        job.onEvent(message);
+      }
+      return;
+    }
+    this.pendingJobs.delete(message.id);
+
+    if (message.error) {
+      job.reject(this.createJobError(message));
+    } else {
+      if (message.timings) {
+        console.log("⏱️ Transcription timings:", message.timings);
+      }
+      if (message.metrics) {
+        console.log(
+          "📊 Transcription metrics:",
+          JSON.stringify(message.metrics)
+        );
+      }
+      job.resolve(message);
+    }
+  }
+
+  createJobError(message) {
+    // Rejected because the job queue is full: carries the queue statistics
+    const error = new Error(message.error);
+    if (message.queueFull) {
+      error.queueFull = true;
+      error.queueStats = message.queueStats;
+    }
+    return error;
+  }
+
+  failPendingJobs(reason) {
+    for (const job of this.pendingJobs.values()) {
+      const error = new Error(reason);
+      error.workerFailure = true;
+      job.reject(error);
+    }
+    this.pendingJobs.clear();
+  }
+
+  runWorkerJob(audioFilePath, jobOptions = {}, onEvent = null) {
+    return this.runWorkerCommand(
+      { ...jobOptions, audio_file: audioFilePath },
+      onEvent
+    );
+  }
+
+  runWorkerCommand(command, onEvent = null) {
+    return new Promise((resolve, reject) => {
+      const worker = this.getWorker();
+      const id = String(++this.nextJobId);
+
+      this.pendingJobs.set(id, { resolve, reject, onEvent });
+      worker.stdin.write(JSON.stringify({ ...command, id: id }) + "\n");
+    });
+  }
+
+  async matchTargets(words, targets) {
+    // Target words and phrases matched over timestamped transcript words by
+    // the worker's compiled matcher (target_matcher.py). Resolves with
+    // matches carrying startTime/endTime, or null without a worker.
+    if (!this.useWorker) {
+      return null;
+    }
+    try {
+      const result = await this.runWorkerCommand({
+        command: "match_targets",
+        words: words,
+        targets: targets,
+      });
+      return result.targetMatches;
+    } catch (error) {
+      console.log("⚠️ Target matching unavailable:", error.message);
+      return null;
+    }
+  }
+
+  async runPythonScript(audioFilePath, scriptArgs = [], onEvent = null) {
     return new Promise((resolve, reject) => {
       const pythonProcess = spawn(this.pythonPath, [
         this.scriptPath,
         audioFilePath,
+        ...scriptArgs,
+        ...this.instrumentationArgs,
       ]);
 
       let output = "";
       let errorOutput = "";
+      let buffer = "";
 
       pythonProcess.stdout.on("data", (data) => {
-        output += data.toString();
+        if (!onEvent) {
+          output += data.toString();
+          return;
+        }
+
+        // Streaming output: one JSON line per event, the result comes last
+        buffer += data.toString();
+        let newlineIndex;
+        while ((newlineIndex = buffer.indexOf("\n")) !== -1) {
+          const line = buffer.slice(0, newlineIndex).trim();
+          buffer = buffer.slice(newlineIndex + 1);
+          if (!line) {
+            continue;
+          }
+          try {
+            const message = JSON.parse(line);
+            if (message.event) {
+              onEvent(message);
+              continue;
+            }
+          } catch (parseError) {
+            // Left for the final parse below to report
+          }
+          output = line;
+        }
       });
 
       pythonProcess.stderr.on("data", (data) => {
@@ -181,6 +521,9 @@ class SpeechService {
       });
 
       pythonProcess.on("close", (code) => {
+        if (onEvent && buffer.trim()) {
+          output = buffer;
+        }
         if (code === 0) {
           try {
             const result = JSON.parse(output);
@@ -197,6 +540,15 @@ class SpeechService {
             );
           }
         } else {
+          try {
+            const result = JSON.parse(output);
+            if (result.queueFull) {
+              reject(this.createJobError(result));
+              return;
+            }
+          } catch (parseError) {
+            // Not a queue rejection; report the script failure below
+          }
           reject(
             new Error(`Python script failed with code ${code}: ${errorOutput}`)
           );
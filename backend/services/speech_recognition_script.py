@@ -6,117 +6,500 @@ Supports accurate word timestamps and multiple audio formats
 
 import sys
 import json
-from pydub import AudioSegment
 import tempfile
 import os
 import logging
-import numpy as np
-from scipy.io import wavfile
-from scipy.signal import find_peaks, butter, filtfilt
 import re
+import math
 import time
+import argparse
+import queue
+from collections import Counter
 import subprocess
 import shutil
-from pathlib import Path
+import importlib.util
+
+from stage_metrics import stage, instrumented
+from result_format import OUTPUT_FORMATS, to_output_format
+from target_matcher import compile_targets
+from model_store import ModelNotInstalled, load_whisper_model, open_model_store, whisper_model_name
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def convert_to_wav(input_file):
-    """Convert audio file to WAV format for speech recognition"""
+# Models are loaded from the model store only (see model_store.py)
+VOSK_MODEL_NAME = "vosk-small-en-us"
+WHISPER_MODEL_NAME = "base"
+LANGUAGE = "en"
+
+# Adaptive strategy: transcribe with the fast model, re-decode only the
+# segments whose confidence is below the threshold with the larger model
+WHISPER_FAST_MODEL_NAME = "tiny"
+WHISPER_ESCALATION_MODEL_NAME = "small"
+ESCALATION_CONFIDENCE_THRESHOLD = 0.6
+
+# CPU inference: with WHISPER_MODEL=auto the largest of these models whose
+# estimated run time meets the latency target is used. The factors are rough
+# seconds of fp32 compute per second of audio with WHISPER_REFERENCE_THREADS
+# threads; int8 quantisation of the Linear layers is about WHISPER_INT8_SPEEDUP
+# times faster.
+WHISPER_AUTO_MODELS = ["tiny", "base", "small"]
+WHISPER_REALTIME_FACTORS = {"tiny": 0.04, "base": 0.08, "small": 0.25}
+WHISPER_REFERENCE_THREADS = 4
+WHISPER_INT8_SPEEDUP = 1.6
+# Intra-op threads per process when WHISPER_THREADS is not set. Torch defaults
+# to one per core, which makes concurrent requests thrash.
+WHISPER_DEFAULT_MAX_THREADS = 4
+
+# Part of the transcription cache key; bump whenever the result format or the
+# recognition pipeline changes so that stale cached results are not returned
+TRANSCRIPTION_VERSION = 3
+
+# All engines and analysis stages work on 16 kHz mono 16-bit PCM
+SAMPLE_RATE = 16000
+DECODE_CHUNK_BYTES = 1024 * 1024
+# Decoded audio larger than this is spilled to a memory-mapped scratch file
+MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# Voice activity detection works on a frame envelope computed block by block
+VAD_FRAME_SECONDS = 0.01
+VAD_BLOCK_SECONDS = 10
+# Envelopes below this level (about -60 dBFS) are treated as silence
+VAD_MIN_LEVEL = 1e-3
+
+# Vosk is fed blocks of this many samples; streaming mode reports the partial
+# hypothesis and the decoding progress at these intervals of audio
+VOSK_BLOCK_SAMPLES = 4000
+STREAM_PARTIAL_SECONDS = 1.0
+STREAM_PROGRESS_SECONDS = 5.0
+
+# Audio around each keyword hit that Whisper re-decodes to confirm it
+KEYWORD_CONFIRM_PADDING_SECONDS = 0.5
+
+# Words without timings are aligned to the speech regions, and the cuts between
+# two words snapped to dips in the speech envelope closer than ALIGN_SNAP_SECONDS
+ALIGN_SNAP_SECONDS = 0.08
+ALIGN_MIN_WORD_SECONDS = 0.05
+
+# Long recordings are split at silences and transcribed in parallel
+LONG_AUDIO_MODES = ["auto", "on", "off"]
+LONG_AUDIO_MIN_SECONDS = 300
+LONG_AUDIO_CHUNK_SECONDS = 30
+# Audio added on both sides of a chunk so words at the cut are not clipped
+CHUNK_PADDING_SECONDS = 0.5
+
+# Batch mode and the job queue size their worker pools by cores and by
+# available memory, assuming each worker holds about this much (loaded models
+# plus decoded audio). Memory-mapped model weights are shared by all workers,
+# so they are counted once rather than per worker (see worker_memory).
+BATCH_WORKER_MEMORY_BYTES = 1536 * 1024 * 1024
+# Queued jobs are prioritised by audio duration; without ffprobe it is
+# estimated from the file size at this many bytes per second (128 kbit/s)
+ESTIMATED_BYTES_PER_SECOND = 16000
+
+# Loaded models, kept for the lifetime of the process so that --serve mode
+# only pays the model loading cost once
+_model_cache = {}
+
+# Opened on first use, like the engines, so importing the script or handling a
+# usage error never touches MODEL_STORE_DIR
+_model_store = None
+
+def model_store():
+    """The model store at MODEL_STORE_DIR, opened on first use"""
+    global _model_store
+    if _model_store is None:
+        _model_store = open_model_store()
+    return _model_store
+
+def installed_model_path(model_name):
+    """Path of a model in the model store; raises ModelNotInstalled, it never downloads"""
+    return model_store().model_path(model_name)
+
+def whisper_config_from_env():
+    """
+    Whisper CPU inference settings from the environment: WHISPER_MODEL (a model
+    name, or "auto" to choose by duration), WHISPER_THREADS, WHISPER_INT8 and
+    WHISPER_LATENCY_TARGET (seconds). Pool workers inherit them.
+    """
+    threads = int(os.environ.get("WHISPER_THREADS") or 0)
+    return {
+        "model": os.environ.get("WHISPER_MODEL", WHISPER_MODEL_NAME),
+        "threads": threads if threads > 0 else min(os.cpu_count() or 1, WHISPER_DEFAULT_MAX_THREADS),
+        "int8": os.environ.get("WHISPER_INT8", "off").lower() in ("on", "true", "1"),
+        "latencyTarget": float(os.environ.get("WHISPER_LATENCY_TARGET") or 0) or None
+    }
+
+WHISPER_CONFIG = whisper_config_from_env()
+
+def choose_whisper_model(duration, config=None):
+    """
+    Resolve the configured model name for audio of the given duration
+    "auto" picks the largest model expected to finish within the latency target,
+    falling back to the smallest, or WHISPER_MODEL_NAME if there is no target
+    """
+    config = config or WHISPER_CONFIG
+    if config["model"] != "auto":
+        return config["model"]
+    if not config["latencyTarget"]:
+        return WHISPER_MODEL_NAME
+    
+    # Whisper scales poorly past a few threads, so extra threads are not counted
+    speedup = min(config["threads"], WHISPER_REFERENCE_THREADS) / WHISPER_REFERENCE_THREADS
+    if config["int8"]:
+        speedup *= WHISPER_INT8_SPEEDUP
+    
+    chosen = WHISPER_AUTO_MODELS[0]
+    for model_name in WHISPER_AUTO_MODELS:
+        if duration * WHISPER_REALTIME_FACTORS[model_name] / speedup <= config["latencyTarget"]:
+            chosen = model_name
+    return chosen
+
+def configure_torch_threads(threads):
+    """Limit torch's intra-op thread pool in this process, if torch is installed"""
     try:
-        logger.info(f"Converting {input_file} to WAV format...")
-        
-        # Detect file format and convert
-        file_extension = os.path.splitext(input_file)[1].lower()
-        
-        if file_extension == '.mp3':
-            audio = AudioSegment.from_mp3(input_file)
-        elif file_extension == '.m4a':
-            audio = AudioSegment.from_file(input_file, "m4a")
-        elif file_extension == '.mp4':
-            audio = AudioSegment.from_file(input_file, "mp4")
-        elif file_extension == '.ogg':
-            audio = AudioSegment.from_ogg(input_file)
-        elif file_extension == '.wav':
-            audio = AudioSegment.from_wav(input_file)
-        else:
-            # Try to auto-detect format
-            audio = AudioSegment.from_file(input_file)
-        
-        # Convert to mono and set sample rate for better recognition
-        audio = audio.set_channels(1).set_frame_rate(16000)
+        import torch
+    except ImportError:
+        return
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+def get_whisper_model(model_name=WHISPER_MODEL_NAME, int8=None):
+    """
+    Load a Whisper model from the model store, reusing an already loaded
+    instance if available. Its weights are memory-mapped and shared with the
+    other processes that load the same model.
+    With int8 (default: WHISPER_CONFIG) the Linear layers are dynamically
+    quantised to int8, which is faster on CPU at a small accuracy cost; the
+    quantised weights are private to the process
+    """
+    if int8 is None:
+        int8 = WHISPER_CONFIG["int8"]
+    key = ("whisper", model_name, int8)
+    if key not in _model_cache:
+        checkpoint_path = installed_model_path(whisper_model_name(model_name))
+        configure_torch_threads(WHISPER_CONFIG["threads"])
+        logger.info(f"Loading Whisper model '{model_name}'{' (int8)' if int8 else ''}...")
+        with stage("whisper_model_load"):
+            model = load_whisper_model(checkpoint_path)
+            if int8:
+                import torch
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        _model_cache[key] = model
+    return _model_cache[key]
+
+def whisper_transcribe(model, audio_data, threads=None):
+    """
+    Transcribe 16 kHz PCM samples with word timestamps on the CPU
+    fp16 is disabled explicitly: CPU inference always runs in fp32 (or int8),
+    and otherwise Whisper warns and falls back on every call
+    """
+    configure_torch_threads(threads or WHISPER_CONFIG["threads"])
+    return model.transcribe(pcm_to_float32(audio_data), language=LANGUAGE, word_timestamps=True, fp16=False)
+
+def get_vosk_model(model_path=None):
+    """
+    Load a Vosk model (default: VOSK_MODEL_NAME from the model store), reusing
+    an already loaded instance if available
+    """
+    from vosk import Model
+    model_path = model_path or installed_model_path(VOSK_MODEL_NAME)
+    key = ("vosk", model_path)
+    if key not in _model_cache:
+        logger.info(f"Loading Vosk model from {model_path}...")
+        with stage("vosk_model_load"):
+            _model_cache[key] = Model(model_path)
+    return _model_cache[key]
+
+def ffmpeg_decode_command(ffmpeg_path, input_file, sample_rate=SAMPLE_RATE):
+    """ffmpeg command writing the input as mono 16-bit PCM to stdout"""
+    return [
+        ffmpeg_path, "-nostdin", "-v", "error",
+        "-i", input_file,
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+
+def decode_audio(input_file, sample_rate=SAMPLE_RATE):
+    """
+    Decode an audio file into a mono 16-bit PCM NumPy array at the given sample rate
+    
+    PCM is streamed from an ffmpeg subprocess straight into memory, so nothing is
+    written to disk for typical uploads. Inputs that decode to more than
+    MMAP_THRESHOLD_BYTES are spilled to an anonymous scratch file which is then
+    memory-mapped.
+    """
+    import numpy as np
+    
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        logger.info("ffmpeg not found on PATH, decoding with pydub")
+        return decode_audio_with_pydub(input_file, sample_rate)
+    
+    logger.info(f"Decoding {input_file} to {sample_rate} Hz mono PCM...")
+    
+    command = ffmpeg_decode_command(ffmpeg_path, input_file, sample_rate)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    buffer = bytearray()
+    scratch = None
+    try:
+        while True:
+            chunk = process.stdout.read(DECODE_CHUNK_BYTES)
+            if not chunk:
+                break
+            
+            if scratch is None:
+                buffer.extend(chunk)
+                if len(buffer) > MMAP_THRESHOLD_BYTES:
+                    logger.info("Decoded audio is large, spilling to a memory-mapped scratch file")
+                    scratch = tempfile.TemporaryFile()
+                    scratch.write(buffer)
+                    buffer = None
+            else:
+                scratch.write(chunk)
         
-        # Create temporary WAV file
-        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        audio.export(temp_wav.name, format="wav")
+        error_output = process.stderr.read()
+        process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        if scratch is not None:
+            scratch.close()
+        raise
+    
+    if process.returncode != 0:
+        if scratch is not None:
+            scratch.close()
+        message = error_output.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed to decode {input_file}: {message}")
+    
+    if scratch is None:
+        usable_bytes = len(buffer) - len(buffer) % 2
+        audio_data = np.frombuffer(memoryview(buffer)[:usable_bytes], dtype=np.int16)
+    else:
+        scratch.flush()
+        sample_count = scratch.tell() // 2
+        # The mapping stays valid after the scratch file is closed
+        audio_data = np.memmap(scratch, dtype=np.int16, mode="r", shape=(sample_count,))
+        scratch.close()
+    
+    logger.info(f"Decoded {len(audio_data) / sample_rate:.2f}s of audio")
+    return audio_data
+
+def stream_audio_blocks(input_file, sample_rate=SAMPLE_RATE, block_samples=VOSK_BLOCK_SAMPLES):
+    """
+    Decode an audio file incrementally, yielding mono 16-bit PCM blocks of
+    block_samples samples (the last block may be shorter) as ffmpeg produces them
+    Without ffmpeg the file is decoded in one go with pydub and then sliced.
+    """
+    import numpy as np
+    
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        audio_data = decode_audio_with_pydub(input_file, sample_rate)
+        for start in range(0, len(audio_data), block_samples):
+            yield audio_data[start:start + block_samples]
+        return
+    
+    command = ffmpeg_decode_command(ffmpeg_path, input_file, sample_rate)
+    # stderr goes to a scratch file so a chatty ffmpeg can never fill the pipe
+    with tempfile.TemporaryFile() as error_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=error_file)
+        try:
+            block_bytes = block_samples * 2
+            while True:
+                block = process.stdout.read(block_bytes)
+                if not block:
+                    break
+                # Pipe reads may return less than requested; keep whole samples only
+                while len(block) % 2:
+                    more = process.stdout.read(1)
+                    if not more:
+                        block = block[:-1]
+                        break
+                    block += more
+                yield np.frombuffer(block, dtype=np.int16)
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
         
-        logger.info(f"Successfully converted to WAV: {temp_wav.name}")
-        return temp_wav.name
+        if process.returncode != 0:
+            error_file.seek(0)
+            message = error_file.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode {input_file}: {message}")
+
+def probe_duration(input_file):
+    """Duration of an audio file in seconds according to ffprobe, or None"""
+    ffprobe_path = shutil.which("ffprobe")
+    if not ffprobe_path:
+        return None
+    
+    try:
+        process = subprocess.run(
+            [ffprobe_path, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", input_file],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30
+        )
+        return float(process.stdout.decode().strip())
+    except (subprocess.SubprocessError, ValueError):
+        return None
+
+def estimate_audio_seconds(input_file):
+    """Duration of an audio file for scheduling: ffprobe's, or estimated from the file size"""
+    duration = probe_duration(input_file)
+    if duration is None:
+        duration = os.path.getsize(input_file) / ESTIMATED_BYTES_PER_SECOND
+    return duration
+
+def decode_audio_with_pydub(input_file, sample_rate=SAMPLE_RATE):
+    """Decode an audio file with pydub (used when ffmpeg is not on PATH)"""
+    import numpy as np
+    from pydub import AudioSegment
+    
+    audio = AudioSegment.from_file(input_file)
+    audio = audio.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return np.array(audio.get_array_of_samples(), dtype=np.int16)
+
+def pcm_to_float32(audio_data):
+    """Convert 16-bit PCM samples to float32 in the range [-1, 1]"""
+    import numpy as np
+    
+    return audio_data.astype(np.float32) / 32768.0
+
+def compute_speech_envelope(audio_data, sample_rate=SAMPLE_RATE, frame_seconds=VAD_FRAME_SECONDS,
+                            block_seconds=VAD_BLOCK_SECONDS):
+    """
+    Frame-level RMS envelope of the speech band (300-3000 Hz), one value per frame
+    
+    The audio is band-pass filtered block by block in float32 with a stateful SOS
+    filter, so peak memory is proportional to the block size rather than to the
+    length of the file. Samples are scaled so that full scale 16-bit PCM is 1.0.
+    """
+    import numpy as np
+    from scipy.signal import butter, sosfilt
+    
+    frame_length = max(1, int(sample_rate * frame_seconds))
+    frames_per_block = max(1, int(block_seconds / frame_seconds))
+    frame_count = len(audio_data) // frame_length
+    
+    sos = butter(4, [300, 3000], btype='band', fs=sample_rate, output='sos').astype(np.float32)
+    state = np.zeros((sos.shape[0], 2), dtype=np.float32)
+    envelope = np.empty(frame_count, dtype=np.float32)
+    
+    for first in range(0, frame_count, frames_per_block):
+        last = min(first + frames_per_block, frame_count)
+        block = np.asarray(audio_data[first * frame_length:last * frame_length], dtype=np.float32)
+        block /= 32768.0
         
-    except Exception as e:
-        logger.error(f"Error converting audio file: {str(e)}")
-        raise
+        filtered, state = sosfilt(sos, block, zi=state)
+        frames = filtered.reshape(last - first, frame_length)
+        envelope[first:last] = np.sqrt(np.mean(frames * frames, axis=1))
+    
+    return envelope
+
+def smooth_envelope(envelope, frames):
+    """Moving average over a small number of frames"""
+    import numpy as np
+    
+    if frames <= 1 or len(envelope) == 0:
+        return envelope
+    kernel = np.ones(frames, dtype=np.float32) / frames
+    return np.convolve(envelope, kernel, mode='same')
 
-def detect_word_boundaries_enhanced(wav_file):
+def detect_speech_regions(audio_data, sample_rate=SAMPLE_RATE, min_speech_seconds=0.1,
+                          min_silence_seconds=0.15, padding_seconds=0.05):
     """
-    Enhanced word boundary detection using advanced audio analysis
-    Combines multiple techniques for better accuracy
+    Voice activity detection: find the regions of the audio that contain speech
+    
+    Frames are classified against an adaptive threshold between the noise floor
+    and the speech level of the recording. Pauses shorter than min_silence_seconds
+    are bridged, regions shorter than min_speech_seconds are dropped, and each
+    region is padded by padding_seconds.
+    Returns a list of {"startTime", "endTime"} dicts in seconds.
     """
+    import numpy as np
+    
     try:
-        logger.info("Performing enhanced word boundary detection...")
+        envelope = smooth_envelope(compute_speech_envelope(audio_data, sample_rate), 3)
+        if len(envelope) == 0:
+            return []
         
-        # Read the WAV file
-        sample_rate, audio_data = wavfile.read(wav_file)
+        noise_floor = float(np.percentile(envelope, 10))
+        speech_level = float(np.percentile(envelope, 95))
+        if speech_level < VAD_MIN_LEVEL:
+            return []
         
-        # Convert to mono if stereo
-        if len(audio_data.shape) > 1:
-            audio_data = audio_data.mean(axis=1)
+        threshold = max(noise_floor + 0.15 * (speech_level - noise_floor), VAD_MIN_LEVEL)
+        speech = envelope > threshold
         
-        # Apply bandpass filter to focus on speech frequencies (300-3000 Hz)
-        nyquist = 0.5 * sample_rate
-        low = 300 / nyquist
-        high = 3000 / nyquist
-        b, a = butter(4, [low, high], btype='band')
-        filtered_audio = filtfilt(b, a, audio_data)
+        # Frame indices where speech starts and stops
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], speech, [False])).astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+        if len(starts) == 0:
+            return []
         
-        # Calculate the audio envelope using multiple methods
-        # 1. Simple absolute value
-        audio_env1 = np.abs(filtered_audio)
+        # Bridge short pauses
+        long_gaps = (starts[1:] - ends[:-1]) * VAD_FRAME_SECONDS >= min_silence_seconds
+        starts = np.concatenate((starts[:1], starts[1:][long_gaps]))
+        ends = np.concatenate((ends[:-1][long_gaps], ends[-1:]))
         
-        # 2. Hilbert transform for better envelope detection
-        try:
-            from scipy.signal import hilbert
-            analytic_signal = hilbert(filtered_audio)
-            audio_env2 = np.abs(analytic_signal)
-        except ImportError:
-            audio_env2 = audio_env1
+        # Drop short blips
+        long_enough = (ends - starts) * VAD_FRAME_SECONDS >= min_speech_seconds
+        starts, ends = starts[long_enough], ends[long_enough]
         
-        # 3. Energy-based envelope
-        window_size = int(sample_rate * 0.01)  # 10ms window
-        audio_env3 = np.convolve(filtered_audio**2, np.ones(window_size)/window_size, mode='same')
+        audio_duration = len(audio_data) / sample_rate
+        start_times = np.maximum(starts * VAD_FRAME_SECONDS - padding_seconds, 0.0)
+        end_times = np.minimum(ends * VAD_FRAME_SECONDS + padding_seconds, audio_duration)
         
-        # Combine the three methods for better results
-        audio_env = (audio_env1 + audio_env2 + audio_env3) / 3
+        regions = [
+            {"startTime": round(float(start), 2), "endTime": round(float(end), 2)}
+            for start, end in zip(start_times, end_times)
+        ]
+        logger.info(f"Detected {len(regions)} speech regions")
+        return regions
         
-        # Apply a moving average filter to smooth the envelope
-        window_size = int(sample_rate * 0.02)  # 20ms window
-        audio_env_smooth = np.convolve(audio_env, np.ones(window_size)/window_size, mode='same')
+    except Exception as e:
+        logger.error(f"Error in speech region detection: {str(e)}")
+        return []
+
+def detect_word_boundaries_enhanced(audio_data, sample_rate=SAMPLE_RATE):
+    """
+    Enhanced word boundary detection using advanced audio analysis
+    Finds peaks in the band-passed speech envelope (see compute_speech_envelope)
+    Takes mono PCM samples as returned by decode_audio
+    """
+    import numpy as np
+    from scipy.signal import find_peaks
+    
+    try:
+        logger.info("Performing enhanced word boundary detection...")
+        
+        # Smooth the envelope over 20ms
+        envelope = smooth_envelope(compute_speech_envelope(audio_data, sample_rate), 2)
+        
+        peak_level = np.max(envelope) if len(envelope) else 0
+        if peak_level < VAD_MIN_LEVEL:
+            logger.info("No speech energy found")
+            return np.array([])
         
         # Normalize the envelope
-        audio_env_norm = audio_env_smooth / np.max(audio_env_smooth)
+        envelope_norm = envelope / peak_level
         
         # Find peaks in the envelope (potential word boundaries)
         # Use adaptive thresholding
-        threshold = np.mean(audio_env_norm) * 1.5
-        min_distance = int(sample_rate * 0.15)  # Minimum 150ms between words
+        threshold = np.mean(envelope_norm) * 1.5
+        min_distance = max(1, int(0.15 / VAD_FRAME_SECONDS))  # Minimum 150ms between words
         
-        peaks, properties = find_peaks(audio_env_norm, height=threshold, distance=min_distance, 
-                                      prominence=0.1, width=5)
+        peaks, properties = find_peaks(envelope_norm, height=threshold, distance=min_distance,
+                                       prominence=0.1)
         
-        # Convert peak indices to time in seconds
-        peak_times = peaks / sample_rate
+        # Convert peak frame indices to time in seconds (frame centres)
+        peak_times = (peaks + 0.5) * VAD_FRAME_SECONDS
         
         # Add start and end times
         if len(peak_times) > 0:
@@ -134,90 +517,125 @@ def detect_word_boundaries_enhanced(wav_file):
         logger.error(f"Error in enhanced word boundary detection: {str(e)}")
         return np.array([])
 
-def try_vosk_recognition(wav_file):
+def detect_word_gaps(audio_data, sample_rate=SAMPLE_RATE):
+    """
+    Times of the dips in the speech envelope, where one word fades out before
+    the next: the envelope minima between the peaks that
+    detect_word_boundaries_enhanced finds
+    """
+    import numpy as np
+    from scipy.signal import find_peaks
+    
+    envelope = smooth_envelope(compute_speech_envelope(audio_data, sample_rate), 2)
+    peak_level = np.max(envelope) if len(envelope) else 0
+    if peak_level < VAD_MIN_LEVEL:
+        return np.array([])
+    
+    min_distance = max(1, int(0.15 / VAD_FRAME_SECONDS))
+    dips, _ = find_peaks(-envelope / peak_level, distance=min_distance, prominence=0.1)
+    return (dips + 0.5) * VAD_FRAME_SECONDS
+
+def create_vosk_recognizer(sample_rate=SAMPLE_RATE):
+    """
+    Create a Vosk recognizer with word timestamps enabled
+    Returns None if Vosk is not installed; raises ModelNotInstalled if its
+    model is not in the model store
+    """
+    try:
+        from vosk import KaldiRecognizer
+    except ImportError:
+        logger.info("Vosk not installed, skipping Vosk recognition")
+        return None
+    
+    recognizer = KaldiRecognizer(get_vosk_model(), sample_rate)
+    recognizer.SetWords(True)  # Enable word timestamps
+    return recognizer
+
+def vosk_words(vosk_result):
+    """Convert the words of a Vosk Result()/FinalResult() to word dicts"""
+    return [{
+        "word": word['word'],
+        "startTime": round(word['start'], 2),
+        "endTime": round(word['end'], 2),
+        "confidence": word.get('conf', 0.8),
+        "source": "vosk"
+    } for word in vosk_result.get('result', [])]
+
+def vosk_recognition_events(recognizer, blocks, sample_rate=SAMPLE_RATE, duration=None,
+                            partial_seconds=None, progress_seconds=None):
+    """
+    Feed PCM blocks to a Vosk recognizer and yield events as decoding proceeds:
+    - {"event": "words", "words": [...], "text": ...} for every finalised utterance
+      (whenever AcceptWaveform returns true, and for the remainder at the end)
+    - {"event": "partial", "text": ..., "time": ...} every partial_seconds of audio,
+      when the partial hypothesis has changed
+    - {"event": "progress", "processed": ..., "duration": ...} every progress_seconds
+      of audio; duration is None if it is not known in advance
+    Partial and progress events are skipped when their interval is None.
+    """
+    processed_samples = 0
+    next_partial = partial_seconds
+    next_progress = progress_seconds
+    last_partial = ""
+    
+    for block in blocks:
+        processed_samples += len(block)
+        processed = processed_samples / sample_rate
+        
+        if recognizer.AcceptWaveform(block.tobytes()):
+            utterance = json.loads(recognizer.Result())
+            words = vosk_words(utterance)
+            if words or utterance.get('text'):
+                yield {"event": "words", "words": words, "text": utterance.get('text', '')}
+            last_partial = ""
+        elif next_partial is not None and processed >= next_partial:
+            partial = json.loads(recognizer.PartialResult()).get('partial', '')
+            if partial and partial != last_partial:
+                yield {"event": "partial", "text": partial, "time": round(processed, 2)}
+                last_partial = partial
+        
+        if next_partial is not None and processed >= next_partial:
+            next_partial = processed + partial_seconds
+        if next_progress is not None and processed >= next_progress:
+            yield {"event": "progress", "processed": round(processed, 2), "duration": duration}
+            next_progress = processed + progress_seconds
+    
+    final = json.loads(recognizer.FinalResult())
+    words = vosk_words(final)
+    if words or final.get('text'):
+        yield {"event": "words", "words": words, "text": final.get('text', '')}
+    if progress_seconds is not None:
+        yield {"event": "progress", "processed": round(processed_samples / sample_rate, 2),
+               "duration": duration}
+
+def try_vosk_recognition(audio_data, sample_rate=SAMPLE_RATE):
     """
     Attempt to use Vosk for offline speech recognition with word timestamps
+    Takes mono 16-bit PCM samples as returned by decode_audio
     Returns None if Vosk is not available or fails
     """
     try:
-        # Check if Vosk is installed
-        try:
-            from vosk import Model, KaldiRecognizer
-        except ImportError:
-            logger.info("Vosk not installed, skipping Vosk recognition")
+        recognizer = create_vosk_recognizer(sample_rate)
+        if recognizer is None:
             return None
         
-        # Check if model exists
-        model_path = os.path.join(os.path.dirname(__file__), "vosk-model-small-en-us")
-        if not os.path.exists(model_path):
-            logger.info("Vosk model not found, downloading...")
-            # Create model directory
-            os.makedirs(model_path, exist_ok=True)
-            
-            # Download model (this is a simplified approach - in production, you'd want to handle this more robustly)
-            try:
-                import urllib.request
-                import zipfile
-                
-                # Download the small English model
-                model_url = "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"
-                zip_path = os.path.join(os.path.dirname(__file__), "vosk-model.zip")
-                
-                logger.info(f"Downloading Vosk model from {model_url}...")
-                urllib.request.urlretrieve(model_url, zip_path)
-                
-                # Extract the model
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(os.path.dirname(__file__))
-                
-                # Clean up
-                os.remove(zip_path)
-                logger.info("Vosk model downloaded and extracted successfully")
-            except Exception as e:
-                logger.error(f"Failed to download Vosk model: {str(e)}")
-                return None
-        
-        # Read the WAV file
-        sample_rate, audio_data = wavfile.read(wav_file)
-        
-        # Convert to mono if stereo
-        if len(audio_data.shape) > 1:
-            audio_data = audio_data.mean(axis=1)
-        
-        # Convert to 16-bit PCM
-        audio_data = (audio_data * 32768).astype(np.int16)
-        
-        # Initialize Vosk model and recognizer
-        model = Model(model_path)
-        recognizer = KaldiRecognizer(model, sample_rate)
-        recognizer.SetWords(True)  # Enable word timestamps
-        
-        # Process audio in chunks
-        chunk_size = 4000
-        chunks = [audio_data[i:i+chunk_size] for i in range(0, len(audio_data), chunk_size)]
-        
-        # Process each chunk
-        for chunk in chunks:
-            recognizer.AcceptWaveform(chunk.tobytes())
-        
-        # Get final result
-        result = json.loads(recognizer.FinalResult())
-        
-        if 'result' in result and result['result']:
-            # Extract words with timestamps
-            words = []
-            for word in result['result']:
-                words.append({
-                    "word": word['word'],
-                    "startTime": round(word['start'], 2),
-                    "endTime": round(word['end'], 2),
-                    "confidence": word.get('conf', 0.8),
-                    "source": "vosk"
-                })
-            
-            # Get full text
-            text = ' '.join([word['word'] for word in result['result']])
-            
+        # Process audio in blocks, slicing the shared buffer without copying it
+        blocks = (
+            audio_data[start:start + VOSK_BLOCK_SAMPLES]
+            for start in range(0, len(audio_data), VOSK_BLOCK_SAMPLES)
+        )
+        
+        # Collect the words of every finalised utterance, not just the last one
+        words = []
+        texts = []
+        with stage("vosk_decode"):
+            for event in vosk_recognition_events(recognizer, blocks, sample_rate):
+                words.extend(event['words'])
+                texts.append(event['text'])
+        
+        text = ' '.join(text for text in texts if text)
+        if words or text:
+            # Text without word timings is aligned to the audio by run_engine
             return {
                 "text": text,
                 "words": words,
@@ -231,9 +649,90 @@ def try_vosk_recognition(wav_file):
         logger.error(f"Vosk recognition error: {str(e)}")
         return None
 
-def try_whisper_recognition(wav_file):
+def stream_transcription(audio_file, emit, timings=None):
+    """
+    Streaming mode: decode the file incrementally and pass Vosk events (see
+    vosk_recognition_events) to emit while decoding is still in progress, so
+    callers can start working on the first words long before the file is done
+    Returns the complete transcription result; streamed results are not cached.
+    """
+    if timings is None:
+        timings = {}
+    
+    try:
+        stage_start = time.perf_counter()
+        recognizer = create_vosk_recognizer()
+        if recognizer is None:
+            raise RuntimeError("Streaming transcription requires Vosk and its model")
+        
+        duration = probe_duration(audio_file)
+        words = []
+        first_words = None
+        with stage("vosk_stream"):
+            for event in vosk_recognition_events(recognizer, stream_audio_blocks(audio_file),
+                                                 duration=duration,
+                                                 partial_seconds=STREAM_PARTIAL_SECONDS,
+                                                 progress_seconds=STREAM_PROGRESS_SECONDS):
+                if event["event"] == "words":
+                    words.extend(event["words"])
+                    if first_words is None:
+                        first_words = round(time.perf_counter() - stage_start, 3)
+                elif event["event"] == "progress":
+                    duration = event["processed"] if event["duration"] is None else duration
+                emit(event)
+        
+        timings["vosk_stream"] = round(time.perf_counter() - stage_start, 3)
+        if first_words is not None:
+            timings["first_words"] = first_words
+        
+        return {
+            "text": ' '.join(word['word'] for word in words),
+            "words": words,
+            "duration": duration or 0,
+            "source": "vosk",
+            "streamed": True
+        }
+    
+    except Exception as e:
+        logger.error(f"Streaming transcription error: {str(e)}")
+        return {
+            "text": "",
+            "words": [],
+            "duration": 0,
+            "error": str(e),
+            "source": "error"
+        }
+
+def whisper_segment_confidence(segment):
+    """
+    Confidence of a Whisper segment: the mean word probability, or the
+    geometric mean token probability (exp(avg_logprob)) if it has no words
+    """
+    probabilities = [word['probability'] for word in segment.get('words', []) if 'probability' in word]
+    if probabilities:
+        return sum(probabilities) / len(probabilities)
+    return math.exp(segment.get('avg_logprob', 0.0))
+
+def whisper_segment_words(segments, offset=0.0):
+    """Flatten Whisper segments into word dicts with per-word confidence"""
+    words = []
+    for segment in segments:
+        segment_confidence = whisper_segment_confidence(segment)
+        for word in segment.get('words', []):
+            words.append({
+                "word": word['word'].strip(),
+                "startTime": round(word['start'] + offset, 2),
+                "endTime": round(word['end'] + offset, 2),
+                "confidence": round(word.get('probability', segment_confidence), 3),
+                "source": "whisper"
+            })
+    return words
+
+def try_whisper_recognition(audio_data, sample_rate=SAMPLE_RATE, config=None):
     """
     Attempt to use OpenAI's Whisper for speech recognition with word timestamps
+    Takes mono 16-bit PCM samples at 16 kHz as returned by decode_audio, and an
+    optional engine config (see whisper_config_from_env; default WHISPER_CONFIG)
     Returns None if Whisper is not available or fails
     """
     try:
@@ -244,32 +743,28 @@ def try_whisper_recognition(wav_file):
             logger.info("Whisper not installed, skipping Whisper recognition")
             return None
         
-        logger.info("Attempting Whisper recognition...")
+        config = config or WHISPER_CONFIG
+        duration = len(audio_data) / sample_rate
+        model_name = choose_whisper_model(duration, config)
+        logger.info(f"Attempting Whisper recognition with '{model_name}'...")
         
-        # Load the model (small model for speed)
-        model = whisper.load_model("base")
+        model = get_whisper_model(model_name, config["int8"])
         
         # Transcribe with word-level timestamps
-        result = model.transcribe(wav_file, language="en", word_timestamps=True)
+        # Whisper accepts float32 samples at 16 kHz directly, no file needed
+        with stage("whisper_transcribe"):
+            result = whisper_transcribe(model, audio_data, config["threads"])
         
         if result and 'text' in result and 'segments' in result:
             # Extract words with timestamps
-            words = []
-            for segment in result['segments']:
-                for word in segment['words']:
-                    words.append({
-                        "word": word['word'].strip(),
-                        "startTime": round(word['start'], 2),
-                        "endTime": round(word['end'], 2),
-                        "confidence": segment.get('confidence', 0.8),
-                        "source": "whisper"
-                    })
+            words = whisper_segment_words(result['segments'])
             
             return {
                 "text": result['text'],
                 "words": words,
-                "duration": result.get('duration', 0),
-                "source": "whisper"
+                "duration": duration,
+                "source": "whisper",
+                "whisperModel": model_name
             }
         
         return None
@@ -278,43 +773,644 @@ def try_whisper_recognition(wav_file):
         logger.error(f"Whisper recognition error: {str(e)}")
         return None
 
-def transcribe_audio(audio_file):
-    """Transcribe audio file using multiple recognition engines for best results"""
+def normalize_word(word):
+    """Lowercase a word and strip surrounding punctuation for matching"""
+    return re.sub(r"[^\w'\s-]", "", word.lower()).strip()
+
+def match_keyword_sequences(words, keywords):
+    """
+    Find keywords (single words or multi-word phrases) in a list of recognised
+    words with 'word', 'start' and 'end' keys. Returns hits as dicts with the
+    matched keyword and its start/end times.
+    """
+    keyword_tokens = {}
+    for keyword in keywords:
+        tokens = tuple(normalize_word(keyword).split())
+        if tokens:
+            keyword_tokens[tokens] = keyword
+    if not keyword_tokens:
+        return []
+    
+    max_length = max(len(tokens) for tokens in keyword_tokens)
+    tokens = [normalize_word(word['word']) for word in words]
+    
+    hits = []
+    position = 0
+    while position < len(words):
+        for length in range(min(max_length, len(words) - position), 0, -1):
+            sequence = tuple(tokens[position:position + length])
+            if sequence in keyword_tokens:
+                matched = words[position:position + length]
+                hits.append({
+                    "keyword": keyword_tokens[sequence],
+                    "start": matched[0]['start'],
+                    "end": matched[-1]['end'],
+                    "conf": min(word.get('conf', 1.0) for word in matched)
+                })
+                position += length
+                break
+        else:
+            position += 1
+    
+    return hits
+
+def spot_keywords_vosk(audio_data, keywords, sample_rate=SAMPLE_RATE):
+    """
+    Spot keywords with Vosk using a grammar restricted to the keywords plus [unk]
+    Decoding against a tiny grammar is much faster than full transcription.
+    Returns a list of hits, or None if Vosk is not available.
+    """
+    try:
+        from vosk import KaldiRecognizer
+    except ImportError:
+        logger.info("Vosk not installed, cannot spot keywords")
+        return None
+    
+    try:
+        model = get_vosk_model()
+    except ModelNotInstalled as e:
+        logger.error(f"Cannot spot keywords: {str(e)}")
+        return None
+    
+    grammar = sorted({normalize_word(keyword) for keyword in keywords if normalize_word(keyword)})
+    recognizer = KaldiRecognizer(model, sample_rate, json.dumps(grammar + ["[unk]"]))
+    recognizer.SetWords(True)
+    
+    # Collect the words of every finalised utterance, not just the last one
+    words = []
+    for start in range(0, len(audio_data), VOSK_BLOCK_SAMPLES):
+        if recognizer.AcceptWaveform(audio_data[start:start + VOSK_BLOCK_SAMPLES].tobytes()):
+            words.extend(json.loads(recognizer.Result()).get('result', []))
+    words.extend(json.loads(recognizer.FinalResult()).get('result', []))
+    
+    words = [word for word in words if word['word'] != '[unk]']
+    return match_keyword_sequences(words, keywords)
+
+def confirm_keyword_hits(audio_data, hits, sample_rate=SAMPLE_RATE):
+    """
+    Re-decode a short window around each hit with Whisper and keep only the hits
+    it confirms, with Whisper's (more precise) timestamps.
+    If Whisper is not available the hits are returned unconfirmed.
+    """
+    try:
+        if "whisper" not in ENGINE_ORDER:
+            raise ImportError("Whisper is disabled")
+        model = get_whisper_model(choose_whisper_model(len(audio_data) / sample_rate))
+    except (ImportError, ModelNotInstalled) as e:
+        logger.info(f"Whisper not available ({str(e)}), returning unconfirmed keyword hits")
+        for hit in hits:
+            hit["confirmed"] = None
+        return hits
+    
+    padding = int(KEYWORD_CONFIRM_PADDING_SECONDS * sample_rate)
+    confirmed = []
+    for hit in hits:
+        window_start = max(0, int(hit['start'] * sample_rate) - padding)
+        window_end = min(len(audio_data), int(hit['end'] * sample_rate) + padding)
+        offset = window_start / sample_rate
+        
+        result = whisper_transcribe(model, audio_data[window_start:window_end])
+        window_words = [
+            {"word": word['word'], "start": word['start'] + offset, "end": word['end'] + offset,
+             "conf": word.get('probability', 1.0)}
+            for segment in result.get('segments', [])
+            for word in segment.get('words', [])
+        ]
+        
+        matches = match_keyword_sequences(window_words, [hit['keyword']])
+        if matches:
+            # Several matches in the window: keep the one closest to the Vosk hit
+            match = min(matches, key=lambda candidate: abs(candidate['start'] - hit['start']))
+            confirmed.append(dict(match, confirmed=True))
+        else:
+            logger.info(f"Whisper rejected keyword hit '{hit['keyword']}' at {hit['start']:.2f}s")
+    
+    return confirmed
+
+def spot_keywords(audio_file, keywords, timings=None, confirm=True):
+    """
+    Keyword-spotting fast path: find only the given target words (with
+    timestamps) instead of transcribing everything
+    Returns a result in the same format as transcribe_audio, whose words are
+    the keyword hits only.
+    """
+    if timings is None:
+        timings = {}
+    
     try:
-        # Convert to WAV if needed
-        wav_file = convert_to_wav(audio_file)
+        stage_start = time.perf_counter()
+        with stage("decode"):
+            audio_data = decode_audio(audio_file)
+        timings["decode"] = round(time.perf_counter() - stage_start, 3)
+        audio_duration = len(audio_data) / SAMPLE_RATE
         
-        logger.info(f"Starting transcription of {wav_file}")
+        stage_start = time.perf_counter()
+        with stage("keyword_spot"):
+            hits = spot_keywords_vosk(audio_data, keywords)
+        timings["spot"] = round(time.perf_counter() - stage_start, 3)
         
-        # Get audio duration
-        audio_duration = AudioSegment.from_wav(wav_file).duration_seconds
+        if hits is None:
+            return {
+                "text": "",
+                "words": [],
+                "duration": audio_duration,
+                "error": "Keyword spotting requires Vosk",
+                "source": "error"
+            }
         
-        # Try multiple recognition engines in order of preference
-        results = []
+        candidates = len(hits)
+        if confirm and hits:
+            stage_start = time.perf_counter()
+            with stage("keyword_confirm"):
+                hits = confirm_keyword_hits(audio_data, hits)
+            timings["confirm"] = round(time.perf_counter() - stage_start, 3)
         
-        # 1. Try Whisper (best for word timestamps)
-        whisper_result = try_whisper_recognition(wav_file)
-        if whisper_result and whisper_result['words']:
-            logger.info("Whisper recognition successful with word timestamps")
-            results.append(whisper_result)
+        words = [{
+            "word": hit['keyword'],
+            "startTime": round(hit['start'], 2),
+            "endTime": round(hit['end'], 2),
+            "confidence": round(hit['conf'], 3),
+            "source": "whisper" if hit.get("confirmed") else "vosk"
+        } for hit in hits]
         
-        # 2. Try Vosk (good offline option with timestamps)
-        vosk_result = try_vosk_recognition(wav_file)
-        if vosk_result and vosk_result['words']:
-            logger.info("Vosk recognition successful with word timestamps")
-            results.append(vosk_result)
+        return {
+            "text": ' '.join(word['word'] for word in words),
+            "words": words,
+            "duration": audio_duration,
+            "source": "keywords",
+            "keywordStats": {
+                "keywords": len(keywords),
+                "candidates": candidates,
+                "hits": len(words)
+            }
+        }
         
-        # Select the best result
+    except Exception as e:
+        logger.error(f"Keyword spotting error: {str(e)}")
+        return {
+            "text": "",
+            "words": [],
+            "duration": 0,
+            "error": str(e),
+            "source": "error"
+        }
+
+def finish_result(result, targets=None, output_format="json"):
+    """
+    Per-request finishing of a result: add the matches of the target words and
+    phrases over its words as "targetMatches" (see target_matcher), then
+    convert it to the output format
+    """
+    if targets and isinstance(result.get("words"), list) and result.get("source") != "error":
+        result = dict(result, targetMatches=compile_targets(targets).match(result["words"]))
+    return to_output_format(result, output_format)
+
+# Recognition engines in order of preference
+AVAILABLE_ENGINES = ["whisper", "vosk"]
+# SPEECH_ENGINES (e.g. "vosk") restricts and reorders the engines; a disabled
+# engine is never imported. Pool workers inherit it through the environment.
+ENGINE_ORDER = [
+    engine_name.strip()
+    for engine_name in os.environ.get("SPEECH_ENGINES", ",".join(AVAILABLE_ENGINES)).split(",")
+    if engine_name.strip() in AVAILABLE_ENGINES
+]
+ENGINE_STRATEGIES = ["cascade", "race", "ensemble", "adaptive"]
+DEFAULT_ENGINE_STRATEGY = "cascade"
+
+def run_engine(engine_name, audio_data):
+    """
+    Run a single recognition engine by name
+    Words the engine returned without timings are aligned to the audio
+    """
+    if engine_name == "whisper":
+        result = try_whisper_recognition(audio_data)
+    elif engine_name == "vosk":
+        result = try_vosk_recognition(audio_data)
+    else:
+        raise ValueError(f"Unknown recognition engine: {engine_name}")
+    
+    if result:
+        with stage("alignment"):
+            fill_missing_timings(result, audio_data)
+    return result
+
+def has_word_timestamps(result):
+    """Check whether an engine result is usable (contains timestamped words)"""
+    return bool(result and result.get('words'))
+
+def run_engines_cascade(audio_data, timings):
+    """Run engines in order of preference, stopping at the first usable result"""
+    for engine_name in ENGINE_ORDER:
+        stage_start = time.perf_counter()
+        result = run_engine(engine_name, audio_data)
+        timings[engine_name] = round(time.perf_counter() - stage_start, 3)
+        
+        if has_word_timestamps(result):
+            logger.info(f"{engine_name} recognition successful with word timestamps")
+            return [result]
+    
+    return []
+
+def run_engines_ensemble(audio_data, timings):
+    """Run every engine and return all usable results in order of preference"""
+    results = []
+    for engine_name in ENGINE_ORDER:
+        stage_start = time.perf_counter()
+        result = run_engine(engine_name, audio_data)
+        timings[engine_name] = round(time.perf_counter() - stage_start, 3)
+        
+        if has_word_timestamps(result):
+            logger.info(f"{engine_name} recognition successful with word timestamps")
+            results.append(result)
+    
+    return results
+
+def _race_worker(engine_name, audio_data, result_queue):
+    """Process entry point for a single engine taking part in a race"""
+    result_queue.put((engine_name, run_engine(engine_name, audio_data)))
+
+def run_engines_race(audio_data, timings):
+    """
+    Run every engine concurrently in its own process and return the first
+    usable result, terminating the engines that are still running
+    """
+    import multiprocessing
+    
+    result_queue = multiprocessing.Queue()
+    processes = {
+        engine_name: multiprocessing.Process(
+            target=_race_worker, args=(engine_name, audio_data, result_queue), daemon=True
+        )
+        for engine_name in ENGINE_ORDER
+    }
+    
+    race_start = time.perf_counter()
+    for process in processes.values():
+        process.start()
+    
+    remaining = set(processes)
+    try:
+        while remaining:
+            try:
+                engine_name, result = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                # Stop waiting once every remaining engine has died without reporting
+                if not any(processes[name].is_alive() for name in remaining):
+                    break
+                continue
+            
+            remaining.discard(engine_name)
+            timings[engine_name] = round(time.perf_counter() - race_start, 3)
+            
+            if has_word_timestamps(result):
+                logger.info(f"{engine_name} won the engine race")
+                return [result]
+        
+        return []
+    finally:
+        for engine_name, process in processes.items():
+            if process.is_alive():
+                logger.info(f"Cancelling {engine_name} recognition")
+                process.terminate()
+            process.join()
+
+def escalate_spans(audio_data, segments, spans, replacements):
+    """
+    Re-decode each (first, last) span of Whisper segments with the escalation
+    model, storing the corrected words in replacements[first] = (last, words)
+    """
+    escalation_model = get_whisper_model(WHISPER_ESCALATION_MODEL_NAME)
+    padding = int(CHUNK_PADDING_SECONDS * SAMPLE_RATE)
+    
+    for first, last in spans:
+        span_start, span_end = segments[first]['start'], segments[last]['end']
+        window_start = max(0, int(span_start * SAMPLE_RATE) - padding)
+        window_end = min(len(audio_data), int(span_end * SAMPLE_RATE) + padding)
+        
+        redo = whisper_transcribe(escalation_model, audio_data[window_start:window_end])
+        words = [
+            word for word in whisper_segment_words(redo.get('segments', []), window_start / SAMPLE_RATE)
+            if span_start <= (word['startTime'] + word['endTime']) / 2 <= span_end
+        ]
+        # Keep the fast transcript if the larger model hears nothing
+        if words:
+            replacements[first] = (last, words)
+
+def run_engines_adaptive(audio_data, timings):
+    """
+    Confidence-driven model escalation: transcribe with the fast Whisper model,
+    then re-decode only the low-confidence spans with the larger model and merge
+    the corrected words back in. Falls back to the cascade without Whisper.
+    """
+    try:
+        if "whisper" not in ENGINE_ORDER:
+            raise ImportError("Whisper is disabled")
+        fast_model = get_whisper_model(WHISPER_FAST_MODEL_NAME)
+    except (ImportError, ModelNotInstalled) as e:
+        logger.info(f"Whisper not available ({str(e)}), adaptive strategy falls back to cascade")
+        return run_engines_cascade(audio_data, timings)
+    
+    stage_start = time.perf_counter()
+    try:
+        with stage("whisper_fast"):
+            fast_result = whisper_transcribe(fast_model, audio_data)
+    except Exception as e:
+        logger.error(f"Fast Whisper recognition error: {str(e)}")
+        return run_engines_cascade(audio_data, timings)
+    timings["whisper_fast"] = round(time.perf_counter() - stage_start, 3)
+    segments = fast_result.get('segments', [])
+    
+    # Group consecutive low-confidence segments into spans
+    spans = []
+    for index, segment in enumerate(segments):
+        if whisper_segment_confidence(segment) >= ESCALATION_CONFIDENCE_THRESHOLD:
+            continue
+        if spans and spans[-1][1] == index - 1:
+            spans[-1][1] = index
+        else:
+            spans.append([index, index])
+    
+    replacements = {}
+    if spans:
+        stage_start = time.perf_counter()
+        try:
+            with stage("whisper_escalation"):
+                escalate_spans(audio_data, segments, spans, replacements)
+        except Exception as e:
+            # Spans that were not re-decoded keep the fast transcript
+            logger.error(f"Whisper escalation error: {str(e)}")
+        timings["whisper_escalation"] = round(time.perf_counter() - stage_start, 3)
+    escalated_seconds = sum(
+        segments[last]['end'] - segments[first]['start'] for first, (last, _) in replacements.items()
+    )
+    
+    words = []
+    index = 0
+    while index < len(segments):
+        if index in replacements:
+            last, span_words = replacements[index]
+            words.extend(span_words)
+            index = last + 1
+        else:
+            words.extend(whisper_segment_words([segments[index]]))
+            index += 1
+    
+    logger.info(f"Escalated {len(replacements)} of {len(spans)} low-confidence spans "
+                f"({escalated_seconds:.1f}s of audio) to Whisper '{WHISPER_ESCALATION_MODEL_NAME}'")
+    
+    if not words:
+        return []
+    
+    return [{
+        "text": ' '.join(word['word'] for word in words),
+        "words": words,
+        "duration": len(audio_data) / SAMPLE_RATE,
+        "source": "whisper",
+        "escalation": {
+            "fastModel": WHISPER_FAST_MODEL_NAME,
+            "escalationModel": WHISPER_ESCALATION_MODEL_NAME,
+            "segments": len(segments),
+            "lowConfidenceSpans": len(spans),
+            "escalatedSpans": len(replacements),
+            "escalatedSeconds": round(escalated_seconds, 2)
+        }
+    }]
+
+ENGINE_RUNNERS = {
+    "cascade": run_engines_cascade,
+    "race": run_engines_race,
+    "ensemble": run_engines_ensemble,
+    "adaptive": run_engines_adaptive,
+}
+
+def find_silence_split_points(audio_data, sample_rate=SAMPLE_RATE,
+                              max_chunk_seconds=LONG_AUDIO_CHUNK_SECONDS, frame_seconds=0.03):
+    """
+    Find sample indices at which to split the audio into chunks of at most
+    max_chunk_seconds, cutting at the quietest point of the second half of each
+    chunk. Returns the boundaries including 0 and len(audio_data).
+    """
+    import numpy as np
+    
+    frame_length = int(sample_rate * frame_seconds)
+    max_frames = int(max_chunk_seconds / frame_seconds)
+    
+    if len(audio_data) // frame_length <= max_frames:
+        return [0, len(audio_data)]
+    
+    # Smooth over ~300ms so cuts land in sustained pauses rather than between syllables
+    energy = smooth_envelope(compute_speech_envelope(audio_data, sample_rate, frame_seconds), 10)
+    frame_count = len(energy)
+    
+    min_frames = max_frames // 2
+    boundaries = [0]
+    position = 0
+    while frame_count - position > max_frames:
+        window = energy[position + min_frames:position + max_frames]
+        position = position + min_frames + int(np.argmin(window))
+        boundaries.append(position * frame_length)
+    
+    boundaries.append(len(audio_data))
+    return boundaries
+
+def _init_chunk_worker(threads_per_worker):
+    """Process pool initializer: limit intra-op threads and preload the models"""
+    WHISPER_CONFIG["threads"] = max(1, min(threads_per_worker, WHISPER_CONFIG["threads"]))
+    configure_torch_threads(WHISPER_CONFIG["threads"])
+    preload_models()
+
+def _transcribe_chunk(chunk_samples, offset, own_start, own_end):
+    """
+    Transcribe one chunk in a pool worker. Word times are shifted by offset to
+    global time, and only words whose midpoint lies in [own_start, own_end) are
+    kept so that words in the padding are owned by exactly one chunk.
+    """
+    results = run_engines_cascade(chunk_samples, {})
+    if not results:
+        return None
+    
+    result = results[0]
+    words = []
+    for word in result['words']:
+        start_time = word['startTime'] + offset
+        end_time = word['endTime'] + offset
+        midpoint = (start_time + end_time) / 2
+        if own_start <= midpoint < own_end:
+            words.append(dict(word, startTime=round(start_time, 2), endTime=round(end_time, 2)))
+    
+    return {"words": words, "source": result['source']}
+
+def merge_chunk_words(chunk_results):
+    """Concatenate per-chunk word lists, dropping duplicates at chunk edges"""
+    words = []
+    for chunk_result in chunk_results:
+        if not chunk_result:
+            continue
+        for word in chunk_result['words']:
+            if words:
+                previous = words[-1]
+                # The same word recognised on both sides of a cut
+                if (word['word'].lower() == previous['word'].lower()
+                        and word['startTime'] < previous['endTime']):
+                    continue
+            words.append(word)
+    return words
+
+def run_engines_chunked(audio_data, timings, workers=None):
+    """
+    Long-audio mode: split the audio at silences into bounded-length chunks and
+    transcribe them in a process pool, each worker with its models preloaded.
+    Chunks always use the cascade strategy.
+    """
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+    
+    boundaries = find_silence_split_points(audio_data)
+    chunk_count = len(boundaries) - 1
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, chunk_count))
+    padding = int(CHUNK_PADDING_SECONDS * SAMPLE_RATE)
+    
+    logger.info(f"Long-audio mode: {chunk_count} chunks over {workers} workers")
+    
+    # Chunks without any detected speech are not sent to the recognizers
+    stage_start = time.perf_counter()
+    with stage("vad"):
+        speech_regions = detect_speech_regions(audio_data)
+    region_starts = np.array([region['startTime'] for region in speech_regions])
+    region_ends = np.array([region['endTime'] for region in speech_regions])
+    timings["vad"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_chunk_worker,
+                             initargs=(max(1, cpu_count // workers),)) as executor:
+        futures = []
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            start_time, end_time = start / SAMPLE_RATE, end / SAMPLE_RATE
+            if not np.any((region_starts < end_time) & (region_ends > start_time)):
+                logger.info(f"Skipping silent chunk {start_time:.1f}s-{end_time:.1f}s")
+                futures.append(None)
+                continue
+            
+            padded_start = max(0, start - padding)
+            padded_end = min(len(audio_data), end + padding)
+            futures.append(executor.submit(
+                _transcribe_chunk,
+                np.array(audio_data[padded_start:padded_end]),
+                padded_start / SAMPLE_RATE,
+                start_time,
+                end_time
+            ))
+        chunk_results = [future.result() if future else None for future in futures]
+    timings["chunked"] = round(time.perf_counter() - stage_start, 3)
+    
+    words = merge_chunk_words(chunk_results)
+    if not words:
+        return []
+    
+    sources = Counter(chunk_result['source'] for chunk_result in chunk_results if chunk_result)
+    return [{
+        "text": ' '.join(word['word'] for word in words),
+        "words": words,
+        "duration": len(audio_data) / SAMPLE_RATE,
+        "source": sources.most_common(1)[0][0],
+        "chunks": chunk_count
+    }]
+
+def use_long_audio_mode(long_audio, audio_duration):
+    """Decide whether to use chunked transcription for this recording"""
+    if long_audio == "on":
+        return True
+    if long_audio == "off":
+        return False
+    return audio_duration >= LONG_AUDIO_MIN_SECONDS and (os.cpu_count() or 1) > 1
+
+def transcribe_audio(audio_file, timings=None, strategy=DEFAULT_ENGINE_STRATEGY, long_audio="auto",
+                     cache=None):
+    """
+    Transcribe audio file using multiple recognition engines for best results
+    
+    strategy selects how the engines are combined:
+    - "cascade": try engines in order of preference, stop at the first usable result
+    - "race": run all engines concurrently, keep the first usable result
+    - "ensemble": run all engines, return the preferred result with the others
+      attached as "alternatives"
+    - "adaptive": fast Whisper model first, larger model only for low-confidence spans
+    long_audio ("auto", "on" or "off") controls the chunked long-audio mode;
+    "auto" enables it for recordings over LONG_AUDIO_MIN_SECONDS
+    If a TranscriptionCache is given, it is checked before any model work and
+    successful results are stored in it
+    If a timings dict is given, the duration of each stage is recorded in it
+    """
+    if timings is None:
+        timings = {}
+    
+    try:
+        if strategy not in ENGINE_RUNNERS:
+            raise ValueError(f"Unknown engine strategy: {strategy}")
+        
+        # Decode once; every engine works on the same PCM buffer
+        stage_start = time.perf_counter()
+        with stage("decode"):
+            audio_data = decode_audio(audio_file)
+        timings["decode"] = round(time.perf_counter() - stage_start, 3)
+        
+        logger.info(f"Starting transcription of {audio_file}")
+        
+        audio_duration = len(audio_data) / SAMPLE_RATE
+        chunked = use_long_audio_mode(long_audio, audio_duration)
+        
+        # Identical audio with identical settings gives an identical transcript
+        cache_key = None
+        if cache is not None:
+            stage_start = time.perf_counter()
+            cache_key = cache.make_key(
+                audio_data,
+                strategy=strategy,
+                chunked=chunked,
+                engines=tuple(ENGINE_ORDER),
+                whisper_model=WHISPER_CONFIG["model"],
+                whisper_int8=WHISPER_CONFIG["int8"],
+                whisper_latency_target=WHISPER_CONFIG["latencyTarget"],
+                whisper_fast_model=WHISPER_FAST_MODEL_NAME,
+                whisper_escalation_model=WHISPER_ESCALATION_MODEL_NAME,
+                escalation_threshold=ESCALATION_CONFIDENCE_THRESHOLD,
+                vosk_model=VOSK_MODEL_NAME,
+                language=LANGUAGE,
+                version=TRANSCRIPTION_VERSION
+            )
+            with stage("cache_lookup"):
+                cached_result = cache.get(cache_key)
+            timings["cache"] = round(time.perf_counter() - stage_start, 3)
+            
+            if cached_result is not None:
+                logger.info("Returning cached transcription")
+                cached_result["cached"] = True
+                return cached_result
+        
+        # Run the recognition engines according to the selected strategy
+        if chunked:
+            with stage("chunked"):
+                results = run_engines_chunked(audio_data, timings)
+        else:
+            logger.info(f"Using '{strategy}' engine strategy")
+            with stage(f"engines_{strategy}"):
+                results = ENGINE_RUNNERS[strategy](audio_data, timings)
+        
+        # Select the best result (results are in order of preference)
         if results:
-            # Prefer results with word timestamps
-            for result in results:
-                if result['source'] in ['whisper', 'vosk'] and result['words']:
-                    logger.info(f"Selected {result['source']} result with word timestamps")
-                    return result
+            result = results[0]
+            logger.info(f"Selected {result['source']} result with word timestamps")
+            if strategy == "ensemble":
+                result["alternatives"] = results[1:]
             
-            # Fall back to any available result
-            logger.info("Falling back to available result")
-            return results[0]
+            if cache_key is not None:
+                try:
+                    with stage("cache_store"):
+                        cache.put(cache_key, result)
+                except Exception as e:
+                    logger.error(f"Could not store transcription in cache: {str(e)}")
+            return result
         else:
             # No results from any engine
             return {
@@ -334,150 +1430,1071 @@ def transcribe_audio(audio_file):
             "error": str(e),
             "source": "error"
         }
-    finally:
-        # Clean up temporary file
-        try:
-            if 'wav_file' in locals():
-                os.unlink(wav_file)
-        except:
-            pass
 
-def create_distributed_word_timings(words, audio_duration):
-    """Create word timing estimates with improved distribution algorithm"""
-    word_objects = []
+# Common English words (top 100), spoken faster than other words
+COMMON_WORDS = frozenset({
+    "the", "be", "to", "of", "and", "a", "in", "that", "have", "i", 
+    "it", "for", "not", "on", "with", "he", "as", "you", "do", "at",
+    "this", "but", "his", "by", "from", "they", "we", "say", "her", "she",
+    "or", "an", "will", "my", "one", "all", "would", "there", "their", "what",
+    "so", "up", "out", "if", "about", "who", "get", "which", "go", "me",
+    "when", "make", "can", "like", "time", "no", "just", "him", "know", "take",
+    "people", "into", "year", "your", "good", "some", "could", "them", "see", "other",
+    "than", "then", "now", "look", "only", "come", "its", "over", "think", "also",
+    "back", "after", "use", "two", "how", "our", "work", "first", "well", "way",
+    "even", "new", "want", "because", "any", "these", "give", "day", "most", "us"
+})
+
+def count_syllables(word):
+    """Count the number of syllables in a word"""
+    word = word.lower()
+    
+    # Handle special cases
+    if word.endswith("e"):
+        word = word[:-1]
+    
+    # Count vowel groups, at least one syllable
+    return max(len(re.findall(r"[aeiouy]+", word)), 1)
+
+def get_word_frequency_weight(word):
+    """Get a weight based on word frequency (common words are spoken faster)"""
+    return 0.7 if normalize_word(word) in COMMON_WORDS else 1.0
+
+def estimate_word_weights(words):
+    """
+    Relative spoken duration of each word, combining character length (50%),
+    syllable count (30%) and word frequency (20%), each normalised over the words
+    """
+    import numpy as np
+    
+    chars = np.array([max(len(word), 1) for word in words], dtype=np.float64)
+    syllables = np.array([count_syllables(word) for word in words], dtype=np.float64)
+    frequency = np.array([get_word_frequency_weight(word) for word in words], dtype=np.float64)
+    
+    return (0.5 * chars / chars.sum()
+            + 0.3 * syllables / syllables.sum()
+            + 0.2 * frequency / frequency.sum())
+
+def snap_to_boundaries(times, boundaries, tolerance=ALIGN_SNAP_SECONDS):
+    """Move each time to the nearest boundary, if one is within tolerance"""
+    import numpy as np
+    
+    if len(boundaries) == 0:
+        return times
+    
+    right = np.clip(np.searchsorted(boundaries, times), 0, len(boundaries) - 1)
+    left = np.maximum(right - 1, 0)
+    nearest = np.where(np.abs(boundaries[left] - times) <= np.abs(boundaries[right] - times),
+                       boundaries[left], boundaries[right])
+    return np.where(np.abs(nearest - times) <= tolerance, nearest, times)
+
+def align_words(words, audio_data, sample_rate=SAMPLE_RATE, start_time=0.0, end_time=None,
+                regions=None, gaps=None):
+    """
+    Lightweight alignment of a transcript without timings
+    
+    The speech regions (detect_speech_regions) inside [start_time, end_time] are
+    laid end to end and divided between the words by estimate_word_weights.
+    Each word goes to the region holding its midpoint, so no word spans a pause,
+    and the words of a region share it from its start to its end: every voiced
+    sample stays inside a word. A region too short to hold a word's midpoint
+    goes to the word spanning it. The cuts between two words of a region are
+    moved to the nearest dip found by detect_word_gaps. regions and gaps can be
+    passed in to reuse them across calls.
+    Returns one (startTime, endTime) pair in seconds per word.
+    """
+    import numpy as np
     
     if not words:
-        return word_objects
+        return []
+    
+    if end_time is None:
+        end_time = len(audio_data) / sample_rate
+    if regions is None:
+        regions = detect_speech_regions(audio_data, sample_rate)
+    if gaps is None:
+        gaps = detect_word_gaps(audio_data, sample_rate)
+    gaps = np.asarray(gaps, dtype=np.float64)
+    
+    # Speech regions clipped to the window, or the whole window if there are none
+    region_starts = np.clip([region["startTime"] for region in regions], start_time, end_time)
+    region_ends = np.clip([region["endTime"] for region in regions], start_time, end_time)
+    in_window = region_ends > region_starts
+    if in_window.any():
+        region_starts, region_ends = region_starts[in_window], region_ends[in_window]
+    else:
+        region_starts, region_ends = np.array([start_time]), np.array([end_time])
+    durations = region_ends - region_starts
+    offsets = np.concatenate(([0.0], np.cumsum(durations)))
+    
+    # Word edges on the speech-only timeline
+    weights = estimate_word_weights(words)
+    edges = np.concatenate(([0.0], np.cumsum(weights))) * offsets[-1]
+    midpoints = (edges[:-1] + edges[1:]) / 2
+    region = np.clip(np.searchsorted(offsets, midpoints, side='right') - 1, 0, len(durations) - 1)
+    
+    starts = np.empty(len(words))
+    ends = np.empty(len(words))
+    for index in np.unique(region):
+        members = np.flatnonzero(region == index)
+        shares = np.concatenate(([0.0], np.cumsum(weights[members]))) / weights[members].sum()
+        cuts = region_starts[index] + shares * durations[index]
+        
+        # Snap the cuts between words to envelope dips unless that would collapse a word
+        for position, snapped in enumerate(snap_to_boundaries(cuts[1:-1], gaps), start=1):
+            if (snapped - cuts[position - 1] >= ALIGN_MIN_WORD_SECONDS
+                    and cuts[position + 1] - snapped >= ALIGN_MIN_WORD_SECONDS):
+                cuts[position] = snapped
+        starts[members] = cuts[:-1]
+        ends[members] = cuts[1:]
+    
+    for index in np.setdiff1d(np.arange(len(durations)), region):
+        owner = min(int(np.searchsorted(edges, offsets[index] + durations[index] / 2, side='right')) - 1,
+                    len(words) - 1)
+        starts[owner] = min(starts[owner], region_starts[index])
+        ends[owner] = max(ends[owner], region_ends[index])
+    
+    return [(round(float(start), 3), round(float(end), 3)) for start, end in zip(starts, ends)]
+
+def has_timing(word):
+    """Check whether a word has a usable (non-zero, non-empty) time span"""
+    return word.get('endTime', 0) > word.get('startTime', 0)
+
+def fill_missing_timings(result, audio_data, sample_rate=SAMPLE_RATE):
+    """
+    Give every word of an engine result a timestamp, in place
+    A result with text but no words is aligned from its text; each run of
+    words with missing or zeroed timings is aligned within the gap between its
+    timed neighbours
+    """
+    words = result.get('words') or []
+    if not words:
+        words = [
+            {"word": word.strip('.,!?;:"()[]'), "confidence": 0.5}
+            for word in result.get('text', '').split()
+        ]
+    
+    untimed = [not has_timing(word) for word in words]
+    if not any(untimed):
+        return result
+    
+    audio_duration = len(audio_data) / sample_rate
+    regions = detect_speech_regions(audio_data, sample_rate)
+    word_gaps = detect_word_gaps(audio_data, sample_rate)
+    
+    index = 0
+    while index < len(words):
+        if not untimed[index]:
+            index += 1
+            continue
+        
+        run_end = index
+        while run_end < len(words) and untimed[run_end]:
+            run_end += 1
+        
+        gap_start = words[index - 1]['endTime'] if index > 0 else 0.0
+        gap_end = words[run_end]['startTime'] if run_end < len(words) else audio_duration
+        spans = align_words([word['word'] for word in words[index:run_end]], audio_data, sample_rate,
+                            gap_start, max(gap_end, gap_start), regions, word_gaps)
+        
+        for word, (start, end) in zip(words[index:run_end], spans):
+            word.update({
+                "startTime": start,
+                "endTime": end,
+                "confidence": word.get('confidence', 0.5),
+                "source": "alignment"
+            })
+        index = run_end
+    
+    logger.info(f"Aligned {sum(untimed)} of {len(words)} words without timings")
+    result['words'] = words
+    return result
+
+def engine_installed(engine_name):
+    """Whether an engine's Python package is installed, without importing it"""
+    return engine_name in sys.modules or importlib.util.find_spec(engine_name) is not None
+
+def required_models(keywords=False):
+    """
+    Model store names of the models that the enabled and installed engines load
+    The adaptive strategy's fast and escalation models are optional (it falls
+    back to the cascade without them), and so is Whisper for keyword spotting,
+    which only uses it to confirm the Vosk hits
+    """
+    models = []
+    if "whisper" in ENGINE_ORDER and engine_installed("whisper") and not keywords:
+        # "auto" chooses per request; its default model is the one preloaded
+        model_name = WHISPER_CONFIG["model"]
+        models.append(whisper_model_name(WHISPER_MODEL_NAME if model_name == "auto" else model_name))
+    if "vosk" in ENGINE_ORDER and engine_installed("vosk"):
+        models.append(VOSK_MODEL_NAME)
+    return models
+
+def check_models(keywords=False):
+    """Fail fast, before any job runs, if a model the engines need is not installed"""
+    for model_name in required_models(keywords):
+        installed_model_path(model_name)
+
+def worker_memory():
+    """
+    (bytes per worker, bytes shared by all workers) for sizing worker pools
+    Whisper weights mapped from the model store are in memory once per node,
+    not once per worker; int8 quantisation makes private copies of them
+    """
+    shared = 0
+    if not WHISPER_CONFIG["int8"]:
+        shared = sum(model_store().shared_bytes(model_name) for model_name in required_models()
+                     if model_name.startswith(whisper_model_name("")))
+    return BATCH_WORKER_MEMORY_BYTES - shared, shared
+
+def preload_models():
+    """Load every enabled and available engine's model into the process-wide cache"""
+    if "whisper" in ENGINE_ORDER:
+        try:
+            import whisper
+            # "auto" chooses per request; preload the default model for it
+            model_name = WHISPER_CONFIG["model"]
+            get_whisper_model(WHISPER_MODEL_NAME if model_name == "auto" else model_name)
+        except ImportError:
+            logger.info("Whisper not installed, skipping Whisper preload")
+        except Exception as e:
+            logger.error(f"Failed to preload Whisper model: {str(e)}")
+    
+    if "vosk" in ENGINE_ORDER:
+        try:
+            get_vosk_model()
+        except ImportError:
+            logger.info("Vosk not installed, skipping Vosk preload")
+        except Exception as e:
+            logger.error(f"Failed to preload Vosk model: {str(e)}")
+
+def warmup():
+    """
+    Get everything ready ahead of the first real request: byte-compile the
+    services, import NumPy and SciPy, load the enabled models and run the
+    analysis stages and each engine once on a second of low-level noise
+    Returns the time each step took, in seconds
+    """
+    import compileall
+    
+    timings = {}
+    total_start = time.perf_counter()
+    
+    stage_start = time.perf_counter()
+    compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), maxlevels=0, quiet=1)
+    timings["compile"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    import numpy as np
+    import scipy.signal
+    timings["imports"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    preload_models()
+    timings["models"] = round(time.perf_counter() - stage_start, 3)
+    
+    audio_data = (np.random.RandomState(0).standard_normal(SAMPLE_RATE) * 100).astype(np.int16)
+    
+    stage_start = time.perf_counter()
+    detect_speech_regions(audio_data)
+    detect_word_gaps(audio_data)
+    timings["analysis"] = round(time.perf_counter() - stage_start, 3)
     
-    # Account for pauses and natural speech patterns
-    # Assume 25% of time is pauses/silence (increased from 20%)
-    speech_duration = audio_duration * 0.75
+    for engine_name in ENGINE_ORDER:
+        stage_start = time.perf_counter()
+        run_engine(engine_name, audio_data)
+        timings[engine_name] = round(time.perf_counter() - stage_start, 3)
     
-    # Calculate word durations based on multiple factors
-    word_durations = []
+    timings["total"] = round(time.perf_counter() - total_start, 3)
+    logger.info(f"Warm-up finished in {timings['total']}s")
+    return timings
+
+def match_targets_command(job):
+    """Answer a worker "match_targets" command: target matches over the given words"""
+    try:
+        return {"id": job.get("id"),
+                "targetMatches": compile_targets(job.get("targets", [])).match(job.get("words", []))}
+    except Exception as e:
+        return {"id": job.get("id"), "error": f"Target matching failed: {str(e)}", "source": "error"}
+
+def read_job_lines(input_file=None):
+    """
+    Yield the lines of the worker's input (stdin by default) as they arrive
+    The file descriptor is read directly instead of iterating sys.stdin: a
+    process forked while another thread is blocked in sys.stdin inherits its
+    buffer lock held, and multiprocessing closes sys.stdin in every child it
+    starts (race engines, chunk pools, restarted workers), which then hangs
+    """
+    fd = (input_file or sys.stdin).fileno()
+    pending = b""
+    while True:
+        data = os.read(fd, 65536)
+        if not data:
+            break
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace")
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+def serve(strategy=DEFAULT_ENGINE_STRATEGY, long_audio="auto", cache=None, metrics=False, profile_dir=None,
+          warm=False, scheduler=None):
+    """
+    Long-lived worker mode: read one JSON job per line from stdin and write one
+    JSON result per line to stdout. Models are loaded once and shared by all jobs.
     
-    # 1. Character length (longer words take more time)
-    char_weights = [len(word) for word in words]
+    Job format:    {"id": "...", "audio_file": "/path/to/audio",
+                    "strategy": "cascade", "long_audio": "auto"}
+    Result format: transcription result plus "id" and per-job "timings"
     
-    # 2. Syllable count (words with more syllables take more time)
-    syllable_counts = [count_syllables(word) for word in words]
+    Jobs with a "keywords" list run keyword spotting instead of full transcription
+    Jobs with "stream": true run streaming Vosk transcription: "words", "partial"
+    and "progress" events carrying the job id are written before the final result
+    {"id": "...", "command": "cache_stats"} returns the transcription cache statistics
+    Jobs with "format": "columnar" get their words as columns (see result_format)
+    Jobs with a "targets" list get the matches of those words and phrases as
+    "targetMatches"; {"id": "...", "command": "match_targets", "words": [...],
+    "targets": [...]} matches them over already transcribed words, answered
+    right away even while a transcription is running
+    
+    With metrics (or "metrics": true in a job) results include per-stage
+    "metrics"; with profile_dir a cProfile dump is written for every job
+    With warm, the worker runs warmup() before reporting that it is ready
+    
+    With a job scheduler, jobs go through the job queue instead and run in a
+    pool of worker processes (see serve_scheduled)
+    """
+    if scheduler is not None:
+        serve_scheduled(scheduler, strategy, long_audio, cache, metrics, profile_dir, warm)
+        return
+    
+    import threading
+    
+    # Engines may print to stdout; keep it reserved for the JSON-lines protocol
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    output_lock = threading.Lock()
+    
+    def emit(message):
+        with output_lock:
+            output.write(json.dumps(message, separators=(",", ":")) + "\n")
+            output.flush()
+    
+    if warm:
+        emit({"event": "ready", "warmup": warmup()})
+    else:
+        preload_models()
+        emit({"event": "ready"})
+    logger.info("Transcription worker ready, waiting for jobs...")
     
-    # 3. Word frequency (common words are spoken faster)
-    frequency_weights = [get_word_frequency_weight(word) for word in words]
+    # stdin is read on its own thread, which answers target matching (cheap,
+    # no audio) itself, so it never waits behind a transcription. Everything
+    # else runs in order on this thread, which owns the cache connection.
+    jobs = queue.Queue()
     
-    # Combine all factors with appropriate weights
-    for i in range(len(words)):
-        # Base duration on character length (50% weight)
-        char_duration = (char_weights[i] / sum(char_weights)) * speech_duration * 0.5
+    def read_jobs():
+        for line in read_job_lines():
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                emit({"error": f"Invalid job: {str(e)}", "source": "error"})
+                continue
+            
+            if job.get("command") == "match_targets":
+                emit(match_targets_command(job))
+            else:
+                jobs.put(job)
+        jobs.put(None)
+    
+    threading.Thread(target=read_jobs, daemon=True).start()
+    
+    for job in iter(jobs.get, None):
+        job_id = job.get("id")
+        audio_file = job.get("audio_file")
         
-        # Adjust for syllable count (30% weight)
-        syllable_duration = (syllable_counts[i] / sum(syllable_counts)) * speech_duration * 0.3
+        if job.get("command") == "cache_stats":
+            emit({"id": job_id, "cacheStats": cache.stats() if cache else None})
+            continue
         
-        # Adjust for word frequency (20% weight)
-        freq_duration = (frequency_weights[i] / sum(frequency_weights)) * speech_duration * 0.2
+        if not audio_file or not os.path.exists(audio_file):
+            emit({
+                "id": job_id,
+                "error": f"Audio file not found: {audio_file}",
+                "text": "",
+                "words": [],
+                "duration": 0,
+                "source": "error"
+            })
+            continue
         
-        # Combine all factors
-        total_duration = char_duration + syllable_duration + freq_duration
+        job_start = time.perf_counter()
+        timings = {}
         
-        # Ensure minimum duration
-        total_duration = max(total_duration, 0.2)  # Minimum 200ms per word
+        def run_job():
+            if job.get("keywords"):
+                return spot_keywords(audio_file, job["keywords"], timings, job.get("confirm", True))
+            if job.get("stream"):
+                return stream_transcription(audio_file, lambda event: emit(dict(event, id=job_id)), timings)
+            return transcribe_audio(audio_file, timings, job.get("strategy", strategy),
+                                    job.get("long_audio", long_audio), cache)
         
-        word_durations.append(total_duration)
+        result = instrumented(f"job-{job_id}", run_job, job.get("metrics", metrics), profile_dir)
+        timings["total"] = round(time.perf_counter() - job_start, 3)
+        
+        result["id"] = job_id
+        result["timings"] = timings
+        emit(finish_result(result, job.get("targets"), job.get("format", "json")))
+        logger.info(f"Job {job_id} finished in {timings['total']}s")
+
+def batch_worker_count(job_count, workers=None):
+    """Size the batch pool to the cores and the memory available for models"""
+    from job_scheduler import available_memory_bytes
     
-    # Distribute pause time between words
-    total_word_duration = sum(word_durations)
-    remaining_time = speech_duration - total_word_duration
+    if workers:
+        return max(1, min(workers, job_count))
     
-    # Add pause time between words
-    pause_times = []
-    if len(words) > 1:
-        # Distribute pause time based on word complexity
-        complexity_weights = [char_weights[i] + syllable_counts[i] for i in range(len(words))]
-        total_complexity = sum(complexity_weights)
-        
-        for i in range(len(words) - 1):
-            # More complex words get more pause time after them
-            pause_time = (complexity_weights[i] / total_complexity) * remaining_time
-            pause_times.append(pause_time)
+    workers = os.cpu_count() or 1
+    memory = available_memory_bytes()
+    if memory is not None:
+        memory_per_worker, shared_memory = worker_memory()
+        workers = min(workers, max(0, memory - shared_memory) // memory_per_worker)
+    return max(1, min(workers, job_count))
+
+def read_batch_manifest(manifest_path):
+    """
+    Read batch jobs from a manifest file ("-" for stdin)
+    Each line is either an audio file path or a JSON job object like the ones
+    --serve accepts; blank lines and lines starting with # are skipped
+    """
+    if manifest_path == "-":
+        lines = sys.stdin.read().splitlines()
     else:
-        pause_times = [0]
-    
-    # Create word objects with timestamps
-    current_time = 0.0
-    for i, word in enumerate(words):
-        start_time = current_time
-        end_time = start_time + word_durations[i]
-        
-        word_objects.append({
-            "word": word.strip('.,!?;:"()[]'),  # Clean punctuation
-            "startTime": round(start_time, 2),
-            "endTime": round(end_time, 2),
-            "confidence": 0.5,  # Lower confidence for distributed timings
-            "source": "distribution"
-        })
-        
-        # Add pause time after this word (except for the last word)
-        if i < len(words) - 1:
-            current_time = end_time + pause_times[i]
-        else:
-            current_time = end_time
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            lines = manifest_file.read().splitlines()
     
-    return word_objects
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        jobs.append(json.loads(line) if line.startswith("{") else {"audio_file": line})
+    return jobs
 
-def count_syllables(word):
-    """Count the number of syllables in a word"""
-    word = word.lower()
-    count = 0
-    vowels = "aeiouy"
+_batch_settings = {}
+
+def _init_batch_worker(threads_per_worker, strategy, long_audio, use_cache, metrics, profile_dir):
+    """Process pool initializer: load the models and open the cache once per worker"""
+    from transcription_cache import open_transcription_cache
     
-    # Handle special cases
-    if word.endswith("e"):
-        word = word[:-1]
+    _init_chunk_worker(threads_per_worker)
+    _batch_settings.update({
+        "strategy": strategy,
+        "long_audio": long_audio,
+        "metrics": metrics,
+        "profile_dir": profile_dir,
+        # SQLite connections cannot be shared between processes
+        "cache": open_transcription_cache() if use_cache else None
+    })
+
+def _transcribe_batch_job(job, emit=None):
+    """
+    Transcribe one batch or queued job in a pool worker
+    Streaming jobs pass their "words", "partial" and "progress" events to emit
+    """
+    job_start = time.perf_counter()
+    timings = {}
+    audio_file = job.get("audio_file")
+    
+    if not audio_file or not os.path.exists(audio_file):
+        result = {
+            "error": f"Audio file not found: {audio_file}",
+            "text": "",
+            "words": [],
+            "duration": 0,
+            "source": "error"
+        }
+    elif job.get("keywords"):
+        result = instrumented(
+            os.path.basename(audio_file),
+            lambda: spot_keywords(audio_file, job["keywords"], timings, job.get("confirm", True)),
+            job.get("metrics", _batch_settings["metrics"]), _batch_settings["profile_dir"]
+        )
+    elif job.get("stream") and emit is not None:
+        result = instrumented(
+            os.path.basename(audio_file),
+            lambda: stream_transcription(audio_file, emit, timings),
+            job.get("metrics", _batch_settings["metrics"]), _batch_settings["profile_dir"]
+        )
+    else:
+        result = instrumented(
+            os.path.basename(audio_file),
+            lambda: transcribe_audio(audio_file, timings, job.get("strategy", _batch_settings["strategy"]),
+                                     job.get("long_audio", _batch_settings["long_audio"]),
+                                     _batch_settings["cache"]),
+            job.get("metrics", _batch_settings["metrics"]), _batch_settings["profile_dir"]
+        )
+    timings["total"] = round(time.perf_counter() - job_start, 3)
+    
+    if "id" in job:
+        result["id"] = job["id"]
+    result["audio_file"] = audio_file
+    result["timings"] = timings
+    return result
+
+def run_batch(jobs, strategy=DEFAULT_ENGINE_STRATEGY, long_audio="auto", use_cache=True, workers=None,
+              metrics=False, profile_dir=None, output_format="json", targets=None):
+    """
+    Batch mode: transcribe many files over a process pool, each worker with its
+    models loaded once, and write each result to stdout as one compact JSON line
+    as soon as it finishes (in completion order, not input order)
+    
+    The pool already keeps every core busy, so "auto" long-audio mode is turned
+    off inside multi-worker batches rather than nesting a chunk pool per file.
+    A final {"event": "done"} line summarises the batch. Results are written in
+    output_format, with matches of targets, unless their job has its own
+    "format" or "targets".
+    Returns the number of failed jobs.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    # Engines may print to stdout; keep it reserved for the JSON-lines output
+    output = sys.stdout
+    sys.stdout = sys.stderr
     
-    # Count vowel groups
-    prev_char_is_vowel = False
-    for char in word:
-        is_vowel = char in vowels
-        if is_vowel and not prev_char_is_vowel:
-            count += 1
-        prev_char_is_vowel = is_vowel
+    def emit(message):
+        output.write(json.dumps(message, separators=(",", ":")) + "\n")
+        output.flush()
     
-    # Ensure at least one syllable
-    return max(count, 1)
+    batch_start = time.perf_counter()
+    workers = batch_worker_count(len(jobs), workers)
+    if workers > 1 and long_audio == "auto":
+        long_audio = "off"
+    cpu_count = os.cpu_count() or 1
+    logger.info(f"Batch mode: {len(jobs)} files over {workers} workers")
+    
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(max(1, cpu_count // workers), strategy, long_audio,
+                                           use_cache, metrics, profile_dir)) as executor:
+            futures = {executor.submit(_transcribe_batch_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # A worker crashed (e.g. ran out of memory); report the job and carry on
+                    result = {
+                        "audio_file": job.get("audio_file"),
+                        "error": str(e),
+                        "text": "",
+                        "words": [],
+                        "duration": 0,
+                        "source": "error"
+                    }
+                    if "id" in job:
+                        result["id"] = job["id"]
+                if result.get("source") == "error":
+                    failed += 1
+                emit(finish_result(result, job.get("targets", targets), job.get("format", output_format)))
+    
+    emit({
+        "event": "done",
+        "files": len(jobs),
+        "failed": failed,
+        "workers": workers,
+        "elapsed": round(time.perf_counter() - batch_start, 3)
+    })
+    return failed
 
-def get_word_frequency_weight(word):
-    """Get a weight based on word frequency (common words are spoken faster)"""
-    # Common English words (top 100)
-    common_words = {
-        "the", "be", "to", "of", "and", "a", "in", "that", "have", "i", 
-        "it", "for", "not", "on", "with", "he", "as", "you", "do", "at",
-        "this", "but", "his", "by", "from", "they", "we", "say", "her", "she",
-        "or", "an", "will", "my", "one", "all", "would", "there", "their", "what",
-        "so", "up", "out", "if", "about", "who", "get", "which", "go", "me",
-        "when", "make", "can", "like", "time", "no", "just", "him", "know", "take",
-        "people", "into", "year", "your", "good", "some", "could", "them", "see", "other",
-        "than", "then", "now", "look", "only", "come", "its", "over", "think", "also",
-        "back", "after", "use", "two", "how", "our", "work", "first", "well", "way",
-        "even", "new", "want", "because", "any", "these", "give", "day", "most", "us"
-    }
+def queued_job_options(job, strategy, long_audio, metrics):
+    """
+    The settings that determine a job's result, with the defaults filled in
+    Used as the queue payload and, with the audio contents, as the key that
+    identical jobs share
+    """
+    if job.get("keywords"):
+        options = {"keywords": job["keywords"], "confirm": job.get("confirm", True)}
+    elif job.get("stream"):
+        options = {"stream": True}
+    else:
+        options = {"strategy": job.get("strategy", strategy), "long_audio": job.get("long_audio", long_audio)}
+    # Processes sharing the queue may run with different --engines
+    options["engines"] = list(ENGINE_ORDER)
+    options["metrics"] = job.get("metrics", metrics)
+    return options
+
+def _scheduler_worker(runner, threads_per_worker, strategy, long_audio, use_cache, metrics, profile_dir, warm,
+                      messages, stopping):
+    """
+    Worker process of serve_scheduled: load the models once, then run the queued
+    jobs of runner until stopping is set or runner (the serving process) is
+    gone. Reports ("ready", warmup timings), ("event", job id, event) and
+    ("done", job id) through messages.
+    """
+    from job_scheduler import POLL_SECONDS, open_job_scheduler
     
-    # Return a lower weight for common words (they're spoken faster)
-    return 0.7 if word.lower() in common_words else 1.0
+    # Engines may print to stdout, which is the dispatcher's protocol pipe
+    sys.stdout = sys.stderr
+    _init_batch_worker(threads_per_worker, strategy, long_audio, use_cache, metrics, profile_dir)
+    messages.put(("ready", warmup() if warm else None))
+    
+    scheduler = open_job_scheduler("speech", *worker_memory())
+    # Not a daemon (race and long-audio jobs start processes of their own), so
+    # nothing stops it automatically if the server is killed
+    while not stopping.is_set() and os.getppid() == runner:
+        job = scheduler.claim(runner)
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        
+        job_id = job["id"]
+        try:
+            result = _transcribe_batch_job(job["payload"], lambda event: messages.put(("event", job_id, event)))
+            scheduler.complete(job_id, result)
+        except Exception as e:
+            logger.error(f"Queued job {job_id} failed: {str(e)}")
+            scheduler.fail(job_id, e)
+        messages.put(("done", job_id))
+
+def serve_scheduled(scheduler, strategy=DEFAULT_ENGINE_STRATEGY, long_audio="auto", cache=None, metrics=False,
+                    profile_dir=None, warm=False):
+    """
+    serve() through the job queue: every job is queued with its audio duration
+    as priority, so short clips go first, and run by one of scheduler.slots
+    worker processes (sized to the cores and memory), each with its models
+    loaded once. A job identical to one already queued or running, here or in
+    another process, shares that job's result instead of being run again.
+    
+    Every accepted job is acknowledged with {"event": "queued", "id", "position",
+    "queueDepth", "running", "deduplicated"}. When the queue is full the job is
+    rejected with "queueFull": true and the queue statistics (backpressure).
+    {"id": "...", "command": "queue_stats"} returns the queue statistics.
+    Results of shared jobs carry "deduplicated": true. The output "format" and
+    "targets" are per request and not part of the job, so they do not prevent
+    sharing.
+    """
+    import threading
+    import multiprocessing
+    from job_scheduler import POLL_SECONDS, QueueFull, job_key, open_job_scheduler
+    
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    output_lock = threading.Lock()
+    
+    def emit(message):
+        with output_lock:
+            output.write(json.dumps(message, separators=(",", ":")) + "\n")
+            output.flush()
+    
+    runner = os.getpid()
+    workers = scheduler.slots
+    # Workers size their own queue handles from the environment
+    os.environ["SPEECH_WORKERS"] = str(workers)
+    # As in batch mode, the pool already keeps every core busy
+    if workers > 1 and long_audio == "auto":
+        long_audio = "off"
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    
+    messages = multiprocessing.Queue()
+    stopping = multiprocessing.Event()
+    
+    def start_worker():
+        # Daemonic processes cannot have children, which the race strategy and
+        # long-audio chunking need; the workers are stopped explicitly instead
+        process = multiprocessing.Process(
+            target=_scheduler_worker,
+            args=(runner, threads_per_worker, strategy, long_audio, cache is not None, metrics, profile_dir,
+                  warm, messages, stopping)
+        )
+        process.start()
+        return process
+    
+    processes = [start_worker() for _ in range(workers)]
+    logger.info(f"Job queue: {workers} transcription workers, up to {scheduler.max_queued} queued jobs")
+    
+    # Queue job id -> [(request id, deduplicated, request)] waiting for its
+    # result; the keys of jobs run by our own workers, and the jobs run by other
+    # processes
+    waiting = {}
+    own_jobs = {}
+    foreign_jobs = set()
+    lock = threading.Lock()
+    
+    def finish(job_id, outcome):
+        with lock:
+            requests = waiting.pop(job_id, [])
+            foreign_jobs.discard(job_id)
+            for key in [key for key, own_job_id in own_jobs.items() if own_job_id == job_id]:
+                del own_jobs[key]
+        
+        state, value = outcome
+        for request_id, deduplicated, request in requests:
+            if state == "done":
+                result = dict(value, id=request_id)
+                if deduplicated:
+                    result["deduplicated"] = True
+                result = finish_result(result, request.get("targets"), request.get("format", "json"))
+            else:
+                result = {"id": request_id, "error": value, "text": "", "words": [], "duration": 0,
+                          "source": "error"}
+            emit(result)
+    
+    def dispatch():
+        # SQLite connections cannot be shared between threads
+        results = open_job_scheduler("speech", *worker_memory())
+        ready = []
+        while True:
+            try:
+                message = messages.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                message = None
+            
+            if message is not None and message[0] == "ready":
+                ready.append(message[1])
+                if len(ready) == workers:
+                    emit({"event": "ready", "workers": workers, "warmup": ready[0]} if warm
+                         else {"event": "ready", "workers": workers})
+            elif message is not None and message[0] == "event":
+                with lock:
+                    requests = list(waiting.get(message[1], []))
+                for request_id, _, _ in requests:
+                    emit(dict(message[2], id=request_id))
+            elif message is not None and message[0] == "done":
+                finish(message[1], results.outcome(message[1]))
+            
+            with lock:
+                shared = list(foreign_jobs)
+            for job_id in shared:
+                outcome = results.outcome(job_id)
+                if outcome is not None:
+                    finish(job_id, outcome)
+            
+            # Replace workers that died (e.g. killed for running out of memory);
+            # reaping fails the jobs of dead processes, theirs included
+            crashed = False
+            for index, process in enumerate(processes):
+                if process.exitcode is not None and not stopping.is_set():
+                    logger.error(f"Transcription worker exited with code {process.exitcode}, restarting it")
+                    processes[index] = start_worker()
+                    crashed = True
+            for job_id in results.reap(force=crashed):
+                finish(job_id, results.outcome(job_id))
+    
+    threading.Thread(target=dispatch, daemon=True).start()
+    
+    try:
+        for line in read_job_lines():
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                emit({"error": f"Invalid job: {str(e)}", "source": "error"})
+                continue
+            
+            request_id = job.get("id")
+            audio_file = job.get("audio_file")
+            
+            if job.get("command") == "cache_stats":
+                emit({"id": request_id, "cacheStats": cache.stats() if cache else None})
+                continue
+            if job.get("command") == "queue_stats":
+                emit({"id": request_id, "queueStats": scheduler.stats()})
+                continue
+            if job.get("command") == "match_targets":
+                emit(match_targets_command(job))
+                continue
+            
+            if not audio_file or not os.path.exists(audio_file):
+                emit({
+                    "id": request_id,
+                    "error": f"Audio file not found: {audio_file}",
+                    "text": "",
+                    "words": [],
+                    "duration": 0,
+                    "source": "error"
+                })
+                continue
+            
+            options = queued_job_options(job, strategy, long_audio, metrics)
+            key = job_key("transcription", options, audio_file)
+            priority = estimate_audio_seconds(audio_file)
+            
+            with lock:
+                job_id = own_jobs.get(key)
+                deduplicated = job_id is not None
+                if not deduplicated:
+                    try:
+                        job_id, deduplicated = scheduler.submit(key, dict(options, audio_file=audio_file), priority,
+                                                                runner)
+                    except QueueFull as e:
+                        job_id = None
+                        stats = e.stats
+                    else:
+                        if deduplicated:
+                            foreign_jobs.add(job_id)
+                        else:
+                            own_jobs[key] = job_id
+                if job_id is not None:
+                    waiting.setdefault(job_id, []).append((request_id, deduplicated, job))
+            
+            if job_id is None:
+                logger.warning(f"Rejected job {request_id}: the job queue is full")
+                emit({
+                    "id": request_id,
+                    "error": "Transcription queue is full",
+                    "queueFull": True,
+                    "queueStats": stats,
+                    "text": "",
+                    "words": [],
+                    "duration": 0,
+                    "source": "error"
+                })
+                continue
+            
+            stats = scheduler.stats()
+            emit({
+                "event": "queued",
+                "id": request_id,
+                "position": scheduler.position(job_id),
+                "queueDepth": stats["queued"],
+                "running": stats["running"],
+                "deduplicated": deduplicated
+            })
+        
+        # stdin closed: finish the accepted jobs
+        while True:
+            with lock:
+                if not waiting:
+                    break
+            time.sleep(POLL_SECONDS)
+    finally:
+        stopping.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        scheduler.cancel(runner)
 
 def main():
-    if len(sys.argv) != 2:
-        print(json.dumps({"error": "Usage: python speech_recognition_script.py <audio_file>"}))
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Transcribe audio files with word timestamps")
+    parser.add_argument("audio_files", nargs="*", metavar="audio_file",
+                        help="Audio file(s) to transcribe; more than one runs batch mode")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="Batch mode: transcribe the files listed in MANIFEST (one path or JSON job "
+                             "per line, - for stdin) and stream one JSON line per result")
+    parser.add_argument("--workers", type=int,
+                        help="Batch mode worker processes (default: sized to cores and available memory)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a persistent worker reading JSON-lines jobs from stdin")
+    parser.add_argument("--engine-strategy", choices=ENGINE_STRATEGIES, default=DEFAULT_ENGINE_STRATEGY,
+                        help="How to combine the recognition engines (default: cascade)")
+    parser.add_argument("--long-audio", choices=LONG_AUDIO_MODES, default="auto",
+                        help="Split long recordings at silences and transcribe the chunks in parallel "
+                             f"(default: auto, for audio over {LONG_AUDIO_MIN_SECONDS}s)")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Preload and exercise the models and analysis stages; with --serve, before "
+                             "accepting jobs, otherwise print the warm-up timings and exit")
+    parser.add_argument("--engines",
+                        help="Comma-separated recognition engines to use, in order of preference "
+                             f"(default: {','.join(AVAILABLE_ENGINES)}; also SPEECH_ENGINES)")
+    parser.add_argument("--whisper-model",
+                        help="Whisper model name, or \"auto\" to choose by duration and --latency-target "
+                             f"(default: {WHISPER_MODEL_NAME}; also WHISPER_MODEL)")
+    parser.add_argument("--whisper-threads", type=int,
+                        help="Torch intra-op threads per process "
+                             f"(default: cores, at most {WHISPER_DEFAULT_MAX_THREADS}; also WHISPER_THREADS)")
+    parser.add_argument("--whisper-int8", action="store_true",
+                        help="Quantise the Whisper Linear layers to int8 (also WHISPER_INT8=on)")
+    parser.add_argument("--latency-target", type=float, metavar="SECONDS",
+                        help="Whisper run time to aim for with --whisper-model auto (also WHISPER_LATENCY_TARGET)")
+    parser.add_argument("--vad", action="store_true",
+                        help="Only run voice activity detection and print the speech regions")
+    parser.add_argument("--keywords",
+                        help="Comma-separated target words/phrases: only spot these instead of transcribing everything")
+    parser.add_argument("--no-confirm", action="store_true",
+                        help="With --keywords, skip the Whisper confirmation of each hit")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream Vosk words, partial results and progress as JSON lines while decoding")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Add per-stage wall time, CPU time and memory to the result as \"metrics\"")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Write a cProfile (pstats) dump of every job to DIR")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the transcription cache")
+    parser.add_argument("--no-queue", action="store_true",
+                        help="With --serve, run jobs right away instead of through the machine-wide job queue")
+    parser.add_argument("--queue", action="store_true",
+                        help="Run a one-off transcription through the machine-wide job queue (worker mode "
+                             "always uses it unless --no-queue is given)")
+    parser.add_argument("--targets",
+                        help="Comma-separated target words/phrases to find in the transcript; their matches, "
+                             "with timestamps, are added as \"targetMatches\"")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json",
+                        help="Result layout: json (one object per word) or columnar (compact word columns, "
+                             "see result_format.py)")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="Print transcription cache statistics and exit")
+    args = parser.parse_args()
+    
+    if args.engines:
+        engines = [engine_name.strip() for engine_name in args.engines.split(",")]
+        unknown = [engine_name for engine_name in engines if engine_name not in AVAILABLE_ENGINES]
+        if unknown:
+            parser.error(f"Unknown engines: {', '.join(unknown)}")
+        ENGINE_ORDER[:] = engines
+        os.environ["SPEECH_ENGINES"] = ",".join(engines)
     
-    audio_file = sys.argv[1]
+    # Passed on through the environment so that pool workers use them too
+    if args.whisper_model:
+        os.environ["WHISPER_MODEL"] = args.whisper_model
+    if args.whisper_threads:
+        os.environ["WHISPER_THREADS"] = str(args.whisper_threads)
+    if args.whisper_int8:
+        os.environ["WHISPER_INT8"] = "on"
+    if args.latency_target:
+        os.environ["WHISPER_LATENCY_TARGET"] = str(args.latency_target)
+    WHISPER_CONFIG.update(whisper_config_from_env())
     
-    if not os.path.exists(audio_file):
-        print(json.dumps({"error": f"Audio file not found: {audio_file}"}))
+    if args.cache_stats:
+        from transcription_cache import open_transcription_cache
+        cache = None if args.no_cache else open_transcription_cache()
+        print(json.dumps(cache.stats() if cache else {"error": "Transcription cache is disabled"}, indent=2))
+        return
+    
+    # Usage errors and missing inputs are reported before any model is checked
+    # or loaded and before the cache and the job queue are opened
+    if args.batch and args.batch != "-" and not os.path.exists(args.batch):
+        print(json.dumps({"error": f"Batch manifest not found: {args.batch}"}))
         sys.exit(1)
+    if not (args.serve or args.batch or args.warmup or len(args.audio_files) > 1):
+        if not args.audio_files:
+            print(json.dumps({"error": "Usage: python speech_recognition_script.py <audio_file>... | --batch <manifest> | --serve"}))
+            sys.exit(1)
+        if not os.path.exists(args.audio_files[0]):
+            print(json.dumps({"error": f"Audio file not found: {args.audio_files[0]}"}))
+            sys.exit(1)
+    
+    # Models are installed ahead of time; missing ones fail here rather than per request
+    if not args.vad:
+        try:
+            check_models(keywords=bool(args.keywords))
+        except ModelNotInstalled as e:
+            # --serve reports it as an event, its protocol has no job to attach it to
+            print(json.dumps(dict({"event": "error"} if args.serve else {}, error=str(e), source="error")))
+            sys.exit(1)
+    
+    if args.warmup and not args.serve:
+        print(json.dumps({"warmup": warmup()}, indent=2))
+        return
+    
+    from transcription_cache import open_transcription_cache
+    from job_scheduler import QueueFull, job_key, open_job_scheduler
+    
+    cache = None if args.no_cache else open_transcription_cache()
+    # The queue bounds the jobs of long-lived workers; one-off runs opt in
+    use_queue = not args.no_queue if args.serve else args.queue
+    scheduler = open_job_scheduler("speech", *worker_memory()) if use_queue else None
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()] if args.targets else None
+    
+    if args.serve:
+        serve(args.engine_strategy, args.long_audio, cache, args.metrics, args.profile, args.warmup, scheduler)
+        return
+    
+    if args.batch or len(args.audio_files) > 1:
+        jobs = [{"audio_file": audio_file} for audio_file in args.audio_files]
+        if args.batch:
+            jobs.extend(read_batch_manifest(args.batch))
+        if args.keywords:
+            keywords = [keyword.strip() for keyword in args.keywords.split(",") if keyword.strip()]
+            for job in jobs:
+                job.setdefault("keywords", keywords)
+                job.setdefault("confirm", not args.no_confirm)
+        failed = run_batch(jobs, args.engine_strategy, args.long_audio, not args.no_cache, args.workers,
+                           args.metrics, args.profile, args.format, targets)
+        if failed:
+            sys.exit(1)
+        return
+    
+    audio_file = args.audio_files[0]
+    
+    def print_result(result):
+        result = finish_result(result, targets, args.format)
+        if args.format == "columnar":
+            print(json.dumps(result, separators=(",", ":")))
+        else:
+            print(json.dumps(result, indent=2))
+    
+    def scheduled(job, run):
+        # With --queue, one-off runs wait for a free slot in the job queue, so
+        # that processes started per request cannot overload the machine, and
+        # share the result of an identical job that is already queued or running
+        if scheduler is None:
+            return run()
+        options = queued_job_options(job, args.engine_strategy, args.long_audio, args.metrics)
+        try:
+            return scheduler.run(job_key("transcription", options, audio_file),
+                                 dict(options, audio_file=audio_file), estimate_audio_seconds(audio_file), run)
+        except QueueFull as e:
+            return {"error": str(e), "queueFull": True, "queueStats": e.stats, "text": "", "words": [],
+                    "duration": 0, "source": "error"}
+    
+    if args.keywords:
+        keywords = [keyword.strip() for keyword in args.keywords.split(",") if keyword.strip()]
+        result = scheduled({"keywords": keywords, "confirm": not args.no_confirm}, lambda: instrumented(
+            os.path.basename(audio_file),
+            lambda: spot_keywords(audio_file, keywords, confirm=not args.no_confirm),
+            args.metrics, args.profile
+        ))
+        print_result(result)
+        if result.get("source") == "error":
+            sys.exit(1)
+        return
+    
+    if args.stream:
+        # Engines may print to stdout; keep it reserved for the JSON-lines output
+        output = sys.stdout
+        sys.stdout = sys.stderr
+        
+        def emit(message):
+            output.write(json.dumps(message, separators=(",", ":")) + "\n")
+            output.flush()
+        
+        result = scheduled({"stream": True}, lambda: instrumented(
+            os.path.basename(audio_file), lambda: stream_transcription(audio_file, emit),
+            args.metrics, args.profile
+        ))
+        emit(finish_result(result, targets, args.format))
+        if result.get("source") == "error":
+            sys.exit(1)
+        return
+    
+    if args.vad:
+        audio_data = decode_audio(audio_file)
+        print(json.dumps({
+            "regions": detect_speech_regions(audio_data),
+            "duration": len(audio_data) / SAMPLE_RATE
+        }, indent=2))
+        return
     
     try:
-        result = transcribe_audio(audio_file)
-        print(json.dumps(result, indent=2))
+        result = scheduled({}, lambda: instrumented(
+            os.path.basename(audio_file),
+            lambda: transcribe_audio(audio_file, strategy=args.engine_strategy, long_audio=args.long_audio,
+                                     cache=cache),
+            args.metrics, args.profile
+        ))
+        print_result(result)
+        if result.get("queueFull"):
+            sys.exit(1)
         
     except Exception as e:
         error_result = {
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Single-pass audio splicing engine
+Replaces any number of word segments with TTS clips in one pass over the audio,
+optionally re-splicing only the regions that changed since the last render
+"""
+
+import sys
+import json
+import os
+import math
+import shutil
+import subprocess
+import time
+import wave
+import logging
+import numpy as np
+from scipy.signal import resample_poly
+from render_cache import RenderCache, file_digest, region_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Output format, matching the FFmpeg pipeline in AudioService
+OUTPUT_SAMPLE_RATE = 44100
+OUTPUT_CHANNELS = 2
+CROSSFADE_MS = 10
+# Incremental renders cut the output into regions of about this length; a
+# change only re-splices the regions it touches
+REGION_SECONDS = 5
+
+def decode_with_ffmpeg(input_path, sample_rate=OUTPUT_SAMPLE_RATE, channels=OUTPUT_CHANNELS):
+    """Decode any audio file to 16-bit PCM frames of shape (samples, channels)"""
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        raise RuntimeError("ffmpeg not found on PATH")
+    
+    command = [
+        ffmpeg_path, "-nostdin", "-v", "error",
+        "-i", input_path,
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", str(channels), "-ar", str(sample_rate),
+        "-"
+    ]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        message = process.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg failed to decode {input_path}: {message}")
+    
+    usable_bytes = len(process.stdout) - len(process.stdout) % (2 * channels)
+    audio = np.frombuffer(process.stdout[:usable_bytes], dtype=np.int16)
+    return audio.reshape(-1, channels)
+
+def load_clip(clip_path, sample_rate=OUTPUT_SAMPLE_RATE, channels=OUTPUT_CHANNELS):
+    """
+    Load a replacement clip and convert it to the output format
+    16-bit WAV clips (what tts_script.py produces) are read directly and
+    resampled with a polyphase filter; anything else goes through ffmpeg
+    """
+    try:
+        with wave.open(clip_path, "rb") as wav_file:
+            if wav_file.getsampwidth() != 2:
+                raise wave.Error("not 16-bit PCM")
+            clip_rate = wav_file.getframerate()
+            clip_channels = wav_file.getnchannels()
+            frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return decode_with_ffmpeg(clip_path, sample_rate, channels).astype(np.float32)
+    
+    clip = np.frombuffer(frames, dtype=np.int16).reshape(-1, clip_channels).astype(np.float32)
+    
+    # Match the channel layout
+    if clip_channels != channels:
+        clip = clip.mean(axis=1, keepdims=True)
+        if channels > 1:
+            clip = np.repeat(clip, channels, axis=1)
+    
+    # Resample all channels at once
+    if clip_rate != sample_rate and len(clip) > 0:
+        divisor = math.gcd(sample_rate, clip_rate)
+        clip = resample_poly(clip, sample_rate // divisor, clip_rate // divisor, axis=0)
+    
+    return clip.astype(np.float32)
+
+def replacement_spans(replacements, source_length, sample_rate=OUTPUT_SAMPLE_RATE):
+    """
+    Sample spans (start, end, index) of sorted replacements with times on the
+    original timeline, clamped to the source; replacements that overlap an
+    earlier one are skipped
+    """
+    spans = []
+    position = 0
+    for index, replacement in enumerate(replacements):
+        start = min(int(round(replacement["startTime"] * sample_rate)), source_length)
+        end = min(int(round(replacement["endTime"] * sample_rate)), source_length)
+        if start < position:
+            logger.warning(f"Skipping overlapping replacement at {replacement['startTime']}s")
+            continue
+        
+        spans.append((start, end, index))
+        position = end
+    return spans
+
+def build_segments(source, replacements, clips, sample_rate=OUTPUT_SAMPLE_RATE):
+    """
+    List the pieces of the output in order: untouched source spans (as views)
+    alternating with replacement clips. Replacements must be sorted and
+    non-overlapping, with times on the original timeline.
+    """
+    return segments_from_spans(source, replacement_spans(replacements, len(source), sample_rate), clips)
+
+def segments_from_spans(source, spans, clips):
+    """build_segments for spans from replacement_spans, with clips indexed like the replacements"""
+    segments = []
+    position = 0
+    for start, end, index in spans:
+        segments.append(source[position:start])
+        segments.append(clips[index])
+        position = end
+    
+    segments.append(source[position:])
+    return [segment for segment in segments if len(segment) > 0]
+
+def splice_segments(segments, crossfade_samples, channels=OUTPUT_CHANNELS):
+    """
+    Concatenate the segments into one preallocated buffer, overlapping
+    neighbours by up to crossfade_samples with linear fades at every seam
+    """
+    overlaps = [
+        min(crossfade_samples, len(previous), len(current))
+        for previous, current in zip(segments[:-1], segments[1:])
+    ]
+    total_length = sum(len(segment) for segment in segments) - sum(overlaps)
+    output = np.zeros((max(total_length, 0), channels), dtype=np.float32)
+    
+    cursor = 0
+    for index, segment in enumerate(segments):
+        overlap = overlaps[index - 1] if index > 0 else 0
+        if overlap > 0:
+            fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None]
+            output[cursor - overlap:cursor] *= 1.0 - fade_in
+            output[cursor - overlap:cursor] += segment[:overlap] * fade_in
+        
+        remaining = len(segment) - overlap
+        output[cursor:cursor + remaining] = segment[overlap:]
+        cursor += remaining
+    
+    return np.clip(output, -32768, 32767).astype(np.int16)
+
+def write_wav(output_path, audio, sample_rate=OUTPUT_SAMPLE_RATE):
+    """Write 16-bit PCM frames of shape (samples, channels) as a WAV file"""
+    with wave.open(output_path, "wb") as wav_file:
+        wav_file.setnchannels(audio.shape[1])
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(audio.tobytes())
+
+def plan_regions(spans, source_length, crossfade_samples, region_samples):
+    """
+    Cut the timeline into regions [start, end) at multiples of region_samples
+    Cut points closer than crossfade_samples to a replacement are skipped, so
+    no crossfade crosses a cut and splicing the regions one by one produces
+    exactly the audio of splicing the whole file. Returns [(start, end, spans)].
+    """
+    cuts = [0]
+    index = 0
+    for point in range(region_samples, source_length, region_samples):
+        while index < len(spans) and spans[index][1] + crossfade_samples <= point:
+            index += 1
+        if index < len(spans) and spans[index][0] - crossfade_samples < point:
+            continue
+        cuts.append(point)
+    cuts.append(source_length)
+    
+    regions = []
+    index = 0
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        region_spans = []
+        # Clips inserted at the very end of the source belong to the last region
+        while index < len(spans) and (spans[index][0] < end or end == source_length):
+            region_spans.append(spans[index])
+            index += 1
+        regions.append((start, end, region_spans))
+    return regions
+
+def render_incremental(input_path, output_path, replacements, crossfade_ms=CROSSFADE_MS, render_dir=None):
+    """
+    splice_audio that reuses the previous render of the same input
+    The decoded source, the regions that contain replacements and a manifest
+    (source hash, replacements with clip hashes, regions) are kept in
+    render_dir. Only regions whose source span, replacements or clips changed
+    are spliced again; their clips are the only ones loaded, the source is
+    memory-mapped instead of decoded again, and untouched regions are copied
+    straight from it.
+    """
+    timings = {}
+    total_start = time.perf_counter()
+    replacements = sorted(replacements, key=lambda replacement: replacement["startTime"])
+    crossfade_samples = int(OUTPUT_SAMPLE_RATE * crossfade_ms / 1000)
+    
+    stage_start = time.perf_counter()
+    cache = RenderCache(render_dir, OUTPUT_SAMPLE_RATE, OUTPUT_CHANNELS)
+    source_hash = file_digest(input_path)
+    source, decoded = cache.load_source(source_hash, lambda: decode_with_ffmpeg(input_path))
+    clip_hashes = [file_digest(replacement["clip_path"]) for replacement in replacements]
+    timings["decode"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    spans = replacement_spans(replacements, len(source))
+    regions = plan_regions(spans, len(source), crossfade_samples, int(REGION_SECONDS * OUTPUT_SAMPLE_RATE))
+    
+    region_entries = []
+    # The audio of every region with replacements, held until the output is
+    # written: a concurrent render of the same file may prune the cached files
+    region_audio = {}
+    rendered = 0
+    for start, end, region_spans in regions:
+        if not region_spans:
+            region_entries.append({"start": start, "end": end, "cached": False})
+            continue
+        
+        key = region_key(source_hash, crossfade_samples, start, end,
+                         [(span_start, span_end, clip_hashes[index]) for span_start, span_end, index in region_spans])
+        audio = cache.region(key)
+        if audio is None:
+            clips = {index: load_clip(replacements[index]["clip_path"]) for _, _, index in region_spans}
+            local_spans = [(span_start - start, span_end - start, index)
+                           for span_start, span_end, index in region_spans]
+            audio = splice_segments(segments_from_spans(source[start:end], local_spans, clips), crossfade_samples)
+            cache.store_region(key, audio)
+            rendered += 1
+        region_audio[key] = audio
+        region_entries.append({"start": start, "end": end, "key": key, "cached": True})
+    timings["splice"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    output_length = 0
+    with wave.open(output_path, "wb") as wav_file:
+        wav_file.setnchannels(OUTPUT_CHANNELS)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(OUTPUT_SAMPLE_RATE)
+        for entry in region_entries:
+            audio = region_audio[entry["key"]] if entry["cached"] else source[entry["start"]:entry["end"]]
+            wav_file.writeframes(audio.tobytes())
+            output_length += len(audio)
+    timings["write"] = round(time.perf_counter() - stage_start, 3)
+    
+    previous = {(entry["startTime"], entry["endTime"], entry["clipHash"])
+                for entry in cache.manifest["replacements"]}
+    replacement_entries = [
+        {"startTime": replacement["startTime"], "endTime": replacement["endTime"], "clipHash": clip_hash}
+        for replacement, clip_hash in zip(replacements, clip_hashes)
+    ]
+    changed = sum(1 for entry in replacement_entries
+                  if (entry["startTime"], entry["endTime"], entry["clipHash"]) not in previous)
+    cache.save({
+        "sourceHash": source_hash,
+        "crossfadeMs": crossfade_ms,
+        "replacements": replacement_entries,
+        "regions": region_entries
+    })
+    
+    timings["total"] = round(time.perf_counter() - total_start, 3)
+    logger.info(f"Rendered {rendered} of {len(regions)} regions for {changed} changed replacements "
+                f"in {timings['total']}s")
+    
+    return {
+        "success": True,
+        "output_path": output_path,
+        "replacements": len(replacements),
+        "changed": changed,
+        "regions": len(regions),
+        "rendered": rendered,
+        "sourceDecoded": decoded,
+        "duration": output_length / OUTPUT_SAMPLE_RATE,
+        "timings": timings
+    }
+
+def splice_audio(input_path, output_path, replacements, crossfade_ms=CROSSFADE_MS, render_dir=None):
+    """
+    Replace every [startTime, endTime) span of the input with its clip_path audio
+    The source and each clip are decoded once and the output is written once;
+    with a render_dir the previous render is reused (see render_incremental)
+    """
+    if render_dir:
+        return render_incremental(input_path, output_path, replacements, crossfade_ms, render_dir)
+    
+    timings = {}
+    total_start = time.perf_counter()
+    
+    # Replacement times all refer to the original timeline
+    replacements = sorted(replacements, key=lambda replacement: replacement["startTime"])
+    
+    stage_start = time.perf_counter()
+    source = decode_with_ffmpeg(input_path)
+    timings["decode"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    clips = [load_clip(replacement["clip_path"]) for replacement in replacements]
+    timings["clips"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    segments = build_segments(source, replacements, clips)
+    crossfade_samples = int(OUTPUT_SAMPLE_RATE * crossfade_ms / 1000)
+    output = splice_segments(segments, crossfade_samples)
+    timings["splice"] = round(time.perf_counter() - stage_start, 3)
+    
+    stage_start = time.perf_counter()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_wav(output_path, output)
+    timings["write"] = round(time.perf_counter() - stage_start, 3)
+    
+    timings["total"] = round(time.perf_counter() - total_start, 3)
+    logger.info(f"Spliced {len(replacements)} replacements in {timings['total']}s")
+    
+    return {
+        "success": True,
+        "output_path": output_path,
+        "replacements": len(replacements),
+        "duration": len(output) / OUTPUT_SAMPLE_RATE,
+        "timings": timings
+    }
+
+def main():
+    """
+    Usage: python splice_script.py <manifest.json|->
+    
+    Manifest format:
+    {
+        "input_path": "original.mp3",
+        "output_path": "processed.wav",
+        "crossfade_ms": 10,
+        "render_dir": "original.mp3.render",
+        "replacements": [{"startTime": 1.2, "endTime": 1.6, "clip_path": "tts_0.wav"}, ...]
+    }
+    """
+    if len(sys.argv) != 2:
+        print(json.dumps({"success": False, "error": "Usage: python splice_script.py <manifest.json|->"}))
+        sys.exit(1)
+    
+    try:
+        if sys.argv[1] == "-":
+            manifest = json.load(sys.stdin)
+        else:
+            with open(sys.argv[1], "r", encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+        
+        result = splice_audio(
+            manifest["input_path"],
+            manifest["output_path"],
+            manifest.get("replacements", []),
+            manifest.get("crossfade_ms", CROSSFADE_MS),
+            manifest.get("render_dir")
+        )
+        print(json.dumps(result))
+    
+    except Exception as e:
+        logger.error(f"Splicing failed: {str(e)}")
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
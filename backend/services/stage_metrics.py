@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-stage instrumentation for the speech and TTS scripts
+Records wall time, CPU time and memory for the named stages of a job, and can
+dump a cProfile of the whole job
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is reported as None there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the job currently being instrumented, None when disabled
+_active = None
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def children_cpu_seconds():
+    """CPU time used by terminated child processes (e.g. process pool workers)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class StageMetrics:
+    """
+    Wall time, CPU time and memory per named stage
+    Stages may nest and may run several times; repeated stages are summed.
+    Python allocation peaks come from tracemalloc, so they only cover memory
+    allocated through Python (NumPy buffers included, native model memory not).
+    """
+
+    def __init__(self, trace_memory=True):
+        self.stages = {}
+        self.trace_memory = trace_memory and hasattr(tracemalloc, "reset_peak")
+        self._open = []
+        self._owns_tracing = False
+        self._wall_start = None
+        self._cpu_start = None
+        self._children_start = None
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._children_start = children_cpu_seconds()
+
+    def stop(self):
+        self._wall_total = time.perf_counter() - self._wall_start
+        self._cpu_total = time.process_time() - self._cpu_start
+        self._children_total = children_cpu_seconds() - self._children_start
+        self._python_peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the enclosed block as one run of the named stage"""
+        if self.trace_memory:
+            # Resetting the peak would hide it from the enclosing stages
+            self._record_peak()
+            tracemalloc.reset_peak()
+            frame = {"baseline": tracemalloc.get_traced_memory()[0], "peak": 0}
+            self._open.append(frame)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_start = children_cpu_seconds()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {
+                "calls": 0,
+                "wallSeconds": 0.0,
+                "cpuSeconds": 0.0,
+                "childCpuSeconds": 0.0
+            })
+            entry["calls"] += 1
+            entry["wallSeconds"] += time.perf_counter() - wall_start
+            entry["cpuSeconds"] += time.process_time() - cpu_start
+            entry["childCpuSeconds"] += children_cpu_seconds() - children_start
+            entry["peakRssBytes"] = peak_rss_bytes()
+
+            if self.trace_memory:
+                self._record_peak()
+                frame = self._open.pop()
+                entry["pythonPeakBytes"] = max(entry.get("pythonPeakBytes", 0),
+                                               frame["peak"] - frame["baseline"])
+
+    def as_dict(self):
+        stages = {}
+        for name, entry in self.stages.items():
+            stages[name] = dict(entry)
+            for key in ("wallSeconds", "cpuSeconds", "childCpuSeconds"):
+                stages[name][key] = round(entry[key], 3)
+
+        return {
+            "stages": stages,
+            "wallSeconds": round(self._wall_total, 3),
+            "cpuSeconds": round(self._cpu_total, 3),
+            "childCpuSeconds": round(self._children_total, 3),
+            "peakRssBytes": peak_rss_bytes(),
+            "pythonPeakBytes": self._python_peak
+        }
+
+    def _record_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            frame["peak"] = max(frame["peak"], peak)
+
+@contextmanager
+def stage(name):
+    """Measure the enclosed block as a stage of the current job, if instrumented"""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+@contextmanager
+def collect_metrics(enabled=True, trace_memory=True):
+    """Instrument the enclosed job; yields its StageMetrics, or None if disabled"""
+    global _active
+    if not enabled:
+        yield None
+        return
+
+    metrics = StageMetrics(trace_memory)
+    previous, _active = _active, metrics
+    metrics.start()
+    try:
+        yield metrics
+    finally:
+        metrics.stop()
+        _active = previous
+
+@contextmanager
+def profile_job(profile_dir, job_name):
+    """
+    Profile the enclosed job with cProfile and write a pstats dump to profile_dir
+    Yields the dump path, or None if profile_dir is not set
+    """
+    if not profile_dir:
+        yield None
+        return
+
+    import cProfile
+
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(job_name))[:64]
+    path = os.path.abspath(os.path.join(
+        profile_dir, f"{safe_name}-{os.getpid()}-{int(time.time() * 1000)}.pstats"
+    ))
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(path)
+            logger.info(f"Wrote profile to {path}")
+        except OSError as e:
+            logger.error(f"Could not write profile: {str(e)}")
+
+def instrumented(job_name, run, metrics=False, profile_dir=None):
+    """
+    Run a job (a callable returning a result dict) with the requested
+    instrumentation, adding "metrics" and "profile" to its result
+    """
+    with collect_metrics(metrics) as job_metrics, profile_job(profile_dir, job_name) as profile_path:
+        result = run()
+
+    if job_metrics is not None:
+        result["metrics"] = job_metrics.as_dict()
+    if profile_path is not None:
+        result["profile"] = profile_path
+    return result
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Indexed target-word matcher over timestamped transcripts
+The target vocabulary (words and multi-word phrases) is compiled once into two
+token tries, one of the exact forms and one of their Porter stems, and matched
+in a single pass over the recognised words, so every match carries the
+startTime/endTime of the words it covers and the cost per word does not grow
+with the number of targets
+"""
+
+import re
+from functools import lru_cache
+
+# Compiled matchers kept for repeated requests with the same target list
+MATCHER_CACHE_SIZE = 16
+STEM_CACHE_SIZE = 65536
+
+_VOWELS = "aeiou"
+
+# Porter stemmer rules: (suffix, replacement), longest suffixes first
+_STEP2_RULES = [
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"), ("izer", "ize"),
+    ("bli", "ble"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous"),
+    ("ization", "ize"), ("ation", "ate"), ("ator", "ate"), ("alism", "al"), ("iveness", "ive"),
+    ("fulness", "ful"), ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+    ("logi", "log")
+]
+_STEP3_RULES = [
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"), ("ful", ""), ("ness", "")
+]
+_STEP4_SUFFIXES = [
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent", "ion", "ou", "ism",
+    "ate", "iti", "ous", "ive", "ize"
+]
+_STEP2_RULES.sort(key=lambda rule: -len(rule[0]))
+_STEP3_RULES.sort(key=lambda rule: -len(rule[0]))
+_STEP4_SUFFIXES.sort(key=len, reverse=True)
+
+def normalize_token(word):
+    """Lowercase a word and strip surrounding punctuation, as normalize_word does for keywords"""
+    return re.sub(r"[^\w'\s-]", "", word.lower()).strip()
+
+def _is_consonant(word, index):
+    letter = word[index]
+    if letter in _VOWELS:
+        return False
+    if letter == "y":
+        return index == 0 or not _is_consonant(word, index - 1)
+    return True
+
+def _measure(stem):
+    """Porter's m: the number of vowel-consonant sequences in the stem"""
+    forms = "".join("c" if _is_consonant(stem, index) else "v" for index in range(len(stem)))
+    return re.sub(r"(.)\1+", r"\1", forms).count("vc")
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, index) for index in range(len(stem)))
+
+def _ends_double_consonant(word):
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+def _ends_cvc(word):
+    return (len(word) >= 3 and _is_consonant(word, len(word) - 3) and not _is_consonant(word, len(word) - 2)
+            and _is_consonant(word, len(word) - 1) and word[-1] not in "wxy")
+
+def _replace_suffix(word, rules, min_measure):
+    """Apply the first rule whose suffix matches, if the remaining stem is long enough"""
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            return stem + replacement if _measure(stem) > min_measure else word
+    return word
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def porter_stem(word):
+    """Porter stem of a lowercase word (the algorithm natural.PorterStemmer implements)"""
+    if len(word) <= 2 or not word.isalpha():
+        return word
+
+    # Step 1a: plurals
+    if word.endswith("sses") or word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # Step 1b: -eed, -ed, -ing
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif _ends_double_consonant(word) and word[-1] not in "lsz":
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += "e"
+                break
+
+    # Step 1c: y -> i
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    # Steps 2 and 3: double and single suffixes
+    word = _replace_suffix(word, _STEP2_RULES, 0)
+    word = _replace_suffix(word, _STEP3_RULES, 0)
+
+    # Step 4: remove suffixes from long stems
+    for suffix in _STEP4_SUFFIXES:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if _measure(stem) > 1 and (suffix != "ion" or stem.endswith(("s", "t"))):
+                word = stem
+            break
+
+    # Step 5: final -e and -ll
+    if word.endswith("e"):
+        stem = word[:-1]
+        if _measure(stem) > 1 or (_measure(stem) == 1 and not _ends_cvc(stem)):
+            word = stem
+    if _measure(word) > 1 and _ends_double_consonant(word) and word.endswith("l"):
+        word = word[:-1]
+
+    return word
+
+class TargetMatcher:
+    """Target words and phrases compiled into exact and stemmed token tries"""
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.exact = {}
+        self.stemmed = {}
+        for target in self.targets:
+            tokens = normalize_token(target).split()
+            if tokens:
+                self._insert(self.exact, tokens, target)
+                self._insert(self.stemmed, [porter_stem(token) for token in tokens], target)
+
+    def match(self, words):
+        """
+        Find the targets in a list of words with "word", "startTime" and "endTime"
+        keys, longest match first and without overlaps (an exact match beats a
+        stemmed one of the same length). Every match is a replacement span:
+        {"word", "targetWord", "matchType", "position", "length", "startTime",
+        "endTime", "confidence"}, with position/length indexing into words.
+        """
+        tokens = [normalize_token(str(word.get("word", ""))) for word in words]
+        stems = [porter_stem(token) for token in tokens]
+
+        matches = []
+        position = 0
+        while position < len(words):
+            length, target = self._longest(self.exact, tokens, position)
+            match_type = "exact"
+            stem_length, stem_target = self._longest(self.stemmed, stems, position)
+            if stem_length > length:
+                length, target, match_type = stem_length, stem_target, "stem"
+            if not length:
+                position += 1
+                continue
+
+            matched = words[position:position + length]
+            matches.append({
+                "word": " ".join(str(word.get("word", "")).strip() for word in matched),
+                "targetWord": target,
+                "matchType": match_type,
+                "position": position,
+                "length": length,
+                "startTime": matched[0].get("startTime"),
+                "endTime": matched[-1].get("endTime"),
+                "confidence": min(word.get("confidence", 1.0) for word in matched)
+            })
+            position += length
+
+        return matches
+
+    @staticmethod
+    def _insert(trie, tokens, target):
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # The first target with these tokens wins
+        node.setdefault(None, target)
+
+    @staticmethod
+    def _longest(trie, tokens, position):
+        """(length, target) of the longest target starting at position, or (0, None)"""
+        node = trie
+        best = (0, None)
+        for index in range(position, len(tokens)):
+            node = node.get(tokens[index])
+            if node is None:
+                break
+            if None in node:
+                best = (index - position + 1, node[None])
+        return best
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _compiled_matcher(targets):
+    return TargetMatcher(targets)
+
+def compile_targets(targets):
+    """A TargetMatcher for a target list, compiled once per distinct list"""
+    return _compiled_matcher(tuple(targets))
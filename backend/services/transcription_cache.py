@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for transcription results
+Entries are keyed by a hash of the decoded PCM and the recognition settings,
+stored as compressed JSON in SQLite and evicted least-recently-used by size
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "cache", "transcriptions.sqlite")
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+class TranscriptionCache:
+    """SQLite-backed LRU cache of transcription results"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(audio_data, **settings):
+        """Build a cache key from the decoded PCM samples and the recognition settings"""
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(memoryview(audio_data).cast("B"))
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss"""
+        row = self.connection.execute(
+            "SELECT data FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            self._increment("misses")
+            self.connection.commit()
+            return None
+
+        self.connection.execute(
+            "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        self._increment("hits")
+        self.connection.commit()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key, result):
+        """Store a result and evict the least recently used entries if over budget"""
+        data = zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries (key, data, size, created, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now)
+        )
+        self._evict()
+        self.connection.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache"""
+        counters = dict(self.connection.execute("SELECT name, value FROM stats").fetchall())
+        entries, total_bytes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total_bytes,
+            "maxBytes": self.max_bytes,
+            "path": self.path
+        }
+
+    def close(self):
+        self.connection.close()
+
+    def _increment(self, name, amount=1):
+        self.connection.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def _evict(self):
+        total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = self.connection.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total_bytes -= size
+
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._increment("evictions", len(evicted))
+        logger.info(f"Evicted {len(evicted)} transcription cache entries")
+
+def open_transcription_cache():
+    """
+    Open the cache configured through the environment
+    TRANSCRIPTION_CACHE_PATH and TRANSCRIPTION_CACHE_MAX_BYTES override the defaults;
+    TRANSCRIPTION_CACHE=off disables caching. Returns None if the cache is
+    disabled or cannot be opened.
+    """
+    if os.environ.get("TRANSCRIPTION_CACHE", "on").lower() in ("off", "false", "0"):
+        return None
+
+    try:
+        return TranscriptionCache(
+            os.environ.get("TRANSCRIPTION_CACHE_PATH", DEFAULT_CACHE_PATH),
+            int(os.environ.get("TRANSCRIPTION_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+        )
+    except Exception as e:
+        logger.error(f"Could not open transcription cache: {str(e)}")
+        return None
@@ -7,6 +7,22 @@ class TTSService {
         this.scriptPath = path.join(__dirname, 'tts_script.py');
     }
 
+    createScriptError(code, output, errorOutput) {
+        // --queue runs print a queueFull result when the TTS job queue is full
+        try {
+            const result = JSON.parse(output.trim());
+            if (result.queueFull) {
+                const error = new Error(result.error);
+                error.queueFull = true;
+                error.queueStats = result.queueStats;
+                return error;
+            }
+        } catch (parseError) {
+            // Not a queue rejection; report the script failure below
+        }
+        return new Error(`TTS script failed with code ${code}: ${errorOutput}`);
+    }
+
     async generateSpeech(text, outputPath, rate = 150, volume = 0.9) {
         return new Promise((resolve, reject) => {
             console.log(`🎤 Generating TTS for: "${text}"`);
@@ -17,13 +33,14 @@ class TTSService {
                 fs.mkdirSync(outputDir, { recursive: true });
             }
 
-            // Run Python TTS script
+            // Run Python TTS script, waiting for a slot in the machine-wide TTS job queue
             const pythonProcess = spawn('python', [
                 this.scriptPath,
                 text,
                 outputPath,
                 rate.toString(),
-                volume.toString()
+                volume.toString(),
+                '--queue'
             ]);
 
             let output = '';
@@ -54,7 +71,7 @@ class TTSService {
                     }
                 } else {
                     console.error('❌ TTS script failed:', errorOutput);
-                    reject(new Error(`TTS script failed with code ${code}: ${errorOutput}`));
+                    reject(this.createScriptError(code, output, errorOutput));
                 }
             });
 
@@ -65,6 +82,57 @@ class TTSService {
         });
     }
 
+    async generateSpeechBatch(jobs) {
+        // jobs: [{ text, outputPath, rate, volume }], synthesised by one tts_script.py run
+        return new Promise((resolve, reject) => {
+            console.log(`🎤 Generating TTS batch of ${jobs.length} phrases`);
+
+            const manifest = jobs.map((job) => ({
+                text: job.text,
+                output_path: job.outputPath,
+                rate: job.rate || 150,
+                volume: job.volume || 0.9
+            }));
+
+            const pythonProcess = spawn('python', [this.scriptPath, '--batch', '-', '--queue']);
+
+            let output = '';
+            let errorOutput = '';
+
+            pythonProcess.stdout.on('data', (data) => {
+                output += data.toString();
+            });
+
+            pythonProcess.stderr.on('data', (data) => {
+                errorOutput += data.toString();
+            });
+
+            pythonProcess.on('close', (code) => {
+                if (code === 0) {
+                    try {
+                        const result = JSON.parse(output.trim());
+                        console.log(`✅ TTS batch generated (${result.timings.total}s total)`);
+                        resolve(result);
+                    } catch (parseError) {
+                        console.error('❌ Failed to parse TTS batch result:', parseError);
+                        reject(new Error('Failed to parse TTS batch result'));
+                    }
+                } else {
+                    console.error('❌ TTS batch script failed:', errorOutput);
+                    reject(this.createScriptError(code, output, errorOutput));
+                }
+            });
+
+            pythonProcess.on('error', (error) => {
+                console.error('❌ Failed to start TTS batch script:', error);
+                reject(error);
+            });
+
+            pythonProcess.stdin.write(JSON.stringify(manifest));
+            pythonProcess.stdin.end();
+        });
+    }
+
     async generateMockSpeech(text, outputPath) {
         try {
             console.log(`🎭 Generating mock TTS for: "${text}"`);
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered TTS phrase bank
+Clips for the standard replacement vocabulary are packed into a single PCM
+file with a JSON offset index, so common replacements are served from a
+memory-mapped slice instead of a speech engine run
+"""
+
+import os
+import json
+import mmap
+import time
+import wave
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BANK_DIR = os.path.join(os.path.dirname(__file__), "..", "cache", "tts_phrase_bank")
+BANK_VERSION = 1
+# Lock files older than this are assumed to be left over from a crashed process
+STALE_LOCK_SECONDS = 60
+
+def make_phrase_key(text, rate, volume, voice=None):
+    """Build the index key for a phrase rendered with the given settings"""
+    return f"{voice or 'default'}|{int(rate)}|{float(volume):.2f}|{' '.join(text.lower().split())}"
+
+class PhraseBank:
+    """Packed PCM clips with an offset index, read through a read-only mmap"""
+
+    def __init__(self, bank_dir=DEFAULT_BANK_DIR):
+        self.bank_dir = os.path.abspath(bank_dir)
+        self.pcm_path = os.path.join(self.bank_dir, "phrases.pcm")
+        self.index_path = os.path.join(self.bank_dir, "index.json")
+        self.lock_path = os.path.join(self.bank_dir, "bank.lock")
+        self.index = self._read_index()
+        self._mapping = None
+        self._mapped_size = 0
+
+    def lookup(self, text, rate, volume, voice=None):
+        """Return the index entry for a phrase, or None if it has not been rendered"""
+        return self.index["entries"].get(make_phrase_key(text, rate, volume, voice))
+
+    def write_clip(self, entry, output_path):
+        """Write a banked clip to output_path as a WAV file"""
+        end = entry["offset"] + entry["length"]
+        mapping = self._map(end)
+
+        with wave.open(output_path, "wb") as wav_file:
+            wav_file.setnchannels(entry["channels"])
+            wav_file.setsampwidth(entry["sampleWidth"])
+            wav_file.setframerate(entry["sampleRate"])
+            wav_file.writeframes(mapping[entry["offset"]:end])
+
+    def add_clip(self, text, rate, volume, wav_path, voice=None):
+        """
+        Append a rendered WAV clip to the bank. Returns False if the clip could not
+        be read as WAV or the bank is locked by another process for too long.
+        """
+        try:
+            with wave.open(wav_path, "rb") as wav_file:
+                channels = wav_file.getnchannels()
+                sample_width = wav_file.getsampwidth()
+                sample_rate = wav_file.getframerate()
+                frames = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, EOFError, OSError) as e:
+            logger.warning(f"Cannot add '{text}' to phrase bank: {e}")
+            return False
+
+        key = make_phrase_key(text, rate, volume, voice)
+        try:
+            with self._lock():
+                # Another process may have appended since we read the index
+                self.index = self._read_index()
+                if key in self.index["entries"]:
+                    return True
+
+                with open(self.pcm_path, "ab") as pcm_file:
+                    offset = pcm_file.tell()
+                    pcm_file.write(frames)
+
+                self.index["entries"][key] = {
+                    "offset": offset,
+                    "length": len(frames),
+                    "sampleRate": sample_rate,
+                    "channels": channels,
+                    "sampleWidth": sample_width
+                }
+                self._write_index()
+        except TimeoutError:
+            logger.warning("Phrase bank is locked, not adding new clip")
+            return False
+
+        return True
+
+    def close(self):
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def _map(self, required_size):
+        """Map the PCM file, remapping if it has grown past the current mapping"""
+        if self._mapping is None or self._mapped_size < required_size:
+            self.close()
+            with open(self.pcm_path, "rb") as pcm_file:
+                self._mapping = mmap.mmap(pcm_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = len(self._mapping)
+        return self._mapping
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+            if index.get("version") == BANK_VERSION:
+                return index
+            logger.warning("Phrase bank index has an old version, ignoring it")
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.warning(f"Phrase bank index is unreadable, ignoring it: {e}")
+        return {"version": BANK_VERSION, "entries": {}}
+
+    def _write_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(self.index, index_file, separators=(",", ":"))
+        os.replace(temp_path, self.index_path)
+
+    @contextmanager
+    def _lock(self, timeout=10):
+        os.makedirs(self.bank_dir, exist_ok=True)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError("Timed out waiting for the phrase bank lock")
+                time.sleep(0.05)
+
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(self.lock_path)
+
+def open_phrase_bank():
+    """
+    Open the phrase bank configured through the environment
+    TTS_PHRASE_BANK_DIR overrides the default location; TTS_PHRASE_BANK=off
+    disables it. Returns None if the bank is disabled.
+    """
+    if os.environ.get("TTS_PHRASE_BANK", "on").lower() in ("off", "false", "0"):
+        return None
+    return PhraseBank(os.environ.get("TTS_PHRASE_BANK_DIR", DEFAULT_BANK_DIR))
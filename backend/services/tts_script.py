@@ -9,34 +9,51 @@ import json
 import os
 import tempfile
 import logging
+import time
+
+from tts_phrase_bank import open_phrase_bank
+from stage_metrics import stage, instrumented
+from job_scheduler import QueueFull, job_key, open_job_scheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# TTS runs are queued with the other TTS runs on the machine, sized by cores
+# and by available memory at about this much per running pyttsx3 process
+TTS_WORKER_MEMORY_BYTES = 256 * 1024 * 1024
+
+def init_pyttsx3_engine():
+    """Initialise the pyttsx3 engine and select the preferred voice"""
+    import pyttsx3
+    
+    engine = pyttsx3.init()
+    
+    # Try to set a better voice if available
+    voices = engine.getProperty('voices')
+    if voices:
+        # Prefer female voice or first available voice
+        for voice in voices:
+            if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                break
+    
+    return engine
+
 def generate_tts_with_pyttsx3(text, output_path, rate=150, volume=0.9):
     """Generate TTS using pyttsx3 (offline)"""
     try:
-        import pyttsx3
-        
-        engine = pyttsx3.init()
+        with stage("engine_init"):
+            engine = init_pyttsx3_engine()
         
         # Configure voice properties
         engine.setProperty('rate', rate)  # Speed of speech
         engine.setProperty('volume', volume)  # Volume level
         
-        # Try to set a better voice if available
-        voices = engine.getProperty('voices')
-        if voices:
-            # Prefer female voice or first available voice
-            for voice in voices:
-                if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                    engine.setProperty('voice', voice.id)
-                    break
-        
         # Generate speech and save to file
         engine.save_to_file(text, output_path)
-        engine.runAndWait()
+        with stage("synthesis"):
+            engine.runAndWait()
         
         logger.info(f"TTS generated successfully with pyttsx3: {output_path}")
         return True
@@ -48,17 +65,66 @@ def generate_tts_with_pyttsx3(text, output_path, rate=150, volume=0.9):
         logger.error(f"pyttsx3 TTS generation failed: {e}")
         return False
 
+def generate_batch_with_pyttsx3(jobs):
+    """
+    Generate TTS for many jobs with a single pyttsx3 engine
+    All save_to_file calls are queued and rendered by one runAndWait()
+    Returns a dict of per-job synthesis times in seconds (keyed by job index)
+    for the jobs the engine reported on, or None if pyttsx3 is unavailable
+    """
+    try:
+        with stage("engine_init"):
+            engine = init_pyttsx3_engine()
+    except ImportError:
+        logger.warning("pyttsx3 not available")
+        return None
+    except Exception as e:
+        logger.error(f"pyttsx3 initialisation failed: {e}")
+        return None
+    
+    started = {}
+    durations = {}
+    
+    def on_start(name):
+        started[name] = time.perf_counter()
+    
+    def on_finish(name, completed):
+        if name in started:
+            durations[name] = round(time.perf_counter() - started[name], 3)
+    
+    engine.connect('started-utterance', on_start)
+    engine.connect('finished-utterance', on_finish)
+    
+    default_voice = engine.getProperty('voice')
+    
+    # Property changes are queued along with the utterances, so each job
+    # is rendered with its own voice, rate and volume
+    for index, job in enumerate(jobs):
+        engine.setProperty('voice', job.get('voice') or default_voice)
+        engine.setProperty('rate', job['rate'])
+        engine.setProperty('volume', job['volume'])
+        engine.save_to_file(job['text'], job['output_path'], name=str(index))
+    
+    try:
+        with stage("synthesis"):
+            engine.runAndWait()
+    except Exception as e:
+        logger.error(f"pyttsx3 batch TTS generation failed: {e}")
+    
+    return {int(name): duration for name, duration in durations.items()}
+
 def create_silence(duration_seconds, output_path, sample_rate=44100):
     """Create a silent audio file of specified duration"""
     try:
         from pydub import AudioSegment
         
-        # Create silence
-        silence = AudioSegment.silent(duration=duration_seconds * 1000)  # duration in milliseconds
-        silence = silence.set_frame_rate(sample_rate).set_channels(2)
-        
-        # Export as WAV
-        silence.export(output_path, format="wav")
+        with stage("silence"):
+            # Create silence
+            silence = AudioSegment.silent(duration=duration_seconds * 1000)  # duration in milliseconds
+            silence = silence.set_frame_rate(sample_rate).set_channels(2)
+            
+            # Export as WAV
+            silence.export(output_path, format="wav")
         
         logger.info(f"Silence generated: {output_path} ({duration_seconds}s)")
         return True
@@ -67,17 +133,240 @@ def create_silence(duration_seconds, output_path, sample_rate=44100):
         logger.error(f"Failed to create silence: {e}")
         return False
 
-def main():
-    if len(sys.argv) < 3:
-        print(json.dumps({
-            "error": "Usage: python tts_script.py <text> <output_path> [rate] [volume]"
-        }))
-        sys.exit(1)
+def read_manifest(manifest_path):
+    """Read a JSON manifest from a file, or from stdin when manifest_path is "-" """
+    if manifest_path == "-":
+        return json.load(sys.stdin)
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+def load_batch_manifest(manifest_path):
+    """
+    Read a batch manifest: a JSON list of {"text", "output_path", "rate", "volume",
+    "voice"} jobs, where everything but text and output_path is optional
+    """
+    jobs = read_manifest(manifest_path)
+    
+    if not isinstance(jobs, list):
+        raise ValueError("Batch manifest must be a JSON list of jobs")
+    
+    return [{
+        "text": job["text"],
+        "output_path": job["output_path"],
+        "rate": int(job.get("rate", 150)),
+        "volume": float(job.get("volume", 0.9)),
+        "voice": job.get("voice")
+    } for job in jobs]
+
+def write_from_bank(bank, job):
+    """Write a job's clip from the phrase bank, returns False if it is not banked"""
+    if bank is None:
+        return False
+    
+    entry = bank.lookup(job["text"], job["rate"], job["volume"], job.get("voice"))
+    if entry is None:
+        return False
+    
+    try:
+        with stage("bank_read"):
+            bank.write_clip(entry, job["output_path"])
+        logger.info(f"TTS served from phrase bank: '{job['text']}'")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not read '{job['text']}' from phrase bank: {e}")
+        return False
+
+def staging_path(output_path):
+    """Path next to output_path that the engine renders to before the clip is moved into place"""
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.{os.getpid()}.partial{extension}"
+
+def move_into_place(staged_path, output_path):
+    """
+    Replace output_path with a clip rendered at staged_path
+    Returns False, leaving output_path alone, if the engine wrote nothing there,
+    so that a file left by an earlier run is never taken for this run's output
+    """
+    if not os.path.exists(staged_path):
+        return False
+    if os.path.getsize(staged_path) == 0:
+        os.remove(staged_path)
+        return False
+    os.replace(staged_path, output_path)
+    return True
+
+def run_batch(manifest_path, bank=None):
+    """
+    Synthesise every job of a batch manifest
+    Phrases found in the phrase bank are copied out of it; the rest are rendered
+    with one engine run and appended to the bank
+    """
+    total_start = time.perf_counter()
+    jobs = load_batch_manifest(manifest_path)
+    logger.info(f"Generating TTS for {len(jobs)} batch jobs")
+    
+    for job in jobs:
+        output_dir = os.path.dirname(job["output_path"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+    
+    methods = {}
+    item_times = {}
+    written = set()
+    bank_start = time.perf_counter()
+    for index, job in enumerate(jobs):
+        item_start = time.perf_counter()
+        if write_from_bank(bank, job):
+            methods[index] = "bank"
+            written.add(index)
+            item_times[index] = round(time.perf_counter() - item_start, 3)
+    bank_time = round(time.perf_counter() - bank_start, 3)
+    
+    pending = [index for index in range(len(jobs)) if index not in methods]
+    # The engine renders to staging paths, and only the clips it actually wrote
+    # replace the outputs
+    staged_jobs = [dict(jobs[index], output_path=staging_path(jobs[index]["output_path"])) for index in pending]
+    for job in staged_jobs:
+        if os.path.exists(job["output_path"]):
+            os.remove(job["output_path"])
+    
+    synthesis_start = time.perf_counter()
+    durations = generate_batch_with_pyttsx3(staged_jobs) if pending else {}
+    synthesis_time = round(time.perf_counter() - synthesis_start, 3)
     
-    text = sys.argv[1]
-    output_path = sys.argv[2]
-    rate = int(sys.argv[3]) if len(sys.argv) > 3 else 150
-    volume = float(sys.argv[4]) if len(sys.argv) > 4 else 0.9
+    for position, index in enumerate(pending):
+        job = jobs[index]
+        item_start = time.perf_counter()
+        staged_path = staged_jobs[position]["output_path"]
+        
+        if durations is not None and move_into_place(staged_path, job["output_path"]):
+            methods[index] = "pyttsx3"
+            written.add(index)
+            # None when the driver does not report utterance events
+            item_times[index] = durations.get(position)
+            if bank is not None:
+                with stage("bank_store"):
+                    bank.add_clip(job["text"], job["rate"], job["volume"], job["output_path"], job["voice"])
+        else:
+            # Fallback: Create silence for any job the engine did not render
+            logger.warning(f"TTS failed for '{job['text']}', creating silence as fallback")
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+            methods[index] = "silence"
+            word_duration = max(0.5, len(job["text"].split()) * 0.3)  # Estimate duration
+            if create_silence(word_duration, job["output_path"]):
+                written.add(index)
+            item_times[index] = round(time.perf_counter() - item_start, 3)
+    
+    results = []
+    for index, job in enumerate(jobs):
+        if index in written:
+            results.append({
+                "success": True,
+                "output_path": job["output_path"],
+                "text": job["text"],
+                "file_size": os.path.getsize(job["output_path"]),
+                "method": methods[index],
+                "time": item_times[index]
+            })
+        else:
+            results.append({
+                "success": False,
+                "error": "Failed to generate TTS audio",
+                "text": job["text"]
+            })
+    
+    return {
+        "success": all(result["success"] for result in results),
+        "results": results,
+        "timings": {
+            "bank": bank_time,
+            "synthesis": synthesis_time,
+            "total": round(time.perf_counter() - total_start, 3)
+        }
+    }
+
+def build_phrase_bank(manifest_path, bank):
+    """
+    Render every phrase at every (rate, volume, voice) combination of a manifest
+    into the phrase bank, skipping combinations that are already banked
+    
+    Manifest format: {"phrases": [...], "rates": [150], "volumes": [0.9], "voices": [null]}
+    """
+    manifest = read_manifest(manifest_path)
+    phrases = sorted(set(manifest["phrases"]))
+    rates = manifest.get("rates", [150])
+    volumes = manifest.get("volumes", [0.9])
+    voices = manifest.get("voices", [None])
+    
+    render_dir = tempfile.mkdtemp(prefix="tts_bank_")
+    jobs = []
+    skipped = 0
+    for voice in voices:
+        for rate in rates:
+            for volume in volumes:
+                for text in phrases:
+                    if bank.lookup(text, rate, volume, voice) is not None:
+                        skipped += 1
+                        continue
+                    jobs.append({
+                        "text": text,
+                        "output_path": os.path.join(render_dir, f"phrase_{len(jobs)}.wav"),
+                        "rate": int(rate),
+                        "volume": float(volume),
+                        "voice": voice
+                    })
+    
+    logger.info(f"Rendering {len(jobs)} phrases into the phrase bank ({skipped} already banked)")
+    rendered = 0
+    try:
+        if jobs and generate_batch_with_pyttsx3(jobs) is not None:
+            for job in jobs:
+                if os.path.exists(job["output_path"]) and bank.add_clip(
+                        job["text"], job["rate"], job["volume"], job["output_path"], job["voice"]):
+                    rendered += 1
+    finally:
+        for job in jobs:
+            if os.path.exists(job["output_path"]):
+                os.remove(job["output_path"])
+        os.rmdir(render_dir)
+    
+    return {
+        "success": rendered == len(jobs),
+        "rendered": rendered,
+        "skipped": skipped,
+        "failed": len(jobs) - rendered,
+        "entries": len(bank.index["entries"])
+    }
+
+def run_command(args):
+    """Run the command given by the command-line arguments, returns (result, exit code)"""
+    if len(args) == 2 and args[0] == "--batch":
+        try:
+            return run_batch(args[1], open_phrase_bank()), 0
+        except Exception as e:
+            return {"success": False, "error": str(e), "results": []}, 1
+    
+    if len(args) == 2 and args[0] == "--build-bank":
+        try:
+            bank = open_phrase_bank()
+            if bank is None:
+                raise ValueError("TTS phrase bank is disabled")
+            return build_phrase_bank(args[1], bank), 0
+        except Exception as e:
+            return {"success": False, "error": str(e)}, 1
+    
+    if len(args) < 2:
+        return {
+            "error": "Usage: python tts_script.py <text> <output_path> [rate] [volume] "
+                     "| --batch <manifest.json|-> | --build-bank <manifest.json|-> "
+                     "[--metrics] [--profile <dir>]"
+        }, 1
+    
+    text = args[0]
+    output_path = args[1]
+    rate = int(args[2]) if len(args) > 2 else 150
+    volume = float(args[3]) if len(args) > 3 else 0.9
     
     try:
         logger.info(f"Generating TTS for: '{text}'")
@@ -87,8 +376,20 @@ def main():
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
         
-        # Try TTS with pyttsx3
-        success = generate_tts_with_pyttsx3(text, output_path, rate, volume)
+        job = {"text": text, "output_path": output_path, "rate": rate, "volume": volume}
+        bank = open_phrase_bank()
+        
+        # Serve the phrase from the bank, or render it with pyttsx3 and bank it
+        success = write_from_bank(bank, job)
+        if not success:
+            staged_path = staging_path(output_path)
+            success = (generate_tts_with_pyttsx3(text, staged_path, rate, volume)
+                       and move_into_place(staged_path, output_path))
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+            if success and bank is not None:
+                with stage("bank_store"):
+                    bank.add_clip(text, rate, volume, output_path)
         
         # Fallback: Create silence if TTS fails
         if not success:
@@ -114,7 +415,7 @@ def main():
                 "text": text
             }
         
-        print(json.dumps(result))
+        return result, 0
         
     except Exception as e:
         error_result = {
@@ -122,8 +423,48 @@ def main():
             "error": str(e),
             "text": text
         }
-        print(json.dumps(error_result))
-        sys.exit(1)
+        return error_result, 1
+
+def main():
+    args = sys.argv[1:]
+    
+    # Instrumentation options: --metrics adds per-stage "metrics" to the result,
+    # --profile <dir> writes a cProfile dump of the run
+    metrics = "--metrics" in args
+    if metrics:
+        args.remove("--metrics")
+    # --queue runs through the machine-wide job queue instead of right away
+    use_queue = "--queue" in args
+    if use_queue:
+        args.remove("--queue")
+    profile_dir = None
+    if "--profile" in args:
+        position = args.index("--profile")
+        profile_dir = args[position + 1] if position + 1 < len(args) else "."
+        del args[position:position + 2]
+    
+    exit_codes = []
+    
+    def run():
+        result, exit_code = run_command(args)
+        exit_codes.append(exit_code)
+        return result
+    
+    scheduler = open_job_scheduler("tts", TTS_WORKER_MEMORY_BYTES) if use_queue else None
+    if scheduler is None:
+        print(json.dumps(instrumented("tts", run, metrics, profile_dir)))
+    else:
+        # Every run writes its own output files, so there is nothing to share
+        # between runs: the key is unique to this process. Runs start in order.
+        try:
+            result = scheduler.run(job_key("tts", {"args": args, "pid": os.getpid()}), {"args": args}, 0,
+                                   lambda: instrumented("tts", run, metrics, profile_dir))
+        except QueueFull as e:
+            result = {"success": False, "error": str(e), "queueFull": True, "queueStats": e.stats}
+            exit_codes.append(1)
+        print(json.dumps(result))
+    if exit_codes[0]:
+        sys.exit(exit_codes[0])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const fs = require('fs');
+
+// Sidecar layout written by waveform_peaks.py: magic, uint32 LE header length,
+// JSON header, then every level's int8 (min, max) pairs
+const PEAKS_MAGIC = Buffer.from('PEAKS\x01', 'latin1');
+const PEAKS_PREAMBLE_BYTES = PEAKS_MAGIC.length + 4;
+
+class WaveformService {
+    constructor() {
+        this.scriptPath = path.join(__dirname, 'waveform_peaks.py');
+        // Sidecars being computed, by audio path, so that a request for the
+        // peaks waits for the running computation instead of starting another
+        this.pending = new Map();
+    }
+
+    peaksPath(audioPath) {
+        return `${audioPath}.peaks`;
+    }
+
+    generatePeaks(audioPath) {
+        if (this.pending.has(audioPath)) {
+            return this.pending.get(audioPath);
+        }
+
+        const promise = new Promise((resolve, reject) => {
+            const pythonProcess = spawn('python', [this.scriptPath, audioPath, this.peaksPath(audioPath)]);
+
+            let output = '';
+            let errorOutput = '';
+
+            pythonProcess.stdout.on('data', (data) => {
+                output += data.toString();
+            });
+
+            pythonProcess.stderr.on('data', (data) => {
+                errorOutput += data.toString();
+            });
+
+            pythonProcess.on('close', (code) => {
+                if (code === 0) {
+                    try {
+                        const result = JSON.parse(output.trim());
+                        console.log(`🌊 Waveform peaks ready for ${path.basename(audioPath)} (${result.timings.total}s)`);
+                        resolve(result);
+                    } catch (parseError) {
+                        reject(new Error('Failed to parse waveform peaks result'));
+                    }
+                } else {
+                    reject(new Error(`Waveform peaks script failed with code ${code}: ${errorOutput}`));
+                }
+            });
+
+            pythonProcess.on('error', (error) => {
+                reject(new Error(`Failed to start waveform peaks script: ${error.message}`));
+            });
+        }).finally(() => {
+            this.pending.delete(audioPath);
+        });
+
+        this.pending.set(audioPath, promise);
+        return promise;
+    }
+
+    async getPeaks(audioPath, width = 0) {
+        // Computed on upload and after processing; compute now if missing or stale
+        const peaksPath = this.peaksPath(audioPath);
+        if (this.pending.has(audioPath) || !this.isFresh(peaksPath, audioPath)) {
+            await this.generatePeaks(audioPath);
+        }
+        return this.readPeakLevel(peaksPath, width);
+    }
+
+    isFresh(peaksPath, audioPath) {
+        try {
+            return fs.statSync(peaksPath).mtimeMs >= fs.statSync(audioPath).mtimeMs;
+        } catch (error) {
+            return false;
+        }
+    }
+
+    async readPeakLevel(peaksPath, width = 0) {
+        // Reads only the header and the one level that is needed
+        const file = await fs.promises.open(peaksPath, 'r');
+        try {
+            const preamble = Buffer.alloc(PEAKS_PREAMBLE_BYTES);
+            await file.read(preamble, 0, PEAKS_PREAMBLE_BYTES, 0);
+            if (!preamble.subarray(0, PEAKS_MAGIC.length).equals(PEAKS_MAGIC)) {
+                throw new Error('Not a waveform peaks file');
+            }
+
+            const headerLength = preamble.readUInt32LE(PEAKS_MAGIC.length);
+            const headerBytes = Buffer.alloc(headerLength);
+            await file.read(headerBytes, 0, headerLength, PEAKS_PREAMBLE_BYTES);
+            const header = JSON.parse(headerBytes.toString('utf8'));
+
+            // The coarsest level that still has a peak for every pixel, else the finest
+            let level = header.levels[0];
+            for (const candidate of header.levels) {
+                if (candidate.length >= width) {
+                    level = candidate;
+                }
+            }
+
+            const pairs = Buffer.alloc(level.length * 2);
+            await file.read(pairs, 0, pairs.length, PEAKS_PREAMBLE_BYTES + headerLength + level.offset);
+
+            return {
+                duration: header.duration,
+                sampleRate: header.sampleRate,
+                samplesPerPeak: level.samplesPerPeak,
+                bits: header.bits,
+                // Interleaved min/max pairs in -128..127
+                peaks: Array.from(new Int8Array(pairs.buffer, pairs.byteOffset, pairs.length))
+            };
+        } finally {
+            await file.close();
+        }
+    }
+
+    removePeaks(audioPath) {
+        const peaksPath = this.peaksPath(audioPath);
+        if (fs.existsSync(peaksPath)) {
+            fs.unlinkSync(peaksPath);
+        }
+    }
+}
+
+module.exports = new WaveformService();
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Waveform peak pyramid for the audio editor
+Computes min/max peaks at several zoom levels in one streaming pass over the
+decoded PCM and stores them in a compact sidecar next to the audio file, so
+the editor can draw the waveform without downloading and decoding the audio
+"""
+
+import sys
+import json
+import os
+import shutil
+import struct
+import subprocess
+import time
+import wave
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Peaks are computed on mono PCM at this rate
+PEAK_SAMPLE_RATE = 16000
+# The finest level has one min/max pair per BASE_SAMPLES_PER_PEAK samples (4 ms);
+# each coarser level merges LEVEL_FACTOR peaks of the one below, down to about
+# MIN_LEVEL_PEAKS peaks
+BASE_SAMPLES_PER_PEAK = 64
+LEVEL_FACTOR = 4
+MIN_LEVEL_PEAKS = 512
+# Samples decoded per block; a multiple of BASE_SAMPLES_PER_PEAK
+DECODE_BLOCK_SAMPLES = BASE_SAMPLES_PER_PEAK * 16384
+
+# Sidecar layout: PEAKS_MAGIC, a little-endian uint32 header length, the JSON
+# header, then every level's int8 (min, max) pairs, finest level first
+PEAKS_MAGIC = b"PEAKS\x01"
+PEAKS_SUFFIX = ".peaks"
+
+def peaks_path_for(audio_path):
+    """Sidecar path of an audio file"""
+    return audio_path + PEAKS_SUFFIX
+
+def stream_pcm_blocks(input_path, sample_rate=PEAK_SAMPLE_RATE, block_samples=DECODE_BLOCK_SAMPLES):
+    """
+    Yield mono 16-bit PCM blocks of block_samples samples (the last one shorter)
+    Decodes with ffmpeg when available; without it only WAV files can be read
+    (at their own sample rate, which is yielded first)
+    """
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        yield from stream_wav_blocks(input_path, block_samples)
+        return
+
+    command = [
+        ffmpeg_path, "-nostdin", "-v", "error",
+        "-i", input_path,
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        yield sample_rate
+        block_bytes = block_samples * 2
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0:
+            message = stderr.decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed to decode {input_path}: {message}")
+
+def stream_wav_blocks(input_path, block_samples=DECODE_BLOCK_SAMPLES):
+    """stream_pcm_blocks for 16-bit WAV files without ffmpeg: channels are mixed down"""
+    with wave.open(input_path, "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise RuntimeError("ffmpeg not found on PATH and the file is not 16-bit WAV")
+        channels = wav_file.getnchannels()
+        yield wav_file.getframerate()
+        while True:
+            frames = wav_file.readframes(block_samples)
+            if not frames:
+                break
+            block = np.frombuffer(frames, dtype=np.int16)
+            if channels > 1:
+                block = block.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            yield block
+
+def block_peaks(block, samples_per_peak=BASE_SAMPLES_PER_PEAK):
+    """Min and max of every samples_per_peak samples of a block (the last group may be partial)"""
+    whole = len(block) - len(block) % samples_per_peak
+    groups = block[:whole].reshape(-1, samples_per_peak)
+    mins, maxs = groups.min(axis=1), groups.max(axis=1)
+    if whole < len(block):
+        mins = np.append(mins, block[whole:].min())
+        maxs = np.append(maxs, block[whole:].max())
+    return mins, maxs
+
+def compute_peak_pyramid(blocks, samples_per_peak=BASE_SAMPLES_PER_PEAK, factor=LEVEL_FACTOR,
+                         min_peaks=MIN_LEVEL_PEAKS):
+    """
+    Build the peak pyramid from an iterable of PCM blocks whose lengths are
+    multiples of samples_per_peak (except the last)
+    Returns (sample count, [(samples per peak, mins, maxs), ...]) with int8 peaks,
+    finest level first; only the finest level touches the PCM
+    """
+    sample_count = 0
+    base_mins, base_maxs = [], []
+    for block in blocks:
+        if len(block) == 0:
+            continue
+        sample_count += len(block)
+        mins, maxs = block_peaks(block, samples_per_peak)
+        # int16 -> int8 keeps the top byte, which is plenty for drawing
+        base_mins.append((mins >> 8).astype(np.int8))
+        base_maxs.append((maxs >> 8).astype(np.int8))
+
+    mins = np.concatenate(base_mins) if base_mins else np.zeros(0, dtype=np.int8)
+    maxs = np.concatenate(base_maxs) if base_maxs else np.zeros(0, dtype=np.int8)
+    levels = [(samples_per_peak, mins, maxs)]
+
+    while len(mins) > min_peaks:
+        samples_per_peak *= factor
+        mins, maxs = block_peaks(mins, factor)[0], block_peaks(maxs, factor)[1]
+        levels.append((samples_per_peak, mins, maxs))
+
+    return sample_count, levels
+
+def write_peaks(peaks_path, sample_rate, sample_count, levels):
+    """Write the pyramid as a sidecar file (replaced atomically)"""
+    header = {
+        "sampleRate": sample_rate,
+        "duration": sample_count / sample_rate if sample_rate else 0,
+        "bits": 8,
+        "levels": []
+    }
+    offset = 0
+    for samples_per_peak, mins, _ in levels:
+        header["levels"].append({"samplesPerPeak": samples_per_peak, "length": len(mins), "offset": offset})
+        offset += 2 * len(mins)
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    temp_path = peaks_path + ".tmp"
+    with open(temp_path, "wb") as peaks_file:
+        peaks_file.write(PEAKS_MAGIC)
+        peaks_file.write(struct.pack("<I", len(header_bytes)))
+        peaks_file.write(header_bytes)
+        for _, mins, maxs in levels:
+            pairs = np.empty(2 * len(mins), dtype=np.int8)
+            pairs[0::2] = mins
+            pairs[1::2] = maxs
+            peaks_file.write(pairs.tobytes())
+    os.replace(temp_path, peaks_path)
+    return header
+
+def generate_peaks(input_path, peaks_path=None):
+    """Decode an audio file once and write its peak pyramid sidecar"""
+    total_start = time.perf_counter()
+    peaks_path = peaks_path or peaks_path_for(input_path)
+
+    blocks = stream_pcm_blocks(input_path)
+    sample_rate = next(blocks)
+    sample_count, levels = compute_peak_pyramid(blocks)
+    header = write_peaks(peaks_path, sample_rate, sample_count, levels)
+
+    elapsed = round(time.perf_counter() - total_start, 3)
+    logger.info(f"Computed {len(levels)} peak levels for {header['duration']:.1f}s of audio in {elapsed}s")
+
+    return {
+        "success": True,
+        "peaks_path": peaks_path,
+        "duration": header["duration"],
+        "levels": [level["samplesPerPeak"] for level in header["levels"]],
+        "size": os.path.getsize(peaks_path),
+        "timings": {"total": elapsed}
+    }
+
+def main():
+    """Usage: python waveform_peaks.py <audio_file> [peaks_path]"""
+    if len(sys.argv) not in (2, 3):
+        print(json.dumps({"success": False, "error": "Usage: python waveform_peaks.py <audio_file> [peaks_path]"}))
+        sys.exit(1)
+
+    try:
+        result = generate_peaks(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
+        print(json.dumps(result))
+
+    except Exception as e:
+        logger.error(f"Peak generation failed: {str(e)}")
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
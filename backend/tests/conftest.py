@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import wave
+
+import pytest
+
+# The Python services import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services"))
+
+SERVICES_DIR = os.path.join(os.path.dirname(__file__), "..", "services")
+SAMPLE_RATE = 16000
+
+# Stand-ins for the recognition engine and the decoder, so that the worker
+# modes can run end to end without models or ffmpeg. The recognizer reports
+# one word per second of audio.
+FAKE_VOSK = '''
+import json
+
+class Model:
+    def __init__(self, path):
+        pass
+
+class KaldiRecognizer:
+    def __init__(self, model, sample_rate, grammar=None):
+        self.seconds = 0.0
+        self.words = []
+
+    def SetWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        start = self.seconds
+        self.seconds += len(data) / 32000
+        if int(self.seconds) > int(start):
+            self.words.append({"word": "word%d" % int(start), "start": int(start) + 0.2,
+                               "end": int(start) + 0.6, "conf": 1.0})
+        return False
+
+    def PartialResult(self):
+        return json.dumps({"partial": ""})
+
+    def FinalResult(self):
+        return json.dumps({"text": " ".join(word["word"] for word in self.words), "result": self.words})
+'''
+
+FAKE_PYDUB = '''
+import array
+import wave
+
+class AudioSegment:
+    @staticmethod
+    def from_file(path):
+        segment = AudioSegment()
+        with wave.open(path) as wav:
+            segment.raw_data = wav.readframes(wav.getnframes())
+        return segment
+
+    def set_channels(self, channels):
+        return self
+
+    def set_frame_rate(self, rate):
+        return self
+
+    def set_sample_width(self, width):
+        return self
+
+    def get_array_of_samples(self):
+        samples = array.array("h")
+        samples.frombytes(self.raw_data)
+        return samples
+'''
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    """Write int16 mono samples as a WAV file"""
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return str(path)
+
+@pytest.fixture
+def fake_engines(tmp_path):
+    """
+    Environment for running speech_recognition_script.py with the fake Vosk
+    engine installed in an empty model store and its state kept in tmp_path
+    """
+    modules_dir = tmp_path / "fake_modules"
+    modules_dir.mkdir()
+    (modules_dir / "vosk.py").write_text(FAKE_VOSK)
+    (modules_dir / "pydub.py").write_text(FAKE_PYDUB)
+
+    model_dir = tmp_path / "models" / "vosk-small-en-us"
+    model_dir.mkdir(parents=True)
+    (model_dir / "MANIFEST.json").write_text(json.dumps({
+        "version": 1, "model": "vosk-small-en-us", "engine": "vosk", "path": ".", "files": {}
+    }))
+
+    return dict(
+        os.environ,
+        PYTHONPATH=str(modules_dir),
+        # Without ffmpeg on PATH the script decodes with (the fake) pydub
+        PATH=os.path.dirname(sys.executable),
+        SPEECH_ENGINES="vosk",
+        MODEL_STORE_DIR=str(tmp_path / "models"),
+        TRANSCRIPTION_CACHE_PATH=str(tmp_path / "transcriptions.sqlite"),
+        JOB_QUEUE_PATH=str(tmp_path / "jobs.sqlite")
+    )
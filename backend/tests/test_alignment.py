@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import speech_recognition_script as speech
+from conftest import SAMPLE_RATE
+
+def speech_bursts(spans, duration, seed=0):
+    """Noise in the speech band over the given (start, end) spans, silence elsewhere"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(duration * SAMPLE_RATE))
+    for start, end in spans:
+        first, last = int(start * SAMPLE_RATE), int(end * SAMPLE_RATE)
+        # Syllable-like loudness changes, so the envelope has dips
+        loudness = 0.6 + 0.4 * np.abs(np.sin(np.linspace(0, 3 * np.pi, last - first)))
+        samples[first:last] = rng.normal(0, 6000, last - first) * loudness
+    return samples.astype(np.int16)
+
+def covered(spans, time):
+    return any(start <= time <= end for start, end in spans)
+
+@pytest.mark.parametrize("words", [
+    ["alpha", "bravo"],
+    ["the", "quick", "brown", "fox", "jumps"],
+    ["supercalifragilistic"],
+])
+def test_aligned_words_cover_the_voiced_samples(words):
+    audio = speech_bursts([(3.0, 3.8), (5.5, 6.3)], 8.0)
+    spans = speech.align_words(words, audio)
+
+    voiced = np.flatnonzero(audio) / SAMPLE_RATE
+    uncovered = [time for time in voiced[::80] if not covered(spans, time)]
+    assert uncovered == []
+
+def test_aligned_words_stay_in_order_and_out_of_the_silence():
+    audio = speech_bursts([(3.0, 3.8), (5.5, 6.3)], 8.0)
+    spans = speech.align_words(["one", "two", "three", "four"], audio)
+
+    edges = [time for span in spans for time in span]
+    assert edges == sorted(edges)
+    assert all(end - start >= speech.ALIGN_MIN_WORD_SECONDS for start, end in spans)
+    # Neither the leading silence nor the pause is given to a word
+    assert spans[0][0] > 2.5
+    assert not any(start < 4.5 < end for start, end in spans)
+
+def test_words_between_timed_neighbours_fill_the_speech_between_them():
+    audio = speech_bursts([(1.0, 2.0), (2.5, 3.5), (4.0, 5.0)], 6.0)
+    result = {"words": [
+        {"word": "before", "startTime": 1.0, "endTime": 2.0},
+        {"word": "missing", "startTime": 0, "endTime": 0},
+        {"word": "after", "startTime": 4.0, "endTime": 5.0}
+    ]}
+    words = speech.fill_missing_timings(result, audio)["words"]
+
+    assert words[1]["source"] == "alignment"
+    assert words[1]["startTime"] <= 2.5 and words[1]["endTime"] >= 3.5
+    assert words[1]["startTime"] >= 2.0 and words[1]["endTime"] <= 4.0
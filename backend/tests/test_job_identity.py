@@ -0,0 +1,24 @@
+import numpy as np
+
+import speech_recognition_script as speech
+from transcription_cache import TranscriptionCache
+
+def test_cache_key_depends_on_enabled_engines(tmp_path, monkeypatch):
+    cache = TranscriptionCache(str(tmp_path / "transcriptions.sqlite"))
+    keys = []
+    monkeypatch.setattr(cache, "get", lambda key: keys.append(key) or {"text": "", "words": []})
+    audio_file = tmp_path / "audio.wav"
+    audio_file.write_bytes(b"")
+    monkeypatch.setattr(speech, "decode_audio", lambda path: np.zeros(speech.SAMPLE_RATE, dtype=np.int16))
+
+    for engines in (["whisper", "vosk"], ["vosk"]):
+        monkeypatch.setattr(speech, "ENGINE_ORDER", engines)
+        speech.transcribe_audio(str(audio_file), cache=cache)
+    assert len(keys) == 2 and keys[0] != keys[1]
+
+def test_queued_jobs_with_different_engines_do_not_match(monkeypatch):
+    monkeypatch.setattr(speech, "ENGINE_ORDER", ["whisper", "vosk"])
+    both = speech.queued_job_options({}, "cascade", "auto", False)
+    monkeypatch.setattr(speech, "ENGINE_ORDER", ["vosk"])
+    vosk_only = speech.queued_job_options({}, "cascade", "auto", False)
+    assert both != vosk_only
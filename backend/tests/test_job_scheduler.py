@@ -0,0 +1,85 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import job_scheduler
+from job_scheduler import JobScheduler, QueueFull
+
+RUNNER = os.getpid()
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = JobScheduler("speech", slots=1, max_queued=3, path=str(tmp_path / "jobs.sqlite"))
+    yield scheduler
+    scheduler.close()
+
+@pytest.fixture
+def dead_pid():
+    """Pid of a process that has exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_claim_runs_jobs_in_priority_order_within_the_slots(scheduler):
+    large, _ = scheduler.submit("large", {"name": "large"}, 10, RUNNER)
+    small, _ = scheduler.submit("small", {"name": "small"}, 1, RUNNER)
+
+    assert scheduler.claim(RUNNER) == {"id": small, "payload": {"name": "small"}}
+    # The only slot is taken until the job finishes
+    assert scheduler.claim(RUNNER) is None
+    scheduler.complete(small, {"text": "small"})
+    assert scheduler.claim(RUNNER)["id"] == large
+
+def test_claim_leaves_the_head_of_the_queue_to_its_runner(scheduler):
+    other, _ = scheduler.submit("other", {}, 1, RUNNER + 1)
+    mine, _ = scheduler.submit("mine", {}, 2, RUNNER)
+    assert scheduler.claim(RUNNER) is None
+    assert scheduler.claim(RUNNER + 1, mine) is None
+    assert scheduler.claim(RUNNER + 1, other)["id"] == other
+
+def test_waiting_jobs_age_ahead_of_newer_small_ones(scheduler):
+    large, _ = scheduler.submit("large", {}, 10, RUNNER)
+    small, _ = scheduler.submit("small", {}, 1, RUNNER)
+    assert scheduler.position(large) == 1
+
+    # 30 s of waiting at PRIORITY_AGING_PER_SECOND outweighs the priority gap
+    assert 10 - 30 * job_scheduler.PRIORITY_AGING_PER_SECOND < 1
+    scheduler.connection.execute("UPDATE jobs SET created = created - 30 WHERE id = ?", (large,))
+    assert (scheduler.position(large), scheduler.position(small)) == (0, 1)
+    assert scheduler.claim(RUNNER)["id"] == large
+
+def test_identical_jobs_are_shared_and_the_queue_is_bounded(scheduler):
+    first, deduplicated = scheduler.submit("same", {}, 1, RUNNER)
+    assert not deduplicated
+    assert scheduler.submit("same", {}, 5, RUNNER + 1) == (first, True)
+
+    scheduler.submit("two", {}, 1, RUNNER)
+    scheduler.submit("three", {}, 1, RUNNER)
+    with pytest.raises(QueueFull) as error:
+        scheduler.submit("four", {}, 1, RUNNER)
+    assert error.value.stats["queued"] == 3
+
+def test_reap_fails_the_jobs_of_dead_processes(scheduler, dead_pid):
+    orphaned, _ = scheduler.submit("orphaned", {}, 1, dead_pid)
+    crashed, _ = scheduler.submit("crashed", {}, 2, RUNNER)
+    alive, _ = scheduler.submit("alive", {}, 3, RUNNER)
+    scheduler.connection.execute("UPDATE jobs SET state = 'running', worker = ? WHERE id = ?",
+                                 (dead_pid, crashed))
+
+    assert sorted(scheduler.reap(force=True)) == sorted([orphaned, crashed])
+    assert scheduler.outcome(crashed) == ("failed", "The process running the job exited")
+    assert scheduler.outcome(alive) is None
+    # The freed slot goes to the next live job
+    assert scheduler.claim(RUNNER)["id"] == alive
+
+def test_run_stores_the_result_for_waiting_processes(scheduler):
+    result = scheduler.run("key", {}, 1, lambda: {"text": "hello"})
+    job_id, _ = scheduler.connection.execute("SELECT id, state FROM jobs WHERE key = 'key'").fetchone()
+    assert result == {"text": "hello"}
+    assert scheduler.outcome(job_id) == ("done", {"text": "hello"})
+
+    with pytest.raises(ValueError):
+        scheduler.run("broken", {}, 1, lambda: int("x"))
+    assert scheduler.stats()["running"] == 0
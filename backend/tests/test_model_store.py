@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import speech_recognition_script as speech
+from model_store import ModelNotInstalled, ModelStore
+
+@pytest.fixture
+def empty_store(tmp_path, monkeypatch):
+    """An empty model store, with Whisper enabled and no models loaded yet"""
+    monkeypatch.setattr(speech, "_model_store", ModelStore(str(tmp_path)))
+    monkeypatch.setattr(speech, "_model_cache", {})
+    monkeypatch.setattr(speech, "ENGINE_ORDER", ["whisper", "vosk"])
+    return tmp_path
+
+def test_missing_model_raises_without_downloading(empty_store):
+    with pytest.raises(ModelNotInstalled):
+        speech.get_whisper_model("base")
+    assert list(empty_store.iterdir()) == []
+
+def test_keyword_hits_are_unconfirmed_without_whisper_model(empty_store):
+    hits = [{"keyword": "hello", "start": 0.2, "end": 0.5, "conf": 0.9}]
+    result = speech.confirm_keyword_hits(np.zeros(speech.SAMPLE_RATE, dtype=np.int16), hits)
+    assert result == [{"keyword": "hello", "start": 0.2, "end": 0.5, "conf": 0.9, "confirmed": None}]
+
+def test_adaptive_falls_back_to_cascade_without_whisper_models(empty_store, monkeypatch):
+    cascade_result = {"text": "hello", "words": [], "source": "vosk"}
+    monkeypatch.setattr(speech, "run_engines_cascade", lambda audio_data, timings: cascade_result)
+    assert speech.run_engines_adaptive(np.zeros(speech.SAMPLE_RATE, dtype=np.int16), {}) is cascade_result
+
+def test_keyword_spotting_does_not_require_whisper(empty_store, monkeypatch):
+    monkeypatch.setattr(speech, "engine_installed", lambda engine_name: True)
+    assert speech.required_models() == ["whisper-base", "vosk-small-en-us"]
+    assert speech.required_models(keywords=True) == ["vosk-small-en-us"]
@@ -0,0 +1,110 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+import render_cache
+import splice_script as splice
+from render_cache import RenderCache
+
+RATE = splice.OUTPUT_SAMPLE_RATE
+
+def write_stereo_wav(path, frames):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(frames.astype("<i2").tobytes())
+    return str(path)
+
+def read_frames(path):
+    with wave.open(str(path), "rb") as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).reshape(-1, wav.getnchannels())
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """A 30 second stereo source, three clips and a render dir; ffmpeg replaced by a WAV reader"""
+    monkeypatch.setattr(splice, "decode_with_ffmpeg", lambda path, *args: read_frames(path))
+    rng = np.random.default_rng(0)
+    source = write_stereo_wav(tmp_path / "source.wav", rng.integers(-8000, 8000, (30 * RATE, 2)))
+    clips = [write_stereo_wav(tmp_path / f"clip{index}.wav", np.full((RATE // 2, 2), 1000 * (index + 1)))
+             for index in range(3)]
+    return {"source": source, "clips": clips, "render_dir": str(tmp_path / "source.wav.render"),
+            "tmp_path": tmp_path}
+
+def replacements(clips, *starts):
+    return [{"startTime": start, "endTime": start + 0.4, "clip_path": clips[index]}
+            for index, start in enumerate(starts)]
+
+def render(recording, edits, name="out.wav"):
+    output_path = str(recording["tmp_path"] / name)
+    result = splice.splice_audio(recording["source"], output_path, edits, render_dir=recording["render_dir"])
+    return result, read_frames(output_path)
+
+def full_splice(recording, edits):
+    output_path = str(recording["tmp_path"] / "full.wav")
+    splice.splice_audio(recording["source"], output_path, edits)
+    return read_frames(output_path)
+
+def test_unchanged_regions_are_reused(recording):
+    edits = replacements(recording["clips"], 2.0, 12.0, 22.0)
+    first, _ = render(recording, edits)
+    assert first["sourceDecoded"] and first["rendered"] == 3
+
+    again, output = render(recording, edits)
+    assert not again["sourceDecoded"] and again["rendered"] == 0
+    assert np.array_equal(output, full_splice(recording, edits))
+
+    edits[1]["startTime"], edits[1]["endTime"] = 13.0, 13.4
+    changed, output = render(recording, edits)
+    assert changed["rendered"] == 1 and changed["changed"] == 1
+    assert np.array_equal(output, full_splice(recording, edits))
+
+def test_regions_no_longer_used_are_pruned(recording):
+    render(recording, replacements(recording["clips"], 2.0, 12.0, 22.0))
+    render(recording, replacements(recording["clips"], 2.0))
+    regions_dir = os.path.join(recording["render_dir"], "regions")
+    assert len(os.listdir(regions_dir)) == 1
+
+def test_regions_pruned_by_a_concurrent_render_are_still_written(recording, monkeypatch):
+    edits = replacements(recording["clips"], 2.0, 12.0, 22.0)
+    render(recording, edits)
+    edits[2]["startTime"], edits[2]["endTime"] = 25.0, 25.4
+
+    # Another render of the same file finishes in between: every region is pruned
+    # right after this render looked it up or stored it
+    region, store_region = RenderCache.region, RenderCache.store_region
+    def region_then_prune(cache, key):
+        audio = region(cache, key)
+        cache.prune(set())
+        return audio
+    def store_then_prune(cache, key, audio):
+        store_region(cache, key, audio)
+        cache.prune(set())
+    monkeypatch.setattr(RenderCache, "region", region_then_prune)
+    monkeypatch.setattr(RenderCache, "store_region", store_then_prune)
+
+    result, output = render(recording, edits)
+    assert result["success"]
+    assert np.array_equal(output, full_splice(recording, edits))
+
+def test_long_sources_are_not_kept(recording, monkeypatch):
+    monkeypatch.setattr(render_cache, "MAX_SOURCE_BYTES", 1024)
+    edits = replacements(recording["clips"], 2.0, 12.0)
+    render(recording, edits)
+
+    again, output = render(recording, edits)
+    assert not os.path.exists(os.path.join(recording["render_dir"], "source.pcm"))
+    # Decoded again, but the spliced regions are still reused
+    assert again["sourceDecoded"] and again["rendered"] == 0
+    assert np.array_equal(output, full_splice(recording, edits))
+
+def test_a_changed_source_drops_the_old_regions(recording):
+    edits = replacements(recording["clips"], 2.0)
+    render(recording, edits)
+    write_stereo_wav(recording["source"], np.zeros((30 * RATE, 2)))
+
+    result, output = render(recording, edits)
+    assert result["sourceDecoded"] and result["rendered"] == 1
+    assert np.array_equal(output, full_splice(recording, edits))
@@ -0,0 +1,60 @@
+import json
+import math
+import base64
+from array import array
+
+from result_format import FLOAT_COLUMNS, encode_words, to_output_format
+
+def decode_column(typecode, data):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    return values
+
+def decode_words(columns):
+    """Python version of SpeechService.expandColumnarResult for one word list"""
+    words = [{"word": word} for word in columns["word"].split("\n")] if columns["count"] else []
+    for name in FLOAT_COLUMNS:
+        for word, value in zip(words, decode_column("f", columns[name])):
+            # float32 keeps about 7 significant digits; NaN marks a missing value
+            if not math.isnan(value):
+                word[name] = float(f"{value:.7g}")
+    for word, index in zip(words, decode_column("H", columns["source"])):
+        word["source"] = columns["sources"][index]
+    for name, values in columns.get("extra", {}).items():
+        for word, value in zip(words, values):
+            word[name] = value
+    return words
+
+WORDS = [
+    {"word": "hello", "startTime": 0.12, "endTime": 0.48, "confidence": 0.953, "source": "whisper"},
+    {"word": "world", "startTime": 0.5, "endTime": 1.234, "confidence": 0.8, "source": "vosk"},
+    {"word": "again", "startTime": 1.3, "endTime": 1.7, "confidence": 0.61, "source": "whisper",
+     "confirmed": True}
+]
+
+def test_columnar_words_round_trip():
+    result = {"text": "hello world again", "words": WORDS}
+    encoded = to_output_format(result, "columnar")
+
+    assert encoded["format"] == "columnar" and encoded["text"] == result["text"]
+    assert encoded["words"]["sources"] == ["whisper", "vosk"]
+    # Fields outside the standard columns come back as None on the words that lack them
+    assert decode_words(encoded["words"]) == [dict(word, confirmed=word.get("confirmed")) for word in WORDS]
+
+def test_missing_times_and_empty_lists_survive():
+    words = [{"word": "unaligned", "source": "vosk"}]
+    assert decode_words(encode_words(words)) == words
+    assert decode_words(encode_words([])) == []
+
+def test_alternatives_are_encoded_and_json_output_is_unchanged():
+    result = {"text": "hello", "words": WORDS[:1], "alternatives": [{"source": "vosk", "words": WORDS[1:2]},
+                                                                    {"source": "none", "error": "failed"}]}
+    encoded = to_output_format(result, "columnar")
+    assert decode_words(encoded["alternatives"][0]["words"]) == WORDS[1:2]
+    assert encoded["alternatives"][1] == {"source": "none", "error": "failed"}
+    assert to_output_format(result, "json") is result
+
+def test_columnar_output_is_smaller_than_json():
+    words = [dict(WORDS[index % 2], word=f"word{index}") for index in range(1000)]
+    encoded = to_output_format({"text": "", "words": words}, "columnar")
+    assert len(json.dumps(encoded)) < len(json.dumps({"text": "", "words": words})) / 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import signal
+import json
+import threading
+import subprocess
+
+import numpy as np
+import pytest
+
+from conftest import SERVICES_DIR, SAMPLE_RATE, write_wav
+
+# Generous: a hung worker would otherwise only show up as a stuck test run
+SERVE_TIMEOUT_SECONDS = 60
+
+@pytest.fixture
+def speech_file(tmp_path):
+    """Three one-second tones separated by silence"""
+    rng = np.random.default_rng(0)
+    samples = np.zeros(4 * SAMPLE_RATE)
+    for second in range(3):
+        start = int((second + 0.25) * SAMPLE_RATE)
+        samples[start:start + SAMPLE_RATE // 2] = rng.normal(0, 6000, SAMPLE_RATE // 2)
+    return write_wav(tmp_path / "speech.wav", samples)
+
+def run_serve(env, jobs, *arguments):
+    """
+    Send jobs to a --serve worker and return its results by id. stdin stays
+    open until every job is answered, as it does for SpeechService's worker.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "speech_recognition_script.py", "--serve", *arguments], cwd=SERVICES_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        start_new_session=True
+    )
+    # Kill the worker's children too, they hold its stdout open
+    kill = lambda: os.killpg(process.pid, signal.SIGKILL)
+    timer = threading.Timer(SERVE_TIMEOUT_SECONDS, kill)
+    timer.start()
+    try:
+        for job in jobs:
+            process.stdin.write(json.dumps(job) + "\n")
+        process.stdin.flush()
+
+        results = {}
+        for line in process.stdout:
+            message = json.loads(line)
+            if "event" not in message:
+                results[message["id"]] = message
+            if len(results) == len(jobs):
+                break
+        process.stdin.close()
+        assert process.wait() == 0
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            kill()
+    return results
+
+JOBS = [
+    {"id": "race", "strategy": "race"},
+    {"id": "chunked", "long_audio": "on"}
+]
+
+@pytest.mark.parametrize("arguments", [[], ["--no-queue"]], ids=["queued", "unqueued"])
+def test_jobs_that_start_processes_finish(fake_engines, speech_file, arguments):
+    results = run_serve(fake_engines, [dict(job, audio_file=speech_file) for job in JOBS], *arguments)
+
+    assert set(results) == {"race", "chunked"}
+    for result in results.values():
+        assert "error" not in result
+        assert [word["word"] for word in result["words"]] == ["word0", "word1", "word2", "word3"]
+    assert results["chunked"]["chunks"] >= 1
+
+def test_match_targets_is_answered(fake_engines):
+    words = [{"word": "Hello", "startTime": 0.0, "endTime": 0.4}]
+    results = run_serve(fake_engines, [{"id": "match", "command": "match_targets", "words": words,
+                                        "targets": ["hello"]}], "--no-queue")
+    assert len(results["match"]["targetMatches"]) == 1
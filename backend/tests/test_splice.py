@@ -0,0 +1,74 @@
+import wave
+
+import numpy as np
+import pytest
+
+import splice_script as splice
+from conftest import write_wav
+
+RATE = splice.OUTPUT_SAMPLE_RATE
+
+def constant(value, length, channels=2):
+    return np.full((length, channels), value, dtype=np.float32)
+
+def test_spans_are_clamped_and_overlaps_skipped():
+    replacements = [
+        {"startTime": 0.0, "endTime": 0.5},
+        {"startTime": 0.4, "endTime": 0.6},
+        {"startTime": 0.75, "endTime": 2.0}
+    ]
+    assert splice.replacement_spans(replacements, RATE) == [(0, RATE // 2, 0), (RATE * 3 // 4, RATE, 2)]
+
+def test_segments_alternate_source_views_and_clips():
+    source = np.arange(10).reshape(-1, 1)
+    clips = [np.full((3, 1), -1), np.full((2, 1), -2)]
+    segments = splice.segments_from_spans(source, [(0, 2, 0), (5, 6, 1)], clips)
+    assert [segment[:, 0].tolist() for segment in segments] == [
+        [-1, -1, -1], [2, 3, 4], [-2, -2], [6, 7, 8, 9]
+    ]
+    # Untouched spans are views, not copies
+    assert np.shares_memory(segments[1], source)
+
+def test_seams_are_crossfaded_linearly():
+    output = splice.splice_segments([constant(1000, 10), constant(3000, 10)], crossfade_samples=4)
+    assert output.shape == (16, 2) and output.dtype == np.int16
+    assert output[:6, 0].tolist() == [1000] * 6
+    assert output[6:10, 0].tolist() == [1000, 1666, 2333, 3000]
+    assert output[10:, 0].tolist() == [3000] * 6
+
+def test_crossfades_are_limited_by_short_segments_and_output_is_clipped():
+    output = splice.splice_segments([constant(40000, 2), constant(0, 1), constant(-40000, 2)],
+                                    crossfade_samples=10)
+    assert len(output) == 5 - 1 - 1
+    assert output[0, 0] == 32767 and output[-1, 0] == -32768
+
+def test_clips_are_converted_to_the_output_format(tmp_path):
+    clip_path = write_wav(tmp_path / "clip.wav", np.full(RATE // 4, 1000, dtype=np.int16), RATE // 2)
+    clip = splice.load_clip(clip_path)
+    assert clip.shape == (RATE // 2, 2) and clip.dtype == np.float32
+    # The polyphase filter keeps a constant signal away from the edges
+    assert np.allclose(clip[1000:-1000], 1000, atol=1)
+
+def test_splice_audio_replaces_every_span_in_one_pass(tmp_path, monkeypatch):
+    source = constant(500, 3 * RATE).astype(np.int16)
+    monkeypatch.setattr(splice, "decode_with_ffmpeg", lambda path, *args: source)
+    clips = [write_wav(tmp_path / f"clip{index}.wav", np.full(RATE // 10, value, dtype=np.int16), RATE)
+             for index, value in enumerate((-2000, 2000))]
+    # Out of order on purpose: replacement times all refer to the original timeline
+    replacements = [
+        {"startTime": 2.0, "endTime": 2.5, "clip_path": clips[1]},
+        {"startTime": 0.5, "endTime": 1.0, "clip_path": clips[0]}
+    ]
+    output_path = str(tmp_path / "out" / "spliced.wav")
+
+    result = splice.splice_audio("source.wav", output_path, replacements, crossfade_ms=0)
+    with wave.open(output_path, "rb") as wav:
+        output = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).reshape(-1, 2)
+
+    expected = np.concatenate([
+        source[:RATE // 2], constant(-2000, RATE // 10), source[RATE:2 * RATE],
+        constant(2000, RATE // 10), source[5 * RATE // 2:]
+    ]).astype(np.int16)
+    assert np.array_equal(output, expected)
+    assert result["replacements"] == 2
+    assert result["duration"] == pytest.approx(len(expected) / RATE)
@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+SERVICES_DIR = os.path.join(os.path.dirname(__file__), "..", "services")
+# Same budget as benchmark_pipeline.py --import-budget
+IMPORT_BUDGET_SECONDS = 0.25
+IMPORT_RUNS = 5
+HEAVY_MODULES = ["numpy", "scipy", "whisper", "vosk", "torch"]
+# Opened only by the code paths that need the cache or the job queue
+LAZY_MODULES = ["sqlite3", "transcription_cache", "job_scheduler", "cProfile"]
+
+@pytest.fixture
+def isolated_env(tmp_path):
+    """Environment pointing every on-disk store of the script into an empty directory"""
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    return state_dir, dict(
+        os.environ,
+        TRANSCRIPTION_CACHE_PATH=str(state_dir / "transcriptions.sqlite"),
+        JOB_QUEUE_PATH=str(state_dir / "jobs.sqlite"),
+        MODEL_STORE_DIR=str(state_dir / "models")
+    )
+
+def run_python(code, env):
+    return subprocess.run([sys.executable, "-c", code], cwd=SERVICES_DIR, env=env, check=True,
+                          capture_output=True, text=True).stdout
+
+def test_import_is_cheap(isolated_env):
+    _, env = isolated_env
+    measure = (
+        "import time; start = time.perf_counter(); import speech_recognition_script; "
+        "print(time.perf_counter() - start)"
+    )
+    best = min(float(run_python(measure, env)) for _ in range(IMPORT_RUNS))
+    assert best < IMPORT_BUDGET_SECONDS
+
+def test_import_has_no_side_effects(isolated_env):
+    state_dir, env = isolated_env
+    before = set(os.listdir(SERVICES_DIR))
+    loaded = json.loads(run_python(
+        "import sys, json; import speech_recognition_script; "
+        f"print(json.dumps([name for name in {HEAVY_MODULES + LAZY_MODULES!r} if name in sys.modules]))",
+        env
+    ))
+    assert loaded == []
+    assert list(state_dir.iterdir()) == []
+    # Byte-compiled caches aside, nothing is written next to the script
+    assert set(os.listdir(SERVICES_DIR)) - before <= {"__pycache__"}
+
+@pytest.mark.parametrize("arguments, error", [
+    ([], "Usage"),
+    (["missing.wav"], "Audio file not found"),
+    (["--batch", "missing.txt"], "Batch manifest not found")
+])
+def test_bad_invocation_fails_before_opening_anything(isolated_env, arguments, error):
+    state_dir, env = isolated_env
+    process = subprocess.run([sys.executable, "speech_recognition_script.py"] + arguments, cwd=SERVICES_DIR,
+                             env=env, capture_output=True, text=True)
+    assert process.returncode == 1
+    assert error in json.loads(process.stdout)["error"]
+    assert list(state_dir.iterdir()) == []
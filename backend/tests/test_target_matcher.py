@@ -0,0 +1,59 @@
+import pytest
+
+from target_matcher import TargetMatcher, compile_targets, porter_stem
+
+def transcript(*tokens):
+    """Words one second apart, each lasting half a second"""
+    return [{"word": token, "startTime": float(index), "endTime": index + 0.5, "confidence": 0.9}
+            for index, token in enumerate(tokens)]
+
+# Examples from Porter's paper, run through every step of the algorithm
+@pytest.mark.parametrize("word, stem", [
+    ("caresses", "caress"), ("ponies", "poni"), ("cats", "cat"), ("feed", "feed"), ("agreed", "agre"),
+    ("plastered", "plaster"), ("bled", "bled"), ("motoring", "motor"), ("sing", "sing"),
+    ("conflated", "conflat"), ("troubled", "troubl"), ("sized", "size"), ("hopping", "hop"),
+    ("falling", "fall"), ("hissing", "hiss"), ("filing", "file"), ("happy", "happi"), ("sky", "sky"),
+    ("relational", "relat"), ("conditional", "condit"), ("rational", "ration"), ("valenci", "valenc"),
+    ("digitizer", "digit"), ("generalization", "gener"), ("electrical", "electr"), ("hopeful", "hope"),
+    ("goodness", "good"), ("revival", "reviv"), ("allowance", "allow"), ("adjustable", "adjust"),
+    ("adoption", "adopt"), ("probate", "probat"), ("rate", "rate"), ("cease", "ceas"),
+    ("controll", "control"), ("roll", "roll")
+])
+def test_porter_stem(word, stem):
+    assert porter_stem(word) == stem
+
+@pytest.mark.parametrize("word", ["a", "ok", "don't", "mp3"])
+def test_short_and_non_alphabetic_words_are_not_stemmed(word):
+    assert porter_stem(word) == word
+
+def test_matches_carry_the_times_of_the_words_they_cover():
+    matcher = TargetMatcher(["hello", "new york"])
+    matches = matcher.match(transcript("Hello,", "from", "New", "York!"))
+
+    assert [(m["targetWord"], m["matchType"], m["position"], m["length"]) for m in matches] == [
+        ("hello", "exact", 0, 1), ("new york", "exact", 2, 2)
+    ]
+    assert matches[1]["word"] == "New York!"
+    assert (matches[1]["startTime"], matches[1]["endTime"]) == (2.0, 3.5)
+
+def test_longest_target_wins_and_matches_do_not_overlap():
+    matcher = TargetMatcher(["new", "new york", "york city"])
+    matches = matcher.match(transcript("new", "york", "city"))
+    assert [(m["targetWord"], m["position"]) for m in matches] == [("new york", 0)]
+
+def test_stemmed_forms_match_and_exact_forms_win():
+    matcher = TargetMatcher(["connect", "connections"])
+    matches = matcher.match(transcript("connecting", "connections", "connect"))
+    assert [(m["targetWord"], m["matchType"]) for m in matches] == [
+        ("connect", "stem"), ("connections", "exact"), ("connect", "exact")
+    ]
+
+def test_phrase_confidence_is_that_of_its_least_confident_word():
+    words = transcript("running", "late")
+    words[1]["confidence"] = 0.4
+    matches = TargetMatcher(["runs late"]).match(words)
+    assert matches[0]["matchType"] == "stem" and matches[0]["confidence"] == 0.4
+
+def test_compiled_matchers_are_reused_per_target_list():
+    assert compile_targets(["a", "b"]) is compile_targets(["a", "b"])
+    assert compile_targets(["a", "b"]) is not compile_targets(["b", "a"])
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import tts_script
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """A two-job manifest whose outputs are left over from an earlier run"""
+    outputs = [tmp_path / "clips" / f"clip{index}.wav" for index in range(2)]
+    outputs[0].parent.mkdir()
+    for output in outputs:
+        output.write_bytes(b"stale")
+    manifest = tmp_path / "batch.json"
+    manifest.write_text(json.dumps([{"text": f"word{index}", "output_path": str(output)}
+                                    for index, output in enumerate(outputs)]))
+    # The silence fallback fails too, so only what the engine renders can succeed
+    monkeypatch.setattr(tts_script, "create_silence", lambda duration, output_path: False)
+    return str(manifest), outputs
+
+def render_only(*indexes):
+    """A stand-in for the pyttsx3 batch that renders only some of the jobs"""
+    def generate(jobs):
+        for index in indexes:
+            with open(jobs[index]["output_path"], "wb") as clip:
+                clip.write(b"fresh")
+        return {}
+    return generate
+
+def test_stale_outputs_do_not_hide_engine_failures(batch, monkeypatch):
+    manifest, outputs = batch
+    monkeypatch.setattr(tts_script, "generate_batch_with_pyttsx3", render_only(1))
+
+    result = tts_script.run_batch(manifest)
+    assert [item["success"] for item in result["results"]] == [False, True]
+    assert result["results"][1]["method"] == "pyttsx3"
+    assert [output.read_bytes() for output in outputs] == [b"stale", b"fresh"]
+    # No staging files are left behind
+    assert sorted(path.name for path in outputs[0].parent.iterdir()) == ["clip0.wav", "clip1.wav"]
+
+def test_unavailable_engine_fails_every_job(batch, monkeypatch):
+    manifest, _ = batch
+    monkeypatch.setattr(tts_script, "generate_batch_with_pyttsx3", lambda jobs: None)
+    assert not tts_script.run_batch(manifest)["success"]
+
+def test_single_job_reports_a_stale_output_as_failed(batch, monkeypatch):
+    _, outputs = batch
+    monkeypatch.setattr(tts_script, "open_phrase_bank", lambda: None)
+    monkeypatch.setattr(tts_script, "generate_tts_with_pyttsx3", lambda text, output_path, rate, volume: True)
+    result, exit_code = tts_script.run_command(["word0", str(outputs[0])])
+    assert exit_code == 0 and not result["success"]
@@ -0,0 +1,40 @@
+import pytest
+
+import speech_recognition_script as speech
+
+def config(**overrides):
+    return dict({"model": "auto", "threads": 4, "int8": False, "latencyTarget": 5.0}, **overrides)
+
+def test_config_from_environment(monkeypatch):
+    monkeypatch.setenv("WHISPER_MODEL", "auto")
+    monkeypatch.setenv("WHISPER_THREADS", "2")
+    monkeypatch.setenv("WHISPER_INT8", "on")
+    monkeypatch.setenv("WHISPER_LATENCY_TARGET", "5")
+    assert speech.whisper_config_from_env() == config(threads=2, int8=True)
+
+def test_default_config_caps_the_threads(monkeypatch):
+    for name in ("WHISPER_MODEL", "WHISPER_THREADS", "WHISPER_INT8", "WHISPER_LATENCY_TARGET"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(speech.os, "cpu_count", lambda: 64)
+    assert speech.whisper_config_from_env() == {
+        "model": speech.WHISPER_MODEL_NAME,
+        "threads": speech.WHISPER_DEFAULT_MAX_THREADS,
+        "int8": False,
+        "latencyTarget": None
+    }
+
+@pytest.mark.parametrize("duration, overrides, model", [
+    (10, {}, "small"),
+    (60, {}, "base"),
+    # Nothing fits the target, so the smallest model is used
+    (600, {}, "tiny"),
+    (30, {}, "base"),
+    (30, {"int8": True}, "small"),
+    (10, {"threads": 1}, "base"),
+    # Threads past the reference count do not make a larger model fit
+    (60, {"threads": 32}, "base"),
+    (60, {"latencyTarget": None}, speech.WHISPER_MODEL_NAME),
+    (600, {"model": "medium"}, "medium")
+])
+def test_auto_model_fits_the_latency_target(duration, overrides, model):
+    assert speech.choose_whisper_model(duration, config(**overrides)) == model
@@ -58,6 +58,11 @@ interface TranscriptionWord {
   confidence?: number;
 }
 
+interface WaveformPeaks {
+  peaks: Float32Array;
+  duration: number;
+}
+
 interface ProcessedAudioFile {
   filename: string;
   path: string;
@@ -70,6 +75,9 @@ const AudioEditor: React.FC = () => {
   const [uploadedFilename, setUploadedFilename] = useState<string>("");
   const [audioId, setAudioId] = useState<string>("");
   const [audioUrl, setAudioUrl] = useState<string>("");
+  const [waveformPeaks, setWaveformPeaks] = useState<WaveformPeaks | null>(
+    null
+  );
   const [isPlaying, setIsPlaying] = useState(false);
   const [transcription, setTranscription] = useState<string>("");
   const [transcriptionWords, setTranscriptionWords] = useState<
@@ -86,6 +94,8 @@ const AudioEditor: React.FC = () => {
 
   const waveformRef = useRef<HTMLDivElement>(null);
   const wavesurfer = useRef<WaveSurfer | null>(null);
+  // Upload whose waveform peaks are awaited; responses for older uploads are dropped
+  const peaksAudioId = useRef<string>("");
 
   // Initialize WaveSurfer
   useEffect(() => {
@@ -103,7 +113,13 @@ const AudioEditor: React.FC = () => {
         normalize: true,
       });
 
-      wavesurfer.current.load(audioUrl);
+      // Playable right away; the waveform is decoded in the browser unless
+      // the precomputed peaks arrive first (see below)
+      wavesurfer.current.load(audioUrl).catch((error) => {
+        if (error?.name !== "AbortError") {
+          console.error("WaveSurfer load error:", error);
+        }
+      });
 
       wavesurfer.current.on("ready", () => {
         console.log("WaveSurfer is ready");
@@ -121,6 +137,17 @@ const AudioEditor: React.FC = () => {
     };
   }, [audioUrl]);
 
+  // Draw from the precomputed peaks once they arrive, which stops decoding
+  // the whole file; not needed once decoded, and playback is not interrupted
+  useEffect(() => {
+    const instance = wavesurfer.current;
+    if (!instance || !audioUrl || !waveformPeaks) return;
+    if (instance.getDecodedData() || instance.isPlaying()) return;
+    instance
+      .load(audioUrl, [waveformPeaks.peaks], waveformPeaks.duration)
+      .catch((error) => console.error("WaveSurfer load error:", error));
+  }, [audioUrl, waveformPeaks]);
+
   // File drop zone configuration
   const { getRootProps, getInputProps, isDragActive } = useDropzone({
     accept: {
@@ -148,6 +175,8 @@ const AudioEditor: React.FC = () => {
     setUploadedFilename("");
     setAudioId("");
     setAudioUrl("");
+    setWaveformPeaks(null);
+    peaksAudioId.current = "";
     setIsPlaying(false);
 
     // Destroy existing wavesurfer instance
@@ -186,6 +215,14 @@ const AudioEditor: React.FC = () => {
         setAudioId(data.audioId);
         setAudioUrl(URL.createObjectURL(file));
 
+        // Peaks only speed up drawing the waveform, so nothing waits for them
+        peaksAudioId.current = data.audioId;
+        fetchWaveformPeaks(data.audioId).then((peaks) => {
+          if (peaks && peaksAudioId.current === data.audioId) {
+            setWaveformPeaks(peaks);
+          }
+        });
+
         // Start speech-to-text processing
         await processSpeechToText(data.audioId);
       } else {
@@ -200,6 +237,37 @@ const AudioEditor: React.FC = () => {
     }
   }
 
+  async function fetchWaveformPeaks(
+    audioId: string
+  ): Promise<WaveformPeaks | null> {
+    // Peaks precomputed by the backend; null falls back to decoding the file
+    try {
+      const response = await axios.get(
+        `${process.env.REACT_APP_API_URL}/api/audio/peaks/${audioId}`,
+        {
+          params: {
+            width: Math.round(
+              window.innerWidth * (window.devicePixelRatio || 1)
+            ),
+          },
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }
+      );
+      return {
+        peaks: Float32Array.from(
+          response.data.peaks,
+          (peak: number) => peak / 128
+        ),
+        duration: response.data.duration,
+      };
+    } catch (error) {
+      console.error("Waveform peaks error:", error);
+      return null;
+    }
+  }
+
   async function processSpeechToText(audioId: string) {
     setLoading(true);
 
@@ -223,7 +291,12 @@ const AudioEditor: React.FC = () => {
           setTranscriptionWords(data.words);
 
           // Analyze text for potential replacements
-          await analyzeText(data.transcription.text, [], audioId);
+          await analyzeText(
+            data.transcription.text,
+            [],
+            audioId,
+            data.words
+          );
         }
       } else {
         throw new Error("Speech-to-text processing failed");
@@ -239,7 +312,8 @@ const AudioEditor: React.FC = () => {
   async function analyzeText(
     text: string,
     targetWords: string[],
-    audioId: string
+    audioId: string,
+    words: TranscriptionWord[] = transcriptionWords
   ) {
     setLoading(true);
 
@@ -250,6 +324,8 @@ const AudioEditor: React.FC = () => {
           text,
           targetWords,
           audioId,
+          // Matched server-side against the word timestamps
+          words,
         },
         {
           headers: {
@@ -265,10 +341,14 @@ const AudioEditor: React.FC = () => {
         if (data.wordsFound && data.wordsFound.length > 0) {
           const newReplacements = data.wordsFound.map(
             (word: any, index: number) => {
-              // Find matching word in transcriptionWords to get timing information
-              const matchingWord = transcriptionWords.find(
-                (tw) => tw.word.toLowerCase() === word.word.toLowerCase()
-              );
+              // Matches against the transcript words carry their time span;
+              // otherwise find a matching word to get timing information
+              const matchingWord =
+                word.startTime !== undefined
+                  ? word
+                  : words.find(
+                      (tw) => tw.word.toLowerCase() === word.word.toLowerCase()
+                    );
 
               return {
                 id: `replacement-${index}`,